@@ -14,11 +14,12 @@ from healthcheck import EnvironmentDump, HealthCheck
 
 from core.loaders import geopoints as geopoints_loader
 from core.loaders import load_point_data_by_path
+from core.loaders import observations as observations_loader
 from core.loaders.fieldset import Fieldset
 from core.models import Config
 from core.postprocessors.decision_tree import DecisionTree, WeatherType
 from core.postprocessors.ks_test import format_ks_stats, ks_test_engine, plot_ks_stats
-from core.processor import run
+from core.processor import build_cube, merge_shards, plan, run
 from core.svc import postprocessing as postprocessing_svc
 from core.utils import inf, sanitize_path, wrap_title
 
@@ -54,6 +55,32 @@ def start_computation():
     return Response()
 
 
+@app.route("/computations/plan", methods=("POST",))
+def plan_computation():
+    payload = request.get_json()
+    config = Config.from_dict(payload)
+
+    return jsonify(plan(config).to_dict())
+
+
+@app.route("/computations/merge", methods=("POST",))
+def merge_computation_shards():
+    payload = request.get_json()
+    config = Config.from_dict(payload)
+
+    merge_shards(config)
+    return Response()
+
+
+@app.route("/computations/cube", methods=("POST",))
+def build_forecast_cube():
+    payload = request.get_json()
+    config = Config.from_dict(payload)
+
+    build_cube(config)
+    return Response()
+
+
 @app.route("/computations/status", methods=("GET",))
 def get_computation_status():
     global is_computation_running
@@ -93,6 +120,20 @@ def get_obs_metadata():
     return Response(json.dumps({"units": units}), mimetype="application/json")
 
 
+@app.route("/loaders/observations/ingest", methods=("POST",))
+def ingest_observations():
+    payload = request.get_json()
+
+    count = observations_loader.ingest(
+        archive=Path(sanitize_path(payload["path"])),
+        store=Path(sanitize_path(payload["store"])),
+        code=payload["code"],
+        accumulation=payload.get("accumulation"),
+    )
+
+    return jsonify({"files": count})
+
+
 @app.route("/postprocessing/pdt-tools/statistics", methods=("POST",))
 def get_pdt_statistics():
     payload = request.get_json()
@@ -3,6 +3,7 @@ import operator
 import attr
 
 from .utils import (
+    StepLoaders,
     compute_24h_solar_radiation,
     compute_accumulated_field,
     compute_average_field,
@@ -15,6 +16,10 @@ from .utils import (
     compute_ratio_field,
     compute_vector,
     compute_weighted_average_field,
+    stream_average_field,
+    stream_maximum,
+    stream_minimum,
+    stream_weighted_average_field,
 )
 
 
@@ -35,11 +40,31 @@ class Computer(object):
         "LOCAL_SOLAR_TIME": compute_local_solar_time,
     }
 
+    # Computations that can fold the steps one at a time.
+    streams = {
+        "WEIGHTED_AVERAGE_FIELD": stream_weighted_average_field,
+        "MAXIMUM_FIELD": stream_maximum,
+        "MINIMUM_FIELD": stream_minimum,
+        "AVERAGE_FIELD": stream_average_field,
+    }
+
     computation = attr.ib()
 
     def run(self, *args):
-        computed_value = self.meta[self.computation.field](*args)
+        return self._scale(self.meta[self.computation.field](*args))
+
+    def run_streaming(self, steps: StepLoaders):
+        """
+        Run the computation on steps given as functions loading them. The
+        reductions over the steps load one step at a time, and the other
+        computations load all the steps in order before running.
+        """
+        if self.computation.field in self.streams:
+            return self._scale(self.streams[self.computation.field](steps))
+
+        return self.run(*(load() for load in steps))
 
+    def _scale(self, computed_value):
         if self.computation.mulScale == 1 and self.computation.addScale == 0:
             return computed_value
         else:
@@ -1,7 +1,10 @@
 import operator
 from functools import reduce
+from typing import Any, Callable, Sequence
 
-from ..loaders.fieldset import Fieldset
+import numpy as np
+
+from ..loaders.fieldset import Fieldset, NumpyFieldset
 
 
 def compute_accumulated_field(*args):
@@ -32,18 +35,103 @@ def compute_average_field(*args):
     return reduce(operator.add, args) / len(args)
 
 
+# The functions above work with Fieldset instances and numpy arrays alike.
+# The ones below dispatch on the type of their arguments, for the numpy
+# arrays of station values used by the point-space evaluation.
+
+
 def compute_vector(*args):
+    if isinstance(args[0], np.ndarray):
+        return np.sqrt(sum(abs(term) ** 2 for term in args))
+
     return Fieldset.vector_of(*args)
 
 
 def compute_maximum(*args):
+    if isinstance(args[0], np.ndarray):
+        return reduce(np.maximum, args)
+
     return Fieldset.max_of(*args)
 
 
 def compute_minimum(*args):
+    if isinstance(args[0], np.ndarray):
+        return reduce(np.minimum, args)
+
     return Fieldset.min_of(*args)
 
 
+# Running versions of the reductions over the steps of a forecast. The steps
+# are given as functions loading them, and are folded one at a time, so that
+# only the accumulated value and the current step are held in memory. The
+# operations are done in the same order as the functions above.
+
+StepLoaders = Sequence[Callable[[], Any]]
+
+
+def _values(step):
+    return step if isinstance(step, np.ndarray) else step.values
+
+
+def _stream_extremum(function, steps: StepLoaders):
+    first = steps[0]()
+    values = np.array(_values(first))
+
+    for load in steps[1:]:
+        function(values, _values(load()), out=values)
+
+    return values if isinstance(first, np.ndarray) else first.with_values(values)
+
+
+def stream_maximum(steps: StepLoaders):
+    return _stream_extremum(np.maximum, steps)
+
+
+def stream_minimum(steps: StepLoaders):
+    return _stream_extremum(np.minimum, steps)
+
+
+def _fold(total, step, buffer=None):
+    """
+    Add `step` to the running total of a reduction. The sum of NumpyFieldset
+    instances is evaluated right away, in the buffer of the previous total
+    if given, so that the total does not hold on to the steps folded so far.
+
+    :return: The new total, and the buffer to pass to the next call.
+    """
+    total = total + step
+
+    if isinstance(total, NumpyFieldset):
+        total.evaluate(out=buffer)
+        return total, total.values
+
+    return total, None
+
+
+def stream_average_field(steps: StepLoaders):
+    total, buffer = steps[0](), None
+
+    for load in steps[1:]:
+        total, buffer = _fold(total, load(), buffer)
+
+    return total / len(steps)
+
+
+def stream_weighted_average_field(steps: StepLoaders):
+    total = steps[0]() * 0.5 + steps[-1]() * 0.5
+    items_excluding_first_and_last = steps[1: len(steps) - 1]
+
+    if not items_excluding_first_and_last:
+        return total
+
+    buffer = None
+    for load in items_excluding_first_and_last:
+        total, buffer = _fold(total, load(), buffer)
+
+    total_weight = len(items_excluding_first_and_last) * 1 + 2 * 0.5
+    return total / total_weight
+
+
 def compute_ratio_field(dividend, divisor):
     return dividend / divisor
 
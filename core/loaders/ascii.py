@@ -1,63 +1,472 @@
+import logging
+import os
 from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from functools import partial
 from itertools import takewhile
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
 import attr
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 
 from core.loaders import BasePointDataReader
 
 
+# Layouts of the rows of the ASCII point data tables: columns aligned like
+# DataFrame.to_string(), or comma-separated values without padding.
+DIALECTS = ("fixed", "csv")
+
+# Minimum width of the columns of the fixed layout.
+_COLUMN_SPACE = 10
+
+# Longest string printed by DataFrame.to_string() without truncation
+# (display.max_colwidth).
+_MAX_COLUMN_WIDTH = 50
+
+
+def _format_floats(values: np.ndarray) -> Optional[List[str]]:
+    """
+    Format floats like the fixed-width formatter of pandas: the precision of
+    the display, with the trailing zeros common to all the values removed.
+
+    :return: The formatted values, or None if pandas would use the
+        scientific notation.
+    """
+    digits = pd.get_option("display.precision")
+
+    with np.errstate(invalid="ignore"):
+        abs_values = np.abs(values)
+        if ((abs_values < 10.0 ** -digits) & (abs_values > 0)).any():
+            return None
+
+    fmt = f"%.{digits}f"
+    finite = np.isfinite(values).tolist()
+    strings = [
+        fmt % value if is_finite else ("NaN" if value != value else str(value))
+        for value, is_finite in zip(values.tolist(), finite)
+    ]
+
+    # Keep at least one decimal.
+    trailing_zeros = min(
+        (
+            len(string) - len(string.rstrip("0"))
+            for string, is_finite in zip(strings, finite)
+            if is_finite
+        ),
+        default=0,
+    )
+    cut = min(trailing_zeros, digits - 1)
+
+    if cut > 0:
+        strings = [
+            string[:-cut] if is_finite else string
+            for string, is_finite in zip(strings, finite)
+        ]
+
+    if max(map(len, strings)) > digits + 6 and (abs_values > 1e6).any():
+        return None
+
+    return strings
+
+
+def _format_column(values: np.ndarray, dialect: str) -> Optional[List[str]]:
+    """
+    Format the values of a column, or return None if they are not supported
+    by the fast formatter.
+    """
+    kind = values.dtype.kind
+
+    if kind in "iub":
+        return list(map(str, values.tolist()))
+
+    if kind == "U":
+        strings = values.tolist()
+
+        # Strings truncated or escaped by pandas, or quoted in CSV.
+        special = "\t\r\n," if dialect == "csv" else "\t\r\n"
+
+        if max(map(len, strings)) > _MAX_COLUMN_WIDTH or any(
+            char in string for string in strings for char in special
+        ):
+            return None
+        return strings
+
+    if kind == "f":
+        if dialect == "csv":
+            return [
+                repr(value) if value == value else "NaN" for value in values.tolist()
+            ]
+
+        return _format_floats(values)
+
+    return None
+
+
+def _format_chunk(columns, header: bool, dialect: str) -> Optional[str]:
+    """
+    Render a chunk of columns, given as (name, values) pairs, as the rows of
+    the point data table. The values are arrays, or scalars repeated on
+    every row.
+
+    :return: The rows, or None if the chunk requires pandas.
+    """
+    if isinstance(columns, Mapping):
+        columns = columns.items()
+
+    names, arrays = [], []
+    for name, values in columns:
+        if isinstance(values, (np.ndarray, list, tuple)):
+            values = np.asarray(values)
+        elif isinstance(values, (str, int, float, np.generic)):
+            values = np.asarray(values)[()]
+        else:
+            return None
+
+        names.append(str(name))
+        arrays.append(values)
+
+    sizes = {len(values) for values in arrays if np.ndim(values)}
+    if len(sizes) != 1 or 0 in sizes:
+        return None
+
+    (size,) = sizes
+    formatted = []
+
+    for values in arrays:
+        if np.ndim(values):
+            strings = _format_column(values, dialect)
+        else:
+            # The scalars are formatted once.
+            strings = _format_column(np.full(1, values), dialect)
+            strings = strings and strings * size
+
+        if strings is None:
+            return None
+
+        formatted.append(strings)
+
+    if dialect == "csv":
+        lines = [",".join(names)] if header else []
+        lines += map(",".join, zip(*formatted))
+        return "\n".join(lines)
+
+    # The labels of the numeric columns start with a space, like in pandas.
+    labels = [
+        f" {name}" if values.dtype.kind in "iufb" else name
+        for name, values in zip(names, arrays)
+    ]
+
+    widths = [
+        max(_COLUMN_SPACE, max(map(len, strings)), len(label) if header else 0)
+        for label, strings in zip(labels, formatted)
+    ]
+
+    row = " ".join(f"{{:>{width}}}" for width in widths)
+    lines = [row.format(*labels)] if header else []
+    lines += (row.format(*values) for values in zip(*formatted))
+    return "\n".join(lines)
+
+
+def _compact_spaces(data: bytes) -> pa.Buffer:
+    """
+    Turn rows of the fixed layout into rows separated by single spaces, by
+    dropping the padding of the columns and the spaces around the lines.
+    """
+    chars = np.frombuffer(data, dtype=np.uint8)
+    spaces = chars == ord(" ")
+
+    # Spaces following a space or a line break, or preceding a line break.
+    drop = np.empty_like(spaces)
+    drop[0] = True
+    np.logical_or(spaces[:-1], chars[:-1] == ord("\n"), out=drop[1:])
+    if b" \n" in data:
+        drop[:-1] |= chars[1:] == ord("\n")
+    drop &= spaces
+
+    return pa.py_buffer(chars[~drop])
+
+
+def _read_csv_block(
+    path: str,
+    offset: int,
+    size: int,
+    delimiter: str,
+    column_names: List[str],
+    column_types: dict,
+    include_columns: List[str],
+) -> pa.Table:
+    """
+    Read the rows in a byte range of a point data table with pyarrow.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size)
+
+    buffer = _compact_spaces(data) if delimiter == " " else pa.py_buffer(data)
+
+    return pacsv.read_csv(
+        pa.BufferReader(buffer),
+        # The blocks are already read concurrently, one thread each.
+        read_options=pacsv.ReadOptions(column_names=column_names, use_threads=False),
+        parse_options=pacsv.ParseOptions(delimiter=delimiter),
+        convert_options=pacsv.ConvertOptions(
+            column_types=column_types,
+            include_columns=include_columns,
+            strings_can_be_null=True,
+        ),
+    )
+
+
 @attr.s(slots=True)
 class ASCIIEncoder(object):
     path = attr.ib()
     first_chunk_address_added = attr.ib(default=False)
 
+    # Layout of the rows, one of DIALECTS.
+    dialect = attr.ib(default="fixed", validator=attr.validators.in_(DIALECTS))
+
+    # Internal instance attributes
+    _file = attr.ib(default=None)
+
+    def _open(self):
+        # The file stays open between the chunks.
+        if self._file is None:
+            self._file = open(self.path, "a")
+
+        return self._file
+
     def add_header(self, header):
+        self.close()
+
         with open(self.path, "w") as f:
             f.write(header)
             f.write("\n\n")
 
     def add_footer(self, footer):
-        with open(self.path, "a") as f:
-            f.write(footer)
+        f = self._open()
+        f.write(footer)
+        f.flush()
+
+    def checkpoint(self) -> dict:
+        """
+        Return the state needed to resume writing the file from this point,
+        after an interruption.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+        return {
+            "offset": os.path.getsize(self.path),
+            "first_chunk_address_added": self.first_chunk_address_added,
+        }
+
+    def resume(self, state: dict, header: str):
+        """
+        Reopen a file written up to a checkpoint, discarding whatever was
+        written after it. The header is already in the file, and so are the
+        column names if a chunk was written before the checkpoint, like in
+        a table being extended.
+        """
+        self.close()
+
+        with open(self.path, "r+") as f:
+            f.truncate(state["offset"])
+
+        self.first_chunk_address_added = state.get("first_chunk_address_added", True)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def abort(self):
+        """
+        Close the file after a failure. The chunks are written as they come,
+        so the file holds the rows written so far, without the footer.
+        """
+        self.close()
 
     def add_columns_chunk(self, columns):
-        df = pd.DataFrame.from_dict(OrderedDict(columns))
+        header = not self.first_chunk_address_added
+        text = _format_chunk(columns, header=header, dialect=self.dialect)
+
+        if text is None:
+            df = pd.DataFrame.from_dict(OrderedDict(columns))
 
-        with open(self.path, "a") as f:
-            if not self.first_chunk_address_added:
-                f.write(df.to_string(index=False, col_space=10))
-                self.first_chunk_address_added = True
+            if self.dialect == "csv":
+                text = df.to_csv(index=False, header=header, na_rep="NaN")
+                text = text.rstrip("\n")
             else:
-                f.write(df.to_string(index=False, header=False, col_space=10))
-            f.write("\n")
+                text = df.to_string(index=False, header=header, col_space=10)
+
+        # The chunk is written at once, and flushed, so that the file can be
+        # read up to the last chunk.
+        f = self._open()
+        f.write(text)
+        f.write("\n")
+        f.flush()
+
+        self.first_chunk_address_added = True
 
 
 @dataclass
 class ASCIIDecoder(BasePointDataReader):
+    # Type of the float columns of the dataframe, like "float32" to halve the
+    # memory of large tables.
+    float_dtype: str = "float64"
+
+    # Number of byte ranges of the file read at once. Each one holds its
+    # bytes, their copy without the padding and the parsed table in memory.
+    threads: int = 4
+
     # Internal instance attributes
     _columns: Optional[list] = field(default=None, repr=False)
     _dataframe: Optional[pd.DataFrame] = field(default=None, repr=False)
 
+    _separator: Optional[str] = field(default=None, repr=False)
+
     # Fields for implementing the iterator protocol
-    _current_csv_offset: int = field(default=0, repr=False)
+    _chunks: Optional[Iterator[pd.DataFrame]] = field(default=None, repr=False)
 
     _chunk_size = 100000
 
+    # Size of the byte ranges of the file read concurrently by pyarrow.
+    _block_size = 16 * 1024**2
+
+    # Number of rows read by pandas to find the types of the columns.
+    _sample_size = 1000
+
+    def _get_separator(self) -> str:
+        # The separator is detected from the first line after the header.
+        if self._separator is None:
+            self._separator = r"\s+"
+
+            with open(self.path, "r") as f:
+                for line in f:
+                    if line.strip() and not line.startswith("#"):
+                        if "," in line:
+                            self._separator = ","
+                        break
+
+        return self._separator
+
+    @property
+    def dialect(self) -> str:
+        """
+        Layout of the rows of the file, one of DIALECTS.
+        """
+        return "csv" if self._get_separator() == "," else "fixed"
+
     @property
     def _reader(self):
         return partial(
-            pd.read_csv, self.path, comment="#", skip_blank_lines=True, sep=r"\s+"
+            pd.read_csv,
+            self.path,
+            comment="#",
+            skip_blank_lines=True,
+            sep=self._get_separator(),
+        )
+
+    def _read_table(self, columns: Optional[List[str]] = None) -> Optional[pa.Table]:
+        """
+        Read the rows of the file with the multithreaded CSV reader of pyarrow.
+
+        The file is split into byte ranges of whole lines, read concurrently.
+        The padding of the fixed layout is removed from the lines before
+        parsing them, as pyarrow only splits the columns on a single
+        character.
+
+        :return: The table, or None if the file has no rows.
+        """
+        delimiter = "," if self.dialect == "csv" else " "
+        end, _ = self.read_footer()
+
+        with open(self.path, "rb") as f:
+            line = f.readline()
+            while line and (not line.strip() or line.startswith(b"#")):
+                line = f.readline()
+
+            header = line.decode()
+            names = header.split(",") if delimiter == "," else header.split()
+            offsets = [f.tell()]
+
+            while offsets[-1] + self._block_size < end:
+                f.seek(offsets[-1] + self._block_size)
+                f.readline()
+                if f.tell() >= end:
+                    break
+                offsets.append(f.tell())
+
+        if offsets[0] >= end:
+            return None
+
+        # The types of the columns are the ones of pandas for the first rows,
+        # so that every range is read with the same types.
+        sample = self._reader(nrows=self._sample_size)
+        names = [name.strip() for name in names]
+
+        if list(sample.columns) != names:
+            raise ValueError(f"Unexpected column names: {names}")
+
+        if columns is not None and not set(columns) <= set(names):
+            raise ValueError(f"Unknown columns: {sorted(set(columns) - set(names))}")
+
+        float_type = pa.from_numpy_dtype(np.dtype(self.float_dtype))
+        column_types = {}
+
+        for name, dtype in sample.dtypes.items():
+            if dtype.kind not in "biuf":
+                column_types[name] = pa.string()
+            elif dtype.kind == "f":
+                column_types[name] = float_type
+            else:
+                column_types[name] = pa.from_numpy_dtype(dtype)
+
+        read_block = partial(
+            _read_csv_block,
+            self.path,
+            delimiter=delimiter,
+            column_names=names,
+            column_types=column_types,
+            # The columns are kept in the order of the file, like pandas.
+            include_columns=[
+                name for name in names if columns is None or name in columns
+            ],
         )
+        sizes = [stop - start for start, stop in zip(offsets, offsets[1:] + [end])]
+
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(self.threads, len(offsets)))
+        ) as executor:
+            tables = list(executor.map(read_block, offsets, sizes))
+
+        return pa.concat_tables(tables)
+
+    def _read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        try:
+            table = self._read_table(columns)
+        except (pa.ArrowException, ValueError) as e:
+            # Odd files, like ones with comments between the rows, are left
+            # to pandas.
+            logging.info(f"Reading {self.path} with pandas: {e}")
+        else:
+            if table is not None:
+                return table.to_pandas()
+
+        df = self._reader(usecols=columns)
+        float_columns = df.select_dtypes(include="float").columns
+        return df.astype({name: self.float_dtype for name in float_columns}, copy=False)
 
     @property
     def dataframe(self) -> pd.DataFrame:
         if self._dataframe is None:
-            self._dataframe = self._reader()
+            self._dataframe = self._read()
 
         return self._dataframe
 
@@ -80,35 +489,80 @@ class ASCIIDecoder(BasePointDataReader):
             "footer": "Cannot read footer comments from CSV Point Data Tables",
         }
 
+    def read_footer(self, max_size: int = 65536) -> Tuple[int, str]:
+        """
+        Read the comment lines at the end of the file.
+
+        :return: The byte offset where the footer starts, and its text.
+        """
+        with open(self.path, "rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            start = max(0, size - max_size)
+            f.seek(start)
+            tail = f.read()
+
+        lines = tail.splitlines(keepends=True)
+        offset = size
+
+        for line in reversed(lines):
+            if line.strip() and not line.startswith(b"#"):
+                break
+            offset -= len(line)
+
+        return offset, tail[offset - start:].decode()
+
     def select(self, *args: str, series: bool = True) -> Union[pd.DataFrame, pd.Series]:
-        result = self._reader(usecols=args)
+        result = self._read(list(args))
         if series and len(args) == 1:
             (col,) = args
             result = result[col]
         return result
 
     def clone(self, *args: str, path: Path):
-        encoder = ASCIIEncoder(path=path)
+        encoder = ASCIIEncoder(path=path, dialect=self.dialect)
         encoder.add_header(self.metadata.get("header", ""))
 
-        for chunk in self:
-            filtered_chunk = chunk[list(args)]
-            encoder.add_columns_chunk(filtered_chunk.to_dict())
+        for chunk in self.iter_chunks(*args):
+            encoder.add_columns_chunk(chunk.to_dict())
+
+        encoder.close()
+
+    def iter_chunks(
+        self, *args: str, dtype: Optional[dict] = None, chunk_size: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over the rows of the file in chunks, in a single pass.
+
+        The file is read by a single streaming parser, so that the time is
+        linear in the size of the file and the memory is bounded by the size
+        of a chunk.
+
+        :param args: Columns to read, in this order, or all of them if empty.
+        :param dtype: Types of the columns, by name. The types are inferred by
+            pandas for the columns left out.
+        :param chunk_size: Number of rows of the chunks.
+        """
+        columns = list(args) or None
+        reader = self._reader(
+            chunksize=chunk_size or self._chunk_size, usecols=columns, dtype=dtype
+        )
+
+        try:
+            for chunk in reader:
+                # A table without rows is read as an empty chunk.
+                if chunk.empty:
+                    continue
+
+                yield chunk[columns] if columns else chunk
+        finally:
+            reader.close()
 
     def __iter__(self) -> "ASCIIDecoder":
-        self._current_csv_offset = 0
+        self._chunks = self.iter_chunks()
         return self
 
     def __next__(self) -> pd.DataFrame:
-        df: pd.DataFrame = self._reader(
-            nrows=self._chunk_size,
-            skiprows=self._current_csv_offset,
-            header=0,
-            names=self.columns,
-        )
-
-        if df.empty:
-            raise StopIteration
+        if self._chunks is None:
+            iter(self)
 
-        self._current_csv_offset += self._chunk_size
-        return df
+        return next(self._chunks)
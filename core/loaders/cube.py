@@ -0,0 +1,115 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+from .grid import GridIndex, get_grid_index
+
+# Files of a forecast cube, next to the arrays of the predictors.
+METADATA_FILE = "cube.json"
+POINTS_FILE = "points.npy"
+LATITUDES_FILE = "latitudes.npy"
+LONGITUDES_FILE = "longitudes.npy"
+
+
+def get_values_path(path: Path, code: str) -> Path:
+    return path / f"{code}.npy"
+
+
+def get_present_path(path: Path, code: str) -> Path:
+    return path / f"{code}.present.npy"
+
+
+class ForecastCube:
+    """
+    Reader of a forecast cube: the values of the GRIB files of an archive at
+    the grid points nearest to a network of stations.
+
+    The cube holds an array by predictor, shaped (base time, step, grid
+    point), memory-mapped when first read, and a boolean array shaped (base
+    time, step) telling which GRIB files were found. The metadata maps the
+    paths of the GRIB files, relative to the archive, to their position in
+    the arrays.
+    """
+
+    def __init__(self, path: Union[Path, str], archive: Union[Path, str]):
+        self.path = Path(path)
+        self.archive = Path(archive)
+
+        with open(self.path / METADATA_FILE) as f:
+            metadata = json.load(f)
+
+        self.grid_key: str = metadata["grid_key"]
+        self.files: Dict[str, list] = metadata["files"]
+
+        # Grid points of the cube, sorted.
+        self.points = np.load(self.path / POINTS_FILE)
+
+        self._arrays = {}
+
+    @property
+    def grid_index(self) -> GridIndex:
+        return get_grid_index(
+            self.grid_key,
+            lambda: (
+                np.load(self.path / LATITUDES_FILE),
+                np.load(self.path / LONGITUDES_FILE),
+            ),
+        )
+
+    def _open(self, code: str):
+        if code not in self._arrays:
+            self._arrays[code] = (
+                np.load(get_values_path(self.path, code), mmap_mode="r"),
+                np.load(get_present_path(self.path, code)),
+            )
+
+        return self._arrays[code]
+
+    def columns(self, stations) -> Optional[np.ndarray]:
+        """
+        Positions in the cube of the grid points nearest to the stations, or
+        None if some of them are not in the cube.
+
+        :param stations: (PointObservations) Locations of the stations.
+        """
+        indices = stations.grid_point_indices(self.grid_key, self.grid_index)
+
+        if len(self.points) == 0:
+            return None if len(indices) else np.empty(0, dtype=np.intp)
+
+        columns = np.searchsorted(self.points, indices)
+        columns = np.minimum(columns, len(self.points) - 1)
+        if not np.array_equal(self.points[columns], indices):
+            return None
+
+        return columns
+
+    def read(self, path: Union[Path, str], stations) -> Optional[np.ndarray]:
+        """
+        Read the values of a GRIB file of the archive at the grid points
+        nearest to the stations.
+
+        :param stations: (PointObservations) Locations of the stations.
+        :return: The values, or None if the GRIB file or the stations are not
+            in the cube.
+        :raises IOError: If the GRIB file was not found when building the
+            cube.
+        """
+        entry = self.files.get(os.path.relpath(path, self.archive))
+        if entry is None:
+            return None
+
+        columns = self.columns(stations)
+        if columns is None:
+            return None
+
+        code, time, step = entry
+        values, present = self._open(code)
+
+        if not present[time, step]:
+            raise IOError(f"File does not exist: {path}")
+
+        return np.asarray(values[time, step].take(columns))
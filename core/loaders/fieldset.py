@@ -7,6 +7,9 @@ from typing import Union
 import metview
 import numpy as np
 
+from . import grib
+from .grid import GridGeometry, GridIndex, get_grid_geometry, get_grid_index
+
 logger = logging.getLogger(__name__)
 
 
@@ -23,13 +26,28 @@ class Fieldset(metview.Fieldset):
         return metview.grib_get_string(self, "name")
 
     @classmethod
-    def from_path(cls, path: Union[Path, str]):
+    def from_path(cls, path: Union[Path, str], points: np.ndarray = None):
+        """
+        Read a GRIB file.
+
+        :param points: (numpy.ndarray) Flat indices of grid points, as
+            returned by `nearest_gridpoint_indices`. If given, only the
+            values of these grid points are read, and returned as a numpy
+            array. GRIB messages with simple packing are decoded at the
+            given points only, and the other ones are decoded in full.
+        """
         if isinstance(path, Path):
             path = str(path)
 
         if not os.path.exists(path):
             raise IOError(f"File does not exist: {path}")
 
+        if points is not None:
+            values = grib.read_points(path, points)
+            if values is None:
+                values = cls.from_path(path).take(points)
+            return values
+
         obj = metview.read(path)
         obj.__class__ = cls
         return obj
@@ -58,6 +76,50 @@ class Fieldset(metview.Fieldset):
         """
         return metview.nearest_gridpoint(self, geopoints)
 
+    @property
+    def grid_key(self) -> str:
+        """
+        Identifier of the grid geometry of the GRIB data, computed by ecCodes
+        from the grid section of the message.
+        """
+        return metview.grib_get_string(self, "md5GridSection")
+
+    @property
+    def grid_index(self) -> GridIndex:
+        """
+        Spatial index of the grid points, shared by all the Fieldset
+        instances with the same grid geometry.
+
+        :rtype: GridIndex
+        """
+        return get_grid_index(
+            self.grid_key, lambda: (metview.latitudes(self), metview.longitudes(self))
+        )
+
+    def nearest_gridpoint_indices(self, latitudes, longitudes) -> np.ndarray:
+        """
+        Instance method to compute the flat indices of the grid points nearest
+        to a list of locations, for use with `take`.
+
+        :param latitudes: (numpy.ndarray) Latitudes of the locations.
+        :param longitudes: (numpy.ndarray) Longitudes of the locations.
+
+        :return: Flat indices of the nearest grid points.
+        :rtype: numpy.ndarray
+        """
+        return self.grid_index.query(latitudes, longitudes)
+
+    def take(self, indices) -> np.ndarray:
+        """
+        Instance method to extract the values of the grid points at the given
+        flat indices. Combined with `nearest_gridpoint_indices`, it gives the
+        same values as `nearest_gridpoint`.
+
+        :param indices: (numpy.ndarray) Flat indices of the grid points.
+        :rtype: numpy.ndarray
+        """
+        return self.values.take(indices)
+
     @property
     def values(self):
         """
@@ -73,6 +135,18 @@ class Fieldset(metview.Fieldset):
     def values(self, values):
         raise NotImplementedError
 
+    def with_values(self, values) -> "Fieldset":
+        """
+        Instance method to create a new Fieldset with the metadata of this
+        one, and the given values.
+
+        :param values: (numpy.ndarray) Values of the grid points.
+        :rtype: Fieldset
+        """
+        mv_fieldset = metview.set_values(self, values)
+        mv_fieldset.__class__ = type(self)
+        return mv_fieldset
+
     @classmethod
     def vector_of(cls, *args):
         """
@@ -90,10 +164,7 @@ class Fieldset(metview.Fieldset):
         sum_squared_values = sum(abs(term.values) ** 2 for term in args)
         values = np.sqrt(sum_squared_values)
 
-        mv_fieldset = metview.set_values(term_1, values)
-        mv_fieldset.__class__ = cls
-
-        return mv_fieldset
+        return term_1.with_values(values)
 
     @classmethod
     def max_of(cls, *args):
@@ -104,10 +175,7 @@ class Fieldset(metview.Fieldset):
 
         values = reduce(np.maximum, (arg.values for arg in args))
 
-        mv_fieldset = metview.set_values(term_1, values)
-        mv_fieldset.__class__ = cls
-
-        return mv_fieldset
+        return term_1.with_values(values)
 
     @classmethod
     def min_of(cls, *args):
@@ -118,10 +186,7 @@ class Fieldset(metview.Fieldset):
 
         values = reduce(np.minimum, (arg.values for arg in args))
 
-        mv_fieldset = metview.set_values(term_1, values)
-        mv_fieldset.__class__ = cls
-
-        return mv_fieldset
+        return term_1.with_values(values)
 
     def __add__(self, other):
         mv_fieldset = super().__add__(other)
@@ -162,6 +227,266 @@ class Fieldset(metview.Fieldset):
         return mv_fieldset
 
 
+def _shares_memory(expression, out: np.ndarray) -> bool:
+    """
+    Whether an operand of the expression of a lazy NumpyFieldset, at any
+    depth, holds values in `out`.
+    """
+    pending = [expression]
+
+    while pending:
+        _, operands = pending.pop()
+
+        for operand in operands:
+            if isinstance(operand, NumpyFieldset):
+                if operand._values is None:
+                    pending.append(operand._expression)
+                    continue
+
+                operand = operand._values
+
+            if isinstance(operand, np.ndarray) and np.shares_memory(operand, out):
+                return True
+
+    return False
+
+
+def _evaluate_expression(
+    expression, out: np.ndarray, out_is_free: bool = None
+) -> np.ndarray:
+    """
+    Evaluate the expression of a lazy NumpyFieldset into `out`.
+
+    The first lazy operand of every operation is evaluated into `out` as
+    well, and the operation is then done in place, so that a chain of
+    operations only needs the output buffer. The other lazy operands are
+    evaluated into buffers of their own.
+
+    :param out_is_free: Whether `out` can be overwritten before the last
+        operation, checked if not given.
+    """
+    function, operands = expression
+
+    # `out` cannot be overwritten by an operand if it holds the values of
+    # another one, at any depth of the expression, as with the running
+    # totals of the reductions. The buffers passed to the operands are free.
+    if out_is_free is None:
+        out_is_free = not _shares_memory(expression, out)
+
+    args = []
+    for operand in operands:
+        if isinstance(operand, NumpyFieldset):
+            if operand._values is not None:
+                operand = operand._values
+            elif out_is_free:
+                operand = _evaluate_expression(operand._expression, out, True)
+                out_is_free = False
+            else:
+                operand = _evaluate_expression(
+                    operand._expression, np.empty(operand._shape), True
+                )
+
+        args.append(operand)
+
+    return function(*args, out=out)
+
+
+class NumpyFieldset:
+    """
+    Field decoded once from a GRIB file, held as a numpy array of values
+    along with the geometry of its grid.
+
+    Unlike Fieldset, the arithmetic operators work on numpy arrays, and
+    return new instances without encoding any GRIB message. The GRIB
+    message the field was read from is kept as a template, and the values
+    are encoded only by `to_fieldset` and `write`. The reductions of
+    Fieldset, such as `Fieldset.max_of`, accept NumpyFieldset instances too.
+
+    The arithmetic is lazy: the operators build an expression, which is
+    evaluated in a single pass when the values are needed, with one output
+    buffer instead of a temporary array per operation.
+    """
+
+    __slots__ = ("_values", "_expression", "_shape", "geometry", "_template")
+
+    def __init__(self, values: np.ndarray, geometry: GridGeometry, template: Fieldset):
+        self._values = values
+        self._expression = None
+        self._shape = values.shape
+        self.geometry = geometry
+        self._template = template
+
+    @classmethod
+    def from_path(cls, path: Union[Path, str]) -> "NumpyFieldset":
+        return cls.from_fieldset(Fieldset.from_path(path))
+
+    @classmethod
+    def from_fieldset(cls, fieldset: Fieldset) -> "NumpyFieldset":
+        geometry = get_grid_geometry(
+            fieldset.grid_key,
+            lambda: (metview.latitudes(fieldset), metview.longitudes(fieldset)),
+        )
+
+        return cls(
+            values=np.asarray(fieldset.values, dtype=np.float64),
+            geometry=geometry,
+            template=fieldset,
+        )
+
+    @property
+    def values(self) -> np.ndarray:
+        """
+        Property to access the values of the field as a numpy array, which
+        evaluates the expression of the field if needed.
+
+        :rtype: numpy.ndarray
+        """
+        return self.evaluate()._values
+
+    @property
+    def is_lazy(self) -> bool:
+        return self._values is None
+
+    def evaluate(self, out: np.ndarray = None) -> "NumpyFieldset":
+        """
+        Instance method to compute the values of the field from its
+        expression, if not done yet. The expression is released afterwards.
+
+        :param out: (numpy.ndarray) Buffer receiving the values, allocated if
+            not given. It may hold the values of the first operand of the
+            expression, which are then updated in place.
+        :return: This instance.
+        :rtype: NumpyFieldset
+        """
+        if self._values is None:
+            if out is None:
+                out = np.empty(self._shape)
+
+            self._values = _evaluate_expression(self._expression, out)
+            self._expression = None
+
+        return self
+
+    @property
+    def units(self):
+        return self._template.units
+
+    @property
+    def name(self) -> str:
+        return self._template.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    @property
+    def grid_key(self) -> str:
+        return self.geometry.key
+
+    @property
+    def grid_index(self) -> GridIndex:
+        return self.geometry.grid_index
+
+    def nearest_gridpoint_indices(self, latitudes, longitudes) -> np.ndarray:
+        return self.grid_index.query(latitudes, longitudes)
+
+    def take(self, indices) -> np.ndarray:
+        return self.values.take(indices)
+
+    def with_values(self, values) -> "NumpyFieldset":
+        return type(self)(
+            values=np.asarray(values, dtype=np.float64),
+            geometry=self.geometry,
+            template=self._template,
+        )
+
+    def to_fieldset(self) -> Fieldset:
+        """
+        Encode the values in a GRIB message, with the metadata of the GRIB
+        message the field was read from.
+
+        :rtype: Fieldset
+        """
+        return self._template.with_values(self.values)
+
+    def write(self, path: Union[Path, str]):
+        metview.write(str(path), self.to_fieldset())
+
+    def _apply(self, function, other=None, reverse=False):
+        if other is None:
+            operands = (self,)
+        else:
+            if isinstance(other, NumpyFieldset) and other.geometry is not self.geometry:
+                raise ValueError(
+                    "Cannot combine fields with different grid geometries."
+                )
+
+            operands = (other, self) if reverse else (self, other)
+
+        obj = object.__new__(type(self))
+        obj._values = None
+        obj._expression = (function, operands)
+        obj._shape = self._shape
+        obj.geometry = self.geometry
+        obj._template = self._template
+        return obj
+
+    def __add__(self, other):
+        return self._apply(np.add, other)
+
+    def __radd__(self, other):
+        return self._apply(np.add, other, reverse=True)
+
+    def __sub__(self, other):
+        return self._apply(np.subtract, other)
+
+    def __rsub__(self, other):
+        return self._apply(np.subtract, other, reverse=True)
+
+    def __mul__(self, other):
+        return self._apply(np.multiply, other)
+
+    def __rmul__(self, other):
+        return self._apply(np.multiply, other, reverse=True)
+
+    def __truediv__(self, other):
+        return self._apply(np.true_divide, other)
+
+    def __rtruediv__(self, other):
+        return self._apply(np.true_divide, other, reverse=True)
+
+    def __pow__(self, other):
+        return self._apply(np.power, other)
+
+    def __neg__(self):
+        return self._apply(np.negative)
+
+    def __abs__(self):
+        return self._apply(np.abs)
+
+    # Like Metview, the comparisons give fields of 1 where true, 0 otherwise.
+
+    def __lt__(self, other):
+        return self._apply(np.less, other)
+
+    def __le__(self, other):
+        return self._apply(np.less_equal, other)
+
+    def __gt__(self, other):
+        return self._apply(np.greater, other)
+
+    def __ge__(self, other):
+        return self._apply(np.greater_equal, other)
+
+    def __eq__(self, other):
+        return self._apply(np.equal, other)
+
+    def __ne__(self, other):
+        return self._apply(np.not_equal, other)
+
+    __hash__ = None
+
+
 class NetCDF:
     def __init__(self, dataframe):
         self.dataframe = dataframe
@@ -1,8 +1,20 @@
+import operator
 import re
 from pathlib import Path
+from typing import Dict, List, Tuple, Union
 
 import metview
 import numpy
+import pandas
+
+# Value of the missing observations in the geopoints files.
+MISSING_VALUE = 3e38
+
+# Columns of the geopoints formats without a #COLUMNS section.
+FORMAT_COLUMNS = {
+    "STANDARD": ["latitude", "longitude", "level", "date", "time", "value"],
+    "XYV": ["longitude", "latitude", "value"],
+}
 
 
 def read(path: Path) -> metview.bindings.Geopoints:
@@ -19,6 +31,197 @@ def get_values(geopoints: metview.bindings.Geopoints) -> numpy.ndarray:
     return geopoints.values()
 
 
+class Geopoints:
+    """
+    Geopoints read without Metview, as numpy arrays by column, with the
+    metadata of the file.
+
+    It implements the parts of the interface of Metview geopoints used by
+    the loaders: the columns, the coordinates and values, the filtering
+    and the arithmetic on the values. Missing values are NaN, as with
+    Metview.
+    """
+
+    def __init__(self, data: Dict[str, numpy.ndarray], metadata: Dict[str, str] = None):
+        self._data = data
+        self.metadata = metadata or {}
+
+    def columns(self) -> List[str]:
+        return list(self._data)
+
+    def __getitem__(self, name: str) -> numpy.ndarray:
+        return self._data[name]
+
+    def __len__(self) -> int:
+        return len(self.latitudes())
+
+    def latitudes(self) -> numpy.ndarray:
+        return self._data["latitude"]
+
+    def longitudes(self) -> numpy.ndarray:
+        return self._data["longitude"]
+
+    @property
+    def value_column(self) -> str:
+        if "value" in self._data:
+            return "value"
+
+        return next(name for name in self._data if name.startswith("value_"))
+
+    def values(self) -> numpy.ndarray:
+        return self._data[self.value_column]
+
+    def with_values(self, values) -> "Geopoints":
+        data = dict(self._data)
+        data[self.value_column] = numpy.asarray(values, dtype=numpy.float64)
+        return type(self)(data, self.metadata)
+
+    def filter(self, mask) -> "Geopoints":
+        """
+        Keep the points where `mask`, geopoints or boolean array, is not 0.
+        """
+        if isinstance(mask, Geopoints):
+            mask = mask.values()
+
+        mask = numpy.asarray(mask) != 0
+        return type(self)(
+            {name: column[mask] for name, column in self._data.items()}, self.metadata
+        )
+
+    def _apply(self, function, other):
+        if isinstance(other, Geopoints):
+            other = other.values()
+
+        return self.with_values(function(self.values(), other))
+
+    def __add__(self, other):
+        return self._apply(operator.add, other)
+
+    def __sub__(self, other):
+        return self._apply(operator.sub, other)
+
+    def __mul__(self, other):
+        return self._apply(operator.mul, other)
+
+    def __truediv__(self, other):
+        return self._apply(operator.truediv, other)
+
+    def __pow__(self, other):
+        return self._apply(operator.pow, other)
+
+    # Like Metview, the comparisons give values of 1 where true, 0 otherwise.
+
+    def __lt__(self, other):
+        return self._apply(lambda a, b: (a < b).astype(numpy.float64), other)
+
+    def __le__(self, other):
+        return self._apply(lambda a, b: (a <= b).astype(numpy.float64), other)
+
+    def __gt__(self, other):
+        return self._apply(lambda a, b: (a > b).astype(numpy.float64), other)
+
+    def __ge__(self, other):
+        return self._apply(lambda a, b: (a >= b).astype(numpy.float64), other)
+
+
+def _read_header(path: Path) -> Tuple[str, List[str], Dict[str, str], int]:
+    """
+    Parse the header of a geopoints file.
+
+    :return: The format, the names of the columns, the metadata, and the
+        number of lines before the data.
+    """
+    format_, columns, metadata = "STANDARD", None, {}
+    section = None
+
+    with open(path) as f:
+        for count, line in enumerate(f, start=1):
+            line = line.strip()
+
+            if line == "#DATA":
+                break
+
+            if line.startswith("#FORMAT"):
+                format_ = line[len("#FORMAT"):].strip()
+                section = None
+            elif line in ("#COLUMNS", "#METADATA"):
+                section = line
+            elif line.startswith("#") or not line:
+                continue
+            elif section == "#COLUMNS":
+                columns = line.split()
+                section = None
+            elif section == "#METADATA" and "=" in line:
+                key, value = line.split("=", 1)
+                metadata[key] = value
+        else:
+            raise ValueError(f"#DATA section not found: {path}")
+
+    if format_ == "NCOLS":
+        if not columns:
+            raise ValueError(f"#COLUMNS section not found: {path}")
+    elif format_ in FORMAT_COLUMNS:
+        columns = FORMAT_COLUMNS[format_]
+    else:
+        raise ValueError(f"unsupported geopoints format: {format_}")
+
+    return format_, columns, metadata, count
+
+
+def read_native(path: Union[Path, str]) -> Geopoints:
+    """
+    Read a geopoints file in the standard, XYV or NCOLS format, without
+    Metview. The data section is parsed by the C parser of pandas.
+
+    :raises ValueError: For the other formats.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise IOError(f"File does not exist: {path}")
+
+    _, columns, metadata, header_lines = _read_header(path)
+
+    try:
+        frame = pandas.read_csv(
+            path,
+            skiprows=header_lines,
+            header=None,
+            names=columns,
+            index_col=False,
+            delim_whitespace=True,
+            comment="#",
+            dtype={"stnid": str},
+            float_precision="round_trip",
+        )
+    except pandas.errors.EmptyDataError:
+        frame = pandas.DataFrame({name: [] for name in columns})
+
+    data = {}
+    for name in columns:
+        if name == "stnid":
+            data[name] = frame[name].to_numpy(dtype=object)
+            continue
+
+        column = frame[name].to_numpy(dtype=numpy.float64)
+        if name == "value" or name.startswith("value_"):
+            column[column == MISSING_VALUE] = numpy.nan
+
+        data[name] = column
+
+    return Geopoints(data, metadata)
+
+
+def load(path: Path) -> Union[Geopoints, metview.bindings.Geopoints]:
+    """
+    Read a geopoints file with `read_native`, or with Metview for the
+    formats it does not support.
+    """
+    try:
+        return read_native(path)
+    except ValueError:
+        return read(path)
+
+
 def read_units(path: Path) -> str:
     with open(path) as f:
         while line := f.readline():
@@ -0,0 +1,241 @@
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+
+class SimplePacking:
+    """
+    Layout of the data section of a GRIB message encoded with simple
+    packing, where the value of the grid point `i` is stored in `bits` bits
+    at the bit offset `i * bits` of the packed data.
+
+    The values are decoded as ecCodes does: ((X * 2^E) + R) * 10^-D.
+    """
+
+    def __init__(
+        self,
+        grid_key: str,
+        size: int,
+        data_offset: int,
+        bits: int,
+        reference_value: float,
+        binary_scale_factor: int,
+        decimal_scale_factor: int,
+    ):
+        self.grid_key = grid_key
+        self.size = size
+        self.data_offset = data_offset
+        self.bits = bits
+        self.reference_value = reference_value
+        self.binary_scale_factor = binary_scale_factor
+        self.decimal_scale_factor = decimal_scale_factor
+
+    def decode(self, buffer: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Decode the values of the grid points at the flat `indices` from the
+        bytes of the GRIB file, reading only the bytes that hold them.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+
+        if indices.size and (indices.min() < 0 or indices.max() >= self.size):
+            raise IndexError(f"grid point index out of range (size: {self.size})")
+
+        offsets = indices * self.bits
+        shifts = (offsets % 8).astype(np.uint64)
+
+        # Every value spans at most `width` bytes, read as a big-endian word.
+        width = (self.bits + 7) // 8 + 1
+        positions = (self.data_offset + offsets // 8)[:, None] + np.arange(width)
+        chunks = buffer[np.minimum(positions, len(buffer) - 1)].astype(np.uint64)
+
+        words = np.zeros(len(indices), dtype=np.uint64)
+        for i in range(width):
+            words = (words << np.uint64(8)) | chunks[:, i]
+
+        packed = (words >> (np.uint64(8 * width - self.bits) - shifts)) & np.uint64(
+            (1 << self.bits) - 1
+        )
+
+        s = _power(self.binary_scale_factor, 2)
+        d = _power(-self.decimal_scale_factor, 10)
+        return (packed.astype(np.float64) * s + self.reference_value) * d
+
+
+def _power(s: int, n: int) -> float:
+    """Power of an integer, computed in the same way as ecCodes."""
+    value = 1.0
+
+    while s < 0:
+        value /= n
+        s += 1
+
+    while s > 0:
+        value *= n
+        s -= 1
+
+    return value
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big")
+
+
+def _sign_magnitude(data: bytes) -> int:
+    value = _uint(data)
+    sign_bit = 1 << (8 * len(data) - 1)
+    return -(value & ~sign_bit) if value & sign_bit else value
+
+
+def _ibm_float(data: bytes) -> float:
+    sign = -1.0 if data[0] & 0x80 else 1.0
+    exponent = data[0] & 0x7F
+    mantissa = _uint(data[1:4])
+    return sign * mantissa * 2.0 ** (4 * (exponent - 64) - 24)
+
+
+def _grid_key(edition: int, section: bytes) -> str:
+    return f"{edition}:{hashlib.md5(section).hexdigest()}"
+
+
+def _parse_grib1(buffer: np.ndarray) -> Optional[SimplePacking]:
+    length = _uint(bytes(buffer[4:7]))
+
+    # Large ECMWF messages use a special encoding of the length.
+    if length & 0x800000 or length != len(buffer):
+        return None
+
+    pds = 8
+    pds_length = _uint(bytes(buffer[pds: pds + 3]))
+    flags = int(buffer[pds + 7])
+    has_gds, has_bms = flags & 0x80, flags & 0x40
+
+    if not has_gds or has_bms:
+        return None
+
+    decimal_scale_factor = _sign_magnitude(bytes(buffer[pds + 26: pds + 28]))
+
+    gds = pds + pds_length
+    gds_length = _uint(bytes(buffer[gds: gds + 3]))
+
+    bds = gds + gds_length
+    header = bytes(buffer[bds: bds + 11])
+    bds_length = _uint(header[0:3])
+    bds_flags = header[3]
+    bits = header[10]
+
+    # Spherical harmonics, second-order packing, or additional flags.
+    if bds_flags & 0xD0 or not 0 < bits <= 56:
+        return None
+
+    unused_bits = bds_flags & 0x0F
+
+    return SimplePacking(
+        grid_key=_grid_key(1, bytes(buffer[gds: gds + gds_length])),
+        size=((bds_length - 11) * 8 - unused_bits) // bits,
+        data_offset=bds + 11,
+        bits=bits,
+        reference_value=_ibm_float(header[6:10]),
+        binary_scale_factor=_sign_magnitude(header[4:6]),
+        decimal_scale_factor=decimal_scale_factor,
+    )
+
+
+def _parse_grib2(buffer: np.ndarray) -> Optional[SimplePacking]:
+    if _uint(bytes(buffer[8:16])) != len(buffer):
+        return None
+
+    sections = {}
+    offset = 16
+
+    while bytes(buffer[offset: offset + 4]) != b"7777":
+        length = _uint(bytes(buffer[offset: offset + 4]))
+        number = int(buffer[offset + 4])
+
+        # Messages holding several fields repeat some of the sections.
+        if number in sections or length < 5:
+            return None
+
+        sections[number] = (offset, length)
+        offset += length
+
+    if not {3, 5, 6, 7} <= set(sections):
+        return None
+
+    grid_offset, grid_length = sections[3]
+    drs = bytes(buffer[sections[5][0]: sections[5][0] + 21])
+    bitmap_indicator = int(buffer[sections[6][0] + 5])
+
+    template, bits = _uint(drs[9:11]), drs[19]
+
+    if template != 0 or bitmap_indicator != 255 or not 0 < bits <= 56:
+        return None
+
+    return SimplePacking(
+        grid_key=_grid_key(2, bytes(buffer[grid_offset: grid_offset + grid_length])),
+        size=_uint(drs[5:9]),
+        data_offset=sections[7][0] + 5,
+        bits=bits,
+        reference_value=struct.unpack(">f", drs[11:15])[0],
+        binary_scale_factor=_sign_magnitude(drs[15:17]),
+        decimal_scale_factor=_sign_magnitude(drs[17:19]),
+    )
+
+
+def _map(path: Union[Path, str]) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=np.uint8)
+
+    return np.memmap(str(path), dtype=np.uint8, mode="r")
+
+
+def read_simple_packing(buffer: np.ndarray) -> Optional[SimplePacking]:
+    """
+    Parse the sections of a GRIB file holding a single message, and return
+    the layout of its data if it is encoded with simple packing, without
+    a bitmap. Other files return None.
+    """
+    if len(buffer) < 16 or bytes(buffer[0:4]) != b"GRIB":
+        return None
+
+    edition = int(buffer[7])
+
+    try:
+        if edition == 1:
+            return _parse_grib1(buffer)
+        if edition == 2:
+            return _parse_grib2(buffer)
+    except (IndexError, ValueError, struct.error):
+        return None
+
+    return None
+
+
+def read_points(path: Union[Path, str], indices: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Read the values of the grid points at the flat `indices` from a GRIB
+    file with simple packing. The file is memory-mapped, so that only the
+    pages holding the values are read.
+
+    :return: The values, or None if the file is not a single GRIB message
+        with simple packing, and has to be decoded in full.
+    """
+    buffer = _map(path)
+    packing = read_simple_packing(buffer)
+
+    if packing is None:
+        return None
+
+    return packing.decode(buffer, indices)
+
+
+def read_grid_key(path: Union[Path, str]) -> Optional[str]:
+    """
+    Identifier of the grid of a GRIB file with simple packing, computed from
+    the bytes of its grid section, or None for other files.
+    """
+    packing = read_simple_packing(_map(path))
+    return packing.grid_key if packing else None
@@ -0,0 +1,119 @@
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def to_cartesian(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """
+    Convert geographical coordinates (in degrees) to points on the unit
+    sphere, as a (N, 3) array.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    cos_lat = np.cos(lat)
+
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class GridIndex:
+    """
+    Spatial index of the points of a model grid, to map geographical
+    locations to the flat index of their nearest grid point.
+
+    The grid points are stored in a KD-tree on the unit sphere. The chord
+    distance is monotonic with the great-circle distance, so the nearest
+    point found is the same as the one chosen by metview.nearest_gridpoint,
+    except for locations equidistant from several grid points.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        self.size = len(latitudes)
+        self._tree = cKDTree(to_cartesian(latitudes, longitudes))
+
+    def query(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """
+        :param latitudes: Latitudes of the locations, in degrees North.
+        :param longitudes: Longitudes of the locations, in degrees East.
+
+        :return: Flat indices of the nearest grid points.
+        :rtype: numpy.ndarray
+        """
+        if len(latitudes) == 0:
+            return np.empty(0, dtype=np.intp)
+
+        _, indices = self._tree.query(to_cartesian(latitudes, longitudes))
+        return indices.astype(np.intp)
+
+
+# Grid indices are expensive to build, and the model grid rarely changes
+# during a run, so they are shared by all the fields with the same geometry.
+_grid_indices: Dict[str, GridIndex] = {}
+
+
+def get_grid_index(
+    key: str, coordinates: Callable[[], Tuple[np.ndarray, np.ndarray]]
+) -> GridIndex:
+    """
+    Get the GridIndex of the grid geometry identified by `key`, building it
+    from the (latitudes, longitudes) returned by `coordinates` if needed.
+    """
+    if key not in _grid_indices:
+        _grid_indices[key] = GridIndex(*coordinates())
+
+    return _grid_indices[key]
+
+
+def find_grid_index(key: str) -> Optional[GridIndex]:
+    """
+    Get the GridIndex of the grid geometry identified by `key`, if it was
+    already built.
+    """
+    return _grid_indices.get(key)
+
+
+class GridGeometry:
+    """
+    Immutable description of the geometry of a model grid: the coordinates
+    of its points, and their spatial index. Instances are shared by all the
+    fields with the same geometry, and their arrays are read-only.
+    """
+
+    __slots__ = ("key", "latitudes", "longitudes")
+
+    def __init__(self, key: str, latitudes: np.ndarray, longitudes: np.ndarray):
+        latitudes = np.array(latitudes, dtype=np.float64)
+        longitudes = np.array(longitudes, dtype=np.float64)
+        latitudes.flags.writeable = False
+        longitudes.flags.writeable = False
+
+        object.__setattr__(self, "key", key)
+        object.__setattr__(self, "latitudes", latitudes)
+        object.__setattr__(self, "longitudes", longitudes)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def size(self) -> int:
+        return len(self.latitudes)
+
+    @property
+    def grid_index(self) -> GridIndex:
+        return get_grid_index(self.key, lambda: (self.latitudes, self.longitudes))
+
+
+_grid_geometries: Dict[str, GridGeometry] = {}
+
+
+def get_grid_geometry(
+    key: str, coordinates: Callable[[], Tuple[np.ndarray, np.ndarray]]
+) -> GridGeometry:
+    """
+    Get the GridGeometry identified by `key`, building it from the
+    (latitudes, longitudes) returned by `coordinates` if needed.
+    """
+    if key not in _grid_geometries:
+        _grid_geometries[key] = GridGeometry(key, *coordinates())
+
+    return _grid_geometries[key]
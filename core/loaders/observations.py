@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import re
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from . import geopoints as geopoints_loader
+
+# Columns of the observation store. The date and hour of validity of the
+# observations are the keys of the row groups, and are kept in the metadata.
+SCHEMA = pa.schema(
+    [
+        ("stnid", pa.string()),
+        ("latitude", pa.float64()),
+        ("longitude", pa.float64()),
+        ("value", pa.float64()),
+    ]
+)
+
+_GEO_FILE_NAME = re.compile(r"_(\d{8})_(\d{2})\.geo$")
+
+
+def get_store_path(
+    store: Path, code: str, accumulation: Optional[int], validity: datetime
+) -> Path:
+    """
+    Path of the file of the observation store holding the observations of a
+    validity time. The store has a directory by accumulation, like the .geo
+    archive, and a file by month.
+    """
+    month = validity.strftime("%Y%m")
+
+    if accumulation is not None:
+        return (
+            store
+            / f"Acc{accumulation:02}h"
+            / f"{code}_{accumulation:02d}_{month}.parquet"
+        )
+
+    return store / f"{code}_{month}.parquet"
+
+
+def read_geo_file(path: Path) -> pa.Table:
+    geopoints = geopoints_loader.load(path=path)
+    size = len(geopoints)
+
+    if size and "stnid" in geopoints.columns():
+        stnid = [str(value) for value in geopoints["stnid"]]
+    else:
+        stnid = [None] * size
+
+    return pa.Table.from_arrays(
+        [
+            pa.array(stnid, type=pa.string()),
+            pa.array(np.asarray(geopoints.latitudes(), dtype=np.float64)),
+            pa.array(np.asarray(geopoints.longitudes(), dtype=np.float64)),
+            pa.array(
+                np.asarray(geopoints_loader.get_values(geopoints), dtype=np.float64)
+            ),
+        ],
+        schema=SCHEMA,
+    )
+
+
+def ingest(
+    archive: Path, store: Path, code: str, accumulation: Optional[int] = None
+) -> int:
+    """
+    Convert the .geo files of an observation archive to the Parquet files of
+    an observation store.
+
+    The archive has the layout read by run(): `Acc{acc}h/{date}/` for the
+    accumulated parameters, and `{date}/` for the others. Every .geo file
+    becomes a row group of the file of its month in the store, and the
+    index of the row groups by validity time is saved in the metadata.
+    Unreadable files are left out of the store, and are reported as missing
+    by run().
+
+    :return: The number of .geo files converted.
+    """
+    if accumulation is not None:
+        pattern = f"Acc{accumulation:02}h/*/{code}_{accumulation:02d}_*.geo"
+    else:
+        pattern = f"*/{code}_*.geo"
+
+    months = defaultdict(list)
+    for path in archive.glob(pattern):
+        match = _GEO_FILE_NAME.search(path.name)
+        if match:
+            validity = datetime.strptime("".join(match.groups()), "%Y%m%d%H")
+            months[validity.strftime("%Y%m")].append((validity, path))
+
+    count = 0
+    for _, paths in sorted(months.items()):
+        # Row group of every validity time, or None if it has no observation.
+        index = {}
+        tables = []
+        units = None
+
+        for validity, path in sorted(paths):
+            try:
+                table = read_geo_file(path)
+            except Exception:
+                logging.error(f"Error reading observation file: {path}")
+                continue
+
+            if units is None:
+                try:
+                    units = geopoints_loader.read_units(path)
+                except ValueError:
+                    pass
+
+            key = validity.strftime("%Y%m%d%H")
+
+            if table.num_rows == 0:
+                index[key] = None
+            else:
+                index[key] = len(tables)
+                tables.append(table)
+
+        out_path = get_store_path(store, code, accumulation, paths[0][0])
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{out_path}.tmp"
+
+        schema = SCHEMA.with_metadata(
+            {"index": json.dumps(index), "units": units or ""}
+        )
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for table in tables:
+                writer.write_table(table.replace_schema_metadata(schema.metadata))
+
+        os.replace(tmp_path, out_path)
+        count += len(index)
+
+        logging.info(f"Observation store: {len(index)} validity time(s) in {out_path}")
+
+    return count
+
+
+class ObservationStore:
+    """
+    Reader of the observations of a parameter from an observation store.
+
+    The files of the store are memory-mapped, and only the coordinates and
+    values of the row group of a validity time are read. The files of the
+    last months read are kept open across cases.
+    """
+
+    def __init__(self, path: Path, code: str, accumulation: Optional[int] = None):
+        self.path = Path(path)
+        self.code = code
+        self.accumulation = accumulation
+
+        self._files = OrderedDict()
+
+    def get_path(self, validity: datetime) -> Path:
+        return get_store_path(self.path, self.code, self.accumulation, validity)
+
+    def _open(self, path: Path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise IOError(f"File does not exist: {path}")
+
+        key = (str(path), stat.st_mtime_ns)
+
+        if key not in self._files:
+            parquet_file = pq.ParquetFile(str(path), memory_map=True)
+            index = json.loads(parquet_file.metadata.metadata[b"index"])
+            self._files[key] = (parquet_file, index)
+
+            while len(self._files) > 2:
+                self._files.popitem(last=False)
+
+        self._files.move_to_end(key)
+        return self._files[key]
+
+    def read(self, validity: datetime) -> Dict[str, np.ndarray]:
+        """
+        Read the observations of a validity time.
+
+        :return: The latitudes, longitudes and values of the observations.
+        :raises IOError: If the validity time is not in the store.
+        """
+        path = self.get_path(validity)
+        parquet_file, index = self._open(path)
+
+        key = validity.strftime("%Y%m%d%H")
+        if key not in index:
+            raise IOError(f"Observations of {key} not found in {path}")
+
+        columns = ["latitude", "longitude", "value"]
+
+        if index[key] is None:
+            return {name: np.empty(0, dtype=np.float64) for name in columns}
+
+        table = parquet_file.read_row_group(index[key], columns=columns)
+
+        return {name: table.column(name).to_numpy() for name in columns}
@@ -1,7 +1,10 @@
+import json
+import os
+import struct
 from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 
 import attr
 import numpy as np
@@ -9,7 +12,205 @@ import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 
-from core.loaders import BasePointDataReader
+from core.loaders import BasePointDataReader, thrift
+
+# Columns of the point data tables holding dates, stored as dictionaries of
+# the dates of the table.
+DATE_COLUMNS = ("BaseDate", "DateOBS")
+
+
+def merge_parquet_files(
+    paths: List[str],
+    path: str,
+    metadata: Optional[dict] = None,
+    schema: Optional[pa.Schema] = None,
+    **options,
+):
+    """
+    Concatenate Parquet files with the same schema into a single file, one
+    row group at a time. The schema metadata of the output is replaced by
+    `metadata`, if given.
+
+    The schema of the output is the one of the first file, unless `schema`
+    is given, in which case the row groups are cast to it. The `options`
+    are passed to the ParquetWriter, like the compression.
+    """
+    if schema is None:
+        schema = pq.read_schema(paths[0])
+
+    if metadata is not None:
+        schema = schema.with_metadata(metadata)
+
+    with pq.ParquetWriter(f"{path}", schema, **options) as pq_writer:
+        for part in paths:
+            pq_file = pq.ParquetFile(part)
+
+            for i in range(pq_file.num_row_groups):
+                table = pq_file.read_row_group(i)
+                pq_writer.write_table(table.cast(schema))
+
+
+def _read_parquet_footer(f) -> Tuple[int, bytes]:
+    """
+    Position and bytes of the footer of an open Parquet file. The file ends
+    with the footer, its length and the magic bytes.
+    """
+    f.seek(-8, os.SEEK_END)
+    (length,) = struct.unpack("<i", f.read(4))
+    position = f.seek(-8 - length, os.SEEK_END)
+
+    return position, f.read(length)
+
+
+def _parse_parquet_footer(footer: bytes) -> pq.FileMetaData:
+    data = b"PAR1" + footer + struct.pack("<i", len(footer)) + b"PAR1"
+    return pq.read_metadata(pa.BufferReader(data))
+
+
+def _write_parquet_footer(f, position: int, schema: pa.Schema, row_groups: list):
+    """
+    Write the footer of a Parquet file with the `schema` and the row groups
+    of the FileMetaData `row_groups`, at `position` in the open file.
+    """
+    # Footer of an empty file with the schema, plus the row groups.
+    sink = pa.BufferOutputStream()
+    pq.ParquetWriter(sink, schema).close()
+    file_metadata = pq.read_metadata(pa.BufferReader(sink.getvalue()))
+
+    for metadata in row_groups:
+        file_metadata.append_row_groups(metadata)
+
+    sink = pa.BufferOutputStream()
+    file_metadata.write_metadata_file(sink)
+
+    # The written metadata file starts with the magic bytes.
+    f.seek(position)
+    f.write(sink.getvalue().to_pybytes()[4:])
+    f.truncate()
+
+
+def _move_parquet_row_groups(footer: bytes, shift: int) -> bytes:
+    """
+    Footer of a Parquet file with the row groups moved `shift` bytes further
+    in the file.
+    """
+    file_metadata, _ = thrift.read_struct(footer)
+
+    # Offsets in the FileMetaData, RowGroup, ColumnChunk and ColumnMetaData
+    # structs of parquet.thrift, by field id.
+    offsets = {
+        "RowGroup": {5},
+        "ColumnChunk": {2, 4, 6},
+        "ColumnMetaData": {9, 10, 11, 14},
+    }
+
+    def move(fields, name):
+        for item in fields:
+            if item[0] in offsets[name]:
+                item[2] += shift
+
+    for field_id, _, value in file_metadata:
+        if field_id != 4:
+            continue
+
+        for row_group in value[1]:
+            move(row_group, "RowGroup")
+
+            for column in next(item[2][1] for item in row_group if item[0] == 1):
+                move(column, "ColumnChunk")
+
+                for item in column:
+                    if item[0] == 3:
+                        move(item[2], "ColumnMetaData")
+
+    return thrift.write_struct(file_metadata)
+
+
+def replace_parquet_metadata(path: str, metadata: dict):
+    """
+    Replace the schema metadata of a Parquet file by `metadata`, rewriting
+    the footer of the file only. The row groups are left in place, so the
+    cost does not depend on the size of the table.
+    """
+    schema = pq.read_schema(path).with_metadata(metadata)
+
+    with open(path, "r+b") as f:
+        position, footer = _read_parquet_footer(f)
+        _write_parquet_footer(f, position, schema, [_parse_parquet_footer(footer)])
+
+
+def append_parquet_files(paths: List[str], path: str, metadata: dict, **options):
+    """
+    Append the row groups of Parquet files to the Parquet file at `path`,
+    and replace its schema metadata by `metadata`.
+
+    The row groups of the file are left in place: the new ones are written
+    over its footer, followed by the footer of all the row groups, so the
+    cost only depends on the size of the new rows. The new row groups are
+    cast to the schema of the file. The `options` are passed to the
+    ParquetWriter, like the compression.
+    """
+    if not paths:
+        return replace_parquet_metadata(path, metadata)
+
+    schema = pq.read_schema(path).with_metadata(metadata)
+
+    # The new row groups are merged in a single file, and its bytes are
+    # copied at the end of the table.
+    tmp_path = f"{path}.append"
+    merge_parquet_files(paths, tmp_path, schema=schema, **options)
+
+    try:
+        with open(tmp_path, "rb") as src, open(path, "r+b") as f:
+            end, new_footer = _read_parquet_footer(src)
+            position, footer = _read_parquet_footer(f)
+
+            try:
+                f.seek(position)
+                src.seek(4)
+
+                while src.tell() < end:
+                    f.write(src.read(min(end - src.tell(), 16 * 1024 ** 2)))
+
+                # The row groups of the new file start after its magic bytes.
+                new_footer = _move_parquet_row_groups(new_footer, position - 4)
+                _write_parquet_footer(
+                    f,
+                    f.tell(),
+                    schema,
+                    [_parse_parquet_footer(footer), _parse_parquet_footer(new_footer)],
+                )
+            except BaseException:
+                # The table is left as it was.
+                f.seek(position)
+                f.write(footer + struct.pack("<i", len(footer)) + b"PAR1")
+                f.truncate()
+                raise
+    finally:
+        os.remove(tmp_path)
+
+
+def _to_arrow(values, type_: pa.DataType, size: int) -> pa.Array:
+    """
+    Arrow array of a column of a chunk, from an array of values, or from a
+    scalar repeated `size` times.
+    """
+    if pa.types.is_dictionary(type_):
+        if np.ndim(values) == 0:
+            return pa.DictionaryArray.from_arrays(
+                np.zeros(size, dtype=type_.index_type.to_pandas_dtype()),
+                pa.array([values], type=type_.value_type),
+            )
+
+        array = pa.array(values, type=type_.value_type).dictionary_encode()
+        return array if array.type == type_ else array.cast(type_)
+
+    values = np.asarray(values).astype(type_.to_pandas_dtype(), copy=False)
+    if values.ndim == 0:
+        values = np.full(size, values)
+
+    # NaN are missing values, like in pa.Table.from_pandas().
+    return pa.array(values, type=type_, from_pandas=True)
 
 
 @attr.s(slots=True)
@@ -17,11 +218,62 @@ class ParquetPointDataTableWriter:
     # Public attributes
     path = attr.ib()
 
+    # Write the table in part files, merged on close(), so that the writer
+    # can be checkpointed.
+    checkpoints = attr.ib(default=False)
+
+    # Append the rows to the table already at `path` on close(), instead of
+    # replacing it. The table is written in part files, like with the
+    # checkpoints, and its row groups are not rewritten.
+    extend = attr.ib(default=False)
+
+    # Target size of the row groups, in rows and in bytes of Arrow data. The
+    # chunks are buffered until either is reached, and on close() and
+    # checkpoint().
+    row_group_size = attr.ib(converter=int, default=100000)
+    row_group_bytes = attr.ib(converter=int, default=64 * 1024 ** 2)
+
+    # Compression codec and level of the Parquet file. The level is the
+    # default one of the codec if None.
+    compression = attr.ib(converter=str, default="snappy")
+    compression_level = attr.ib(default=None)
+
+    # Schema of the table, if known up front. The chunks are then converted
+    # to Arrow arrays of the schema directly, without pandas. Otherwise, the
+    # schema is inferred from the first chunk.
+    table_schema = attr.ib(default=None)
+
     # Internal instance attributes
     _metadata = attr.ib(default=None)
     _schema = attr.ib(default=None)
-    _is_first_column_written = attr.ib(default=False)
+    _schema_metadata = attr.ib(default=None)
     _pq_writer = attr.ib(default=None)
+    _written = attr.ib(default=False)
+    _parts = attr.ib(factory=list)
+    _buffer = attr.ib(factory=list)
+
+    def __attrs_post_init__(self):
+        self._schema = self.table_schema
+
+        # The settings are saved in the footer of the file, with the schema.
+        self.add_metadata("writer", json.dumps(self.settings))
+
+    @property
+    def settings(self) -> dict:
+        return {
+            "row_group_size": self.row_group_size,
+            "row_group_bytes": self.row_group_bytes,
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+        }
+
+    @property
+    def _writer_options(self) -> dict:
+        return {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": True,
+        }
 
     @property
     def metadata(self) -> dict:
@@ -32,11 +284,12 @@ class ParquetPointDataTableWriter:
 
     @staticmethod
     def _cast_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-        date_columns = ("BaseDate", "DateOBS")
         int_columns = ("BaseTime", "TimeOBS", "StepF" if "StepF" in df else "Step")
         float_columns = df.select_dtypes(include=[np.float]).columns.to_list()
 
-        for col in date_columns:
+        # The categories become Arrow dictionaries, dictionary-encoded in
+        # the Parquet file.
+        for col in DATE_COLUMNS:
             df[col] = df[col].astype("category")
 
         for col in int_columns:
@@ -47,27 +300,176 @@ class ParquetPointDataTableWriter:
 
         return df
 
+    @property
+    def _current_path(self) -> str:
+        if self.checkpoints or self.extend:
+            return f"{self.path}.part-{len(self._parts):05d}"
+
+        return f"{self.path}"
+
     def append(self, dataframe: pd.DataFrame) -> None:
         dataframe = self._cast_dataframe(dataframe)
 
-        if not self._is_first_column_written:
-            # Infer DataFrame schema from the first chunk.
+        if self._schema is None:
+            # Infer DataFrame schema from the first chunk, and save it for
+            # future append() calls.
             table = pa.Table.from_pandas(dataframe)
+            self._schema = table.schema
+        else:
+            table = pa.Table.from_pandas(dataframe, self._schema)
 
+        self._buffer_table(table)
+
+    def append_columns(self, columns) -> None:
+        """
+        Append a chunk of columns of the schema, as (name, values) pairs.
+        The values are arrays, or scalars repeated on every row of the
+        chunk.
+        """
+        columns = dict(columns)
+
+        if set(columns) != set(self.table_schema.names):
+            raise ValueError(
+                f"The columns {list(columns)} do not match the schema of the "
+                f"point data table: {self.table_schema.names}"
+            )
+
+        sizes = {len(values) for values in columns.values() if np.ndim(values)}
+        if len(sizes) != 1:
+            raise ValueError(f"Columns of different or unknown lengths: {sizes}")
+
+        (size,) = sizes
+        table = pa.Table.from_arrays(
+            [
+                _to_arrow(columns[field.name], field.type, size)
+                for field in self.table_schema
+            ],
+            schema=self.table_schema,
+        )
+
+        self._buffer_table(table)
+
+    def _buffer_table(self, table: pa.Table) -> None:
+        self._buffer.append(table)
+
+        if (
+            sum(table.num_rows for table in self._buffer) >= self.row_group_size
+            or sum(table.nbytes for table in self._buffer) >= self.row_group_bytes
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered chunks to the Parquet file, as a single row group.
+        """
+        if not self._buffer:
+            return
+
+        if self._pq_writer is None:
+            # The metadata is written with the schema, when the first row
+            # group is written.
             if self.metadata:
-                table = table.replace_schema_metadata(self.metadata)
+                self._schema = self._schema.with_metadata(self.metadata)
+
+            self._schema_metadata = self.metadata
+            self._pq_writer = pq.ParquetWriter(
+                self._current_path, self._schema, **self._writer_options
+            )
+            self._written = True
+
+        table = pa.concat_tables(
+            [
+                table.replace_schema_metadata(self._schema.metadata)
+                for table in self._buffer
+            ]
+        )
+        self._buffer = []
+
+        self._pq_writer.write_table(table, row_group_size=table.num_rows)
+
+    def checkpoint(self) -> dict:
+        """
+        Close the part file being written, and return the state needed to
+        resume writing the table from this point, after an interruption.
+        """
+        if not self.checkpoints:
+            raise ValueError("checkpoints are not enabled for this writer")
+
+        self.flush()
 
-            # Save schema for future append() calls.
-            self._schema = table.schema
+        if self._pq_writer:
+            self._pq_writer.close()
+            self._pq_writer = None
+            self._parts.append(self._current_path)
 
-            self._pq_writer = pq.ParquetWriter(f"{self.path}", self._schema)
-            self._is_first_column_written = True
-        else:
-            table = pa.Table.from_pandas(dataframe, self._schema)
+        return {"parts": list(self._parts), "extend": self.extend}
+
+    def resume(self, state: dict, header: str):
+        """
+        Continue writing a table from a checkpoint. Part files written after
+        the checkpoint are discarded.
+        """
+        self.checkpoints = True
+        self.extend = state.get("extend", False)
+        self._parts = list(state["parts"])
+
+        for part in Path(self.path).parent.glob(f"{Path(self.path).name}.part-*"):
+            if str(part) not in self._parts:
+                part.unlink()
 
-        self._pq_writer.write_table(table)
+        if self.table_schema is None:
+            if self.extend:
+                self._schema = pq.read_schema(self.path)
+            elif self._parts:
+                self._schema = pq.read_schema(self._parts[0])
+
+        self.add_header(header)
 
     def close(self):
+        self.flush()
+
+        if self._pq_writer:
+            self._pq_writer.close()
+            self._pq_writer = None
+
+            if self.checkpoints or self.extend:
+                self._parts.append(self._current_path)
+
+        if self.extend:
+            append_parquet_files(
+                self._parts, self.path, self.metadata, **self._writer_options
+            )
+
+            for part in self._parts:
+                os.remove(part)
+
+            self._parts = []
+        elif self.checkpoints and self._parts:
+            merge_parquet_files(
+                self._parts, self.path, metadata=self.metadata, **self._writer_options
+            )
+
+            for part in self._parts:
+                os.remove(part)
+
+            self._parts = []
+        elif self._written and self.metadata != self._schema_metadata:
+            # The metadata of a Parquet file is written with the schema, when
+            # the first row group is written. Metadata added afterwards, like
+            # the footer, replaces it in the footer of the file. No file is
+            # written if the table has no rows.
+            replace_parquet_metadata(f"{self.path}", self.metadata)
+
+        self._schema_metadata = self.metadata
+
+    def abort(self):
+        """
+        Close the file being written after a failure, with the buffered
+        chunks but without the footer. The part files of the checkpoints are
+        not merged, so that the table can be resumed from the last one.
+        """
+        self.flush()
+
         if self._pq_writer:
             self._pq_writer.close()
             self._pq_writer = None
@@ -76,6 +478,9 @@ class ParquetPointDataTableWriter:
     # | Compatibility methods to follow the API of ASCIIEncoder. |
     # +----------------------------------------------------------+
     def add_columns_chunk(self, columns):
+        if self.table_schema is not None:
+            return self.append_columns(columns)
+
         df = pd.DataFrame.from_dict(OrderedDict(columns))
         return self.append(df)
 
@@ -142,6 +547,7 @@ class ParquetPointDataTableReader(BasePointDataReader):
             encoder.add_columns_chunk(filtered_chunk.to_dict())
 
         encoder.add_footer(self.metadata.get("footer", ""))
+        encoder.close()
 
     def __iter__(self) -> "ParquetPointDataTableReader":
         self._current_row_group = 0
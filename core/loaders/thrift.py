@@ -0,0 +1,201 @@
+"""
+Reader and writer of the Thrift compact protocol, the encoding of the
+footers of the Parquet files.
+
+The structs are read as lists of [field id, type, value] items, in the
+order of the data, so that they can be written back after changing a few
+fields, without the definitions of the structs. The lists and sets are read
+as (element type, values) pairs.
+"""
+import struct
+from typing import List, Tuple
+
+STOP = 0
+TRUE = 1
+FALSE = 2
+BYTE = 3
+I16 = 4
+I32 = 5
+I64 = 6
+DOUBLE = 7
+BINARY = 8
+LIST = 9
+SET = 10
+MAP = 11
+STRUCT = 12
+
+
+class CompactReader:
+    def __init__(self, data: bytes, position: int = 0):
+        self.data = data
+        self.position = position
+
+    def read_byte(self) -> int:
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def read_varint(self) -> int:
+        value = shift = 0
+
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7F) << shift
+            shift += 7
+
+            if not byte & 0x80:
+                return value
+
+    def read_int(self) -> int:
+        value = self.read_varint()
+        return (value >> 1) ^ -(value & 1)
+
+    def read_value(self, type_: int):
+        if type_ in (TRUE, FALSE, BYTE):
+            # Booleans are a byte in the lists, and have no value in the
+            # structs, where the type holds the value.
+            return self.read_byte()
+
+        if type_ in (I16, I32, I64):
+            return self.read_int()
+
+        if type_ == DOUBLE:
+            (value,) = struct.unpack_from("<d", self.data, self.position)
+            self.position += 8
+            return value
+
+        if type_ == BINARY:
+            size = self.read_varint()
+            value = self.data[self.position : self.position + size]
+            self.position += size
+            return value
+
+        if type_ in (LIST, SET):
+            header = self.read_byte()
+            size = header >> 4
+            if size == 15:
+                size = self.read_varint()
+
+            element_type = header & 0x0F
+            return element_type, [self.read_value(element_type) for _ in range(size)]
+
+        if type_ == MAP:
+            size = self.read_varint()
+            if not size:
+                return 0, 0, []
+
+            header = self.read_byte()
+            key_type, value_type = header >> 4, header & 0x0F
+            items = [
+                (self.read_value(key_type), self.read_value(value_type))
+                for _ in range(size)
+            ]
+            return key_type, value_type, items
+
+        if type_ == STRUCT:
+            return self.read_struct()
+
+        raise ValueError(f"Unknown Thrift compact type: {type_}")
+
+    def read_struct(self) -> List[list]:
+        fields = []
+        field_id = 0
+
+        while True:
+            header = self.read_byte()
+            type_ = header & 0x0F
+
+            if type_ == STOP:
+                return fields
+
+            delta = header >> 4
+            field_id = field_id + delta if delta else self.read_int()
+
+            if type_ in (TRUE, FALSE):
+                fields.append([field_id, type_, None])
+            else:
+                fields.append([field_id, type_, self.read_value(type_)])
+
+
+class CompactWriter:
+    def __init__(self):
+        self.data = bytearray()
+
+    def write_varint(self, value: int):
+        while value > 0x7F:
+            self.data.append(value & 0x7F | 0x80)
+            value >>= 7
+
+        self.data.append(value)
+
+    def write_int(self, value: int):
+        self.write_varint((value << 1) ^ (value >> 63))
+
+    def write_value(self, type_: int, value):
+        if type_ in (TRUE, FALSE, BYTE):
+            self.data.append(value & 0xFF)
+        elif type_ in (I16, I32, I64):
+            self.write_int(value)
+        elif type_ == DOUBLE:
+            self.data += struct.pack("<d", value)
+        elif type_ == BINARY:
+            self.write_varint(len(value))
+            self.data += value
+        elif type_ in (LIST, SET):
+            element_type, values = value
+
+            if len(values) < 15:
+                self.data.append(len(values) << 4 | element_type)
+            else:
+                self.data.append(0xF0 | element_type)
+                self.write_varint(len(values))
+
+            for element in values:
+                self.write_value(element_type, element)
+        elif type_ == MAP:
+            key_type, value_type, items = value
+            self.write_varint(len(items))
+
+            if items:
+                self.data.append(key_type << 4 | value_type)
+
+            for key, item in items:
+                self.write_value(key_type, key)
+                self.write_value(value_type, item)
+        elif type_ == STRUCT:
+            self.write_struct(value)
+        else:
+            raise ValueError(f"Unknown Thrift compact type: {type_}")
+
+    def write_struct(self, fields: List[list]):
+        last_id = 0
+
+        for field_id, type_, value in fields:
+            if 0 < field_id - last_id <= 15:
+                self.data.append((field_id - last_id) << 4 | type_)
+            else:
+                self.data.append(type_)
+                self.write_int(field_id)
+
+            if type_ not in (TRUE, FALSE):
+                self.write_value(type_, value)
+
+            last_id = field_id
+
+        self.data.append(STOP)
+
+
+def read_struct(data: bytes, position: int = 0) -> Tuple[List[list], int]:
+    """
+    Read a struct from the bytes at `position`.
+
+    :return: The fields of the struct, and the position after it.
+    """
+    reader = CompactReader(data, position)
+    return reader.read_struct(), reader.position
+
+
+def write_struct(fields: List[list]) -> bytes:
+    writer = CompactWriter()
+    writer.write_struct(fields)
+    return bytes(writer.data)
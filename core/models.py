@@ -39,6 +39,89 @@ class Parameters(object):
     # observation start time
     start_time = attr.ib(converter=int)
 
+    # layout of the rows of the ASCII point data tables: {fixed, csv}. The
+    # "csv" layout has comma-separated values without padding, and is
+    # smaller and faster to read.
+    ascii_dialect = attr.ib(converter=str, default="fixed")
+
+    # order of the cases: {forecast, validity}
+    case_order = attr.ib(converter=str, default="forecast")
+
+    # space of the computations: {field, point}. In the point space, the
+    # input fields are reduced to the values at the stations before running
+    # the computations.
+    evaluation = attr.ib(converter=str, default="field")
+
+    # number of shards computing the calibration period, split in blocks of
+    # consecutive dates, and index of the shard computed by run() (from 0)
+    shards = attr.ib(converter=int, default=1)
+    shard = attr.ib(converter=int, default=0)
+
+    # representation of the GRIB fields in the computations: {metview, numpy}.
+    # With "numpy", the fields are decoded once, and the arithmetic is done
+    # on numpy arrays instead of GRIB messages encoded by Metview.
+    fieldset_backend = attr.ib(converter=str, default="metview")
+
+    # The parameters below only affect how the point data table is computed,
+    # not its content, and are marked with the "runtime" metadata.
+
+    # number of processes computing the cases in parallel
+    workers = attr.ib(converter=int, default=1, metadata={"runtime": True})
+
+    # number of threads evaluating the independent computations of a case.
+    # Metview is not thread-safe: the computations only run concurrently in
+    # the point evaluation or with the numpy backend, and the forecast files
+    # are read one at a time.
+    computation_threads = attr.ib(converter=int, default=1, metadata={"runtime": True})
+
+    # memory budget (in MB) of the cache of GRIB files read across cases
+    fieldset_cache_size = attr.ib(
+        converter=int, default=512, metadata={"runtime": True}
+    )
+
+    # memory budget (in MB) of the cache of observation files read across cases
+    observation_cache_size = attr.ib(
+        converter=int, default=64, metadata={"runtime": True}
+    )
+
+    # number of cases between two checkpoints of the computation (0 to disable)
+    checkpoint_interval = attr.ib(converter=int, default=0, metadata={"runtime": True})
+
+    # resume the computation from the last checkpoint
+    resume = attr.ib(converter=bool, default=False, metadata={"runtime": True})
+
+    # number of cases whose input files are read ahead by background threads
+    # (0 to disable), and number of threads reading them
+    prefetch_depth = attr.ib(converter=int, default=0, metadata={"runtime": True})
+    prefetch_workers = attr.ib(converter=int, default=4, metadata={"runtime": True})
+
+    # number of point data table chunks waiting to be written by the writer
+    # thread, which serializes them while the next cases are computed (0 to
+    # write them in the compute loop)
+    write_queue_size = attr.ib(converter=int, default=4, metadata={"runtime": True})
+
+    # target size of the row groups of the Parquet point data tables, in rows
+    # and in MB, and compression codec and level of the Parquet files (None
+    # for the default level of the codec)
+    parquet_row_group_size = attr.ib(
+        converter=int, default=100000, metadata={"runtime": True}
+    )
+    parquet_row_group_mb = attr.ib(
+        converter=int, default=64, metadata={"runtime": True}
+    )
+    parquet_compression = attr.ib(
+        converter=str, default="snappy", metadata={"runtime": True}
+    )
+    parquet_compression_level = attr.ib(
+        converter=attr.converters.optional(int),
+        default=None,
+        metadata={"runtime": True},
+    )
+
+    # append the cases of the calibration period missing from an existing
+    # point data table at out_path, instead of computing a new table
+    extend = attr.ib(converter=bool, default=False, metadata={"runtime": True})
+
 
 @attr.s
 class Predictand(object):
@@ -70,6 +153,10 @@ class Observations(object):
 
     units = attr.ib(converter=str)
 
+    # path of the observation store built from the database by
+    # core.loaders.observations.ingest(), read instead of the .geo files
+    store = attr.ib(converter=attr.converters.optional(sanitize_path), default=None)
+
 
 @attr.s
 class Predictors(object):
@@ -81,6 +168,11 @@ class Predictors(object):
 
     codes = attr.ib(default=attr.Factory(list))
 
+    # path of the forecast cube built from the database by
+    # core.processor.build_cube(), read instead of the GRIB files with the
+    # point evaluation
+    cube = attr.ib(converter=attr.converters.optional(sanitize_path), default=None)
+
 
 @attr.s
 class Computation:
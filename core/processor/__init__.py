@@ -1,74 +1,126 @@
 import logging
+import multiprocessing
 import os
-from datetime import datetime, timedelta
+from collections import Counter
+from itertools import islice
 from textwrap import dedent
 
-import numpy as np
-
 from core.loaders.ascii import ASCIIEncoder
 from core.loaders.parquet import ParquetPointDataTableWriter
-from core.loaders.fieldset import Fieldset
-from core.loaders import geopoints as geopoints_loader
 from core.models import Config
 
-from ..computations.models import Computer
+from .cases import RunContext, iter_cases
+from .columns import add_columns
+from .cube import build_cube
+from .checkpoint import Checkpoint, get_checkpoint_path, get_config_fingerprint
+from .extend import prepare_extension, skip_existing_cases
 from .log_factory import (
     general_parameters_logs,
     observations_logs,
     output_file_logs,
+    point_data_table_footer,
+    point_data_table_header,
     point_data_table_logs,
     predictand_logs,
     predictors_logs,
     step_information_logs,
 )
-from .utils import iter_daterange
-
-logging.basicConfig(
-    filename=f'/var/tmp/ecpoint.logs', filemode="w", level=logging.INFO
+from .parallel import iter_case_results
+from .plan import plan
+from .prefetch import Prefetcher
+from .shards import (
+    check_shard_config,
+    get_output_path,
+    get_shard_summary_path,
+    iter_shard_cases,
+    merge_shards,
 )
+from .writer import BackgroundWriter, get_parquet_options, get_point_data_table_schema
+
+# Worker processes of the parallel mode replay their log records through the
+# parent process, and must not truncate the log file when (re)importing this
+# module.
+if multiprocessing.parent_process() is None:
+    logging.basicConfig(
+        filename=f'/var/tmp/ecpoint.logs', filemode="w", level=logging.INFO
+    )
 
-console = logging.StreamHandler()
-console.setLevel(logging.DEBUG)
-logging.getLogger("").addHandler(console)
+    console = logging.StreamHandler()
+    console.setLevel(logging.DEBUG)
+    logging.getLogger("").addHandler(console)
 
 
 def run(config: Config):
-    BaseDateS = config.parameters.date_start
-    BaseDateF = config.parameters.date_end
     acc = config.predictand.accumulation
-    spinup_limit = config.parameters.spinup_limit
-    PathOBS = config.observations.path
-    PathFC = config.predictors.path
+    computations = config.computations
+    checkpoint_interval = config.parameters.checkpoint_interval
 
-    # Set up the input/output parameters
-    BaseDateSSTR = BaseDateS.strftime("%Y-%m-%d")
-    BaseDateFSTR = BaseDateF.strftime("%Y-%m-%d")
+    check_shard_config(config)
+    out_path = get_output_path(config)
+    checkpoint_path = get_checkpoint_path(out_path)
 
-    computations = config.computations
+    # The fingerprint is computed before setting the is_reference attributes,
+    # like the ones of the checkpoints and of the shards.
+    fingerprint = get_config_fingerprint(config)
+
+    # Set is_reference attribute for each computation
+    for computation in computations:
+        computation.is_reference = (
+            len(computation.inputs) == 1
+            and computation.inputs[0]["code"] == config.predictand.code
+        )
 
     if config.parameters.out_format == "ASCII":
-        serializer = ASCIIEncoder(path=config.parameters.out_path)
+        serializer = ASCIIEncoder(
+            path=out_path, dialect=config.parameters.ascii_dialect
+        )
     elif config.parameters.out_format == "PARQUET":
-        serializer = ParquetPointDataTableWriter(path=config.parameters.out_path)
-
-    header = dedent(
-        f"""
-        # THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
-        #
-        # Created on {datetime.now()}.
-        #
-        # """  # Do NOT strip
-    )
+        serializer = ParquetPointDataTableWriter(
+            path=out_path,
+            checkpoints=checkpoint_interval > 0,
+            table_schema=get_point_data_table_schema(config),
+            **get_parquet_options(config),
+        )
+
+    header = point_data_table_header(config)
+
+    checkpoint = None
+
+    if config.parameters.resume:
+        checkpoint = Checkpoint.load(checkpoint_path)
+
+        if checkpoint is None:
+            logging.warning(
+                f"No checkpoint found at {checkpoint_path}. Starting from the first case."
+            )
+        elif checkpoint.fingerprint != fingerprint:
+            raise ValueError(
+                f"The checkpoint at {checkpoint_path} was created with a different configuration."
+            )
 
-    header += "\n# ".join(general_parameters_logs(config).split("\n"))
-    header += "\n# ".join(predictand_logs(config).split("\n"))
-    header += "\n# ".join(predictors_logs(config).split("\n"))
-    header += "\n# ".join(observations_logs(config).split("\n"))
-    header += "\n# ".join(output_file_logs(config).split("\n"))
-    header += "\n# ".join(point_data_table_logs(config).split("\n"))
-    header += "\n# ".join(step_information_logs(config).split("\n"))
+    existing_keys = frozenset()
 
-    serializer.add_header(header.strip())
+    if checkpoint is None and config.parameters.extend:
+        extension = prepare_extension(config, fingerprint)
+        checkpoint = extension.checkpoint
+        existing_keys = extension.keys
+
+        # Save the checkpoint right away, since an existing ASCII table is
+        # not readable on its own until the end of the extension.
+        checkpoint.save(checkpoint_path)
+
+    if checkpoint is None:
+        checkpoint = Checkpoint(fingerprint=fingerprint)
+        serializer.add_header(header.strip())
+    else:
+        serializer.resume(
+            checkpoint.serializer, header=checkpoint.header or header.strip()
+        )
+
+    if config.parameters.write_queue_size > 0:
+        serializer = BackgroundWriter(
+            serializer, size=config.parameters.write_queue_size
+        )
 
     #############################################################################################
 
@@ -93,13 +145,8 @@ def run(config: Config):
 
     logging.info("*** START COMPUTATIONS ***")
 
-    # Counter for the BaseDate and BaseTime to avoid repeating the same forecasts in different cases
-    counter_used_FC = {}
-    obsTOT = 0
-    obsUSED = 0
-    model_interval = config.parameters.model_interval
-    step_interval = config.parameters.step_interval
-    BaseTimeS = config.parameters.start_time
+    obsTOT = checkpoint.obs_total
+    obsUSED = checkpoint.obs_used
     predictand_min_value = (
         config.predictand.min_value + config.computations[0].addScale
     ) * config.computations[0].mulScale
@@ -107,408 +154,102 @@ def run(config: Config):
 
     logging.info(step_information_logs(config))
 
-    for curr_date, curr_time, step_s, case in iter_daterange(
-        start_date=BaseDateS,
-        end_date=BaseDateF,
-        start_hour=BaseTimeS,
-        model_interval=model_interval,
-        step_interval=step_interval,
-        spinup_limit=spinup_limit,
-    ):
-        logging.info("")
-        if case != 1:
-            logging.info("**********")
-        logging.info(f"Case {case}")
-        logging.info("FORECAST PARAMETERS:")
-
-        if config.predictand.is_accumulated:
-            forecast = f'{curr_date.strftime("%Y-%m-%d")}, {curr_time:02d} UTC, (t+{step_s}, t+{step_s + acc})'
-        else:
-            forecast = (
-                f'{curr_date.strftime("%Y-%m-%d")}, {curr_time:02d} UTC, (t+{step_s})'
-            )
-
-        logging.info(f"  {forecast}")
-
-        if forecast in counter_used_FC:
-            logging.info(
-                f"  Forecast already used: case {counter_used_FC[forecast]}"
-            )
-            continue
+    ref_code = next(
+        (
+            computation.shortname
+            for computation in computations
+            if computation.is_reference
+        ),
+        None,
+    )
 
-        # Reading the forecasts
-        if curr_date < BaseDateS or curr_date > BaseDateF:
-            logging.info(
-                f"  Forecast not considered: outside calibration period {BaseDateSSTR} - {BaseDateFSTR}."
-            )
-            continue
+    context = RunContext.from_config(config)
+    stats = Counter()
 
-        counter_used_FC[forecast] = case
+    if checkpoint.completed:
         logging.info("")
-
-        def get_grib_path(predictor_code, step):
-            file_name = "_".join(
-                [
-                    predictor_code,
-                    curr_date.strftime("%Y%m%d"),
-                    f"{curr_time:02d}",
-                    f"{step:02d}",
-                ]
-            )
-            file_ext = "grib"
-            return (
-                PathFC
-                / predictor_code
-                / (curr_date.strftime("%Y%m%d") + f"{curr_time:02d}")
-                / f"{file_name}.{file_ext}"
-            )
-
-        # Note about the computation of the sr.
-        # The solar radiation is a cumulative variable and its units is J/m2 (which means, W*s/m2).
-        # One wants the 24h. The 24h mean is obtained by taking the difference between the beginning and the end of the 24 hourly period
-        # and dividing by the number of seconds in that period (24h = 86400 sec). Thus, the unit will be W/m2
-
-        # Defining the parameters for the rainfall observations
-        validDateF = (
-            datetime.combine(curr_date, datetime.min.time())
-            + timedelta(hours=curr_time)
-            + timedelta(hours=step_s + acc)  # step_s + 0 for instantaneous predictand
+        logging.info(
+            f"Resuming from checkpoint: {checkpoint.completed} case(s) already processed."
         )
-        DateVF = validDateF.strftime("%Y%m%d")
-        HourVF = validDateF.strftime("%H")
-        HourVF_num = validDateF.hour
-        logging.info("OBSERVATIONS PARAMETERS:")
-
-        if config.predictand.is_accumulated:
-            logging.info(f"  Validity date/time (end of {acc} h period) = {validDateF}")
-        else:
-            logging.info(f"  Validity date/time = {validDateF}")
-
-        if config.predictand.is_accumulated:
-            obs_path = (
-                PathOBS
-                / f"Acc{acc:02}h"
-                / DateVF
-                / f"{config.predictand.code}_{acc:02d}_{DateVF}_{HourVF}.geo"
-            )
-        else:
-            obs_path = (
-                PathOBS / DateVF / f"{config.predictand.code}_{DateVF}_{HourVF}.geo"
-            )
 
-        # Reading Rainfall Observations
-        logging.info(f"  Read observation file: {os.path.basename(obs_path)}")
-        try:
-            obs = geopoints_loader.read(path=obs_path)
-        except IOError:
-            logging.warning(f"  Observation file not found in DB: {obs_path}.")
-            continue
-        except Exception:
-            logging.error(
-                f"  Error reading observation file: {os.path.basename(obs_path)}"
-            )
-            continue
+    tasks = iter_cases(config)
+    if config.parameters.shards > 1:
+        tasks = iter_shard_cases(config, tasks)
 
-        nOBS = len(obs)
-
-        if nOBS == 0:
-            logging.warning(
-                f"  No observation in the file: {os.path.basename(obs_path)}. Forecast not considered."
-            )
-            continue
-
-        obsTOT += nOBS
-
-        # Set is_reference attribute for each computation
-        for computation in computations:
-            computation.is_reference = (
-                len(computation.inputs) == 1
-                and computation.inputs[0]["code"] == config.predictand.code
-            )
-
-        logging.info("")
-        logging.info("PREDICTORS COMPUTATIONS:")
+    if checkpoint.skip_period:
+        tasks = skip_existing_cases(config, tasks, checkpoint, keys=existing_keys)
 
-        base_fields = set(config.predictors.codes)
+    tasks = islice(tasks, checkpoint.completed, None)
 
-        derived_computations = [
-            computation
-            for computation in computations
-            if ({input["code"] for input in computation.inputs} - base_fields != set())
-            and computation.isPostProcessed
-            and computation.field != "LOCAL_SOLAR_TIME"
-        ]
-
-        # We want to compute the predictand computation, followed by other
-        # independent computations in order to populate the cache and use it
-        # for derived computations.
-        base_computations = sorted(
-            [
-                computation
-                for computation in computations
-                if computation not in derived_computations
-                and computation.field != "LOCAL_SOLAR_TIME"
-            ],
-            key=lambda computation: computation.is_reference,
-            reverse=True,
+    prefetcher = None
+    if config.parameters.prefetch_depth > 0:
+        prefetcher = Prefetcher(
+            config=config,
+            depth=config.parameters.prefetch_depth,
+            workers=config.parameters.prefetch_workers,
         )
+        tasks = prefetcher.iter_tasks(tasks)
+
+    try:
+        for _, result in iter_case_results(context, tasks):
+            if result is not None:
+                stats.update(result.stats)
+                obsTOT += result.obs_total
+
+                if result.columns is not None:
+                    obsUSED += result.obs_used
+                    serializer.add_columns_chunk(result.columns)
+
+            checkpoint.completed += 1
+
+            if checkpoint_interval and checkpoint.completed % checkpoint_interval == 0:
+                checkpoint.obs_total = obsTOT
+                checkpoint.obs_used = obsUSED
+                checkpoint.serializer = serializer.checkpoint()
+                checkpoint.save(checkpoint_path)
+    except BaseException:
+        # The writer thread is stopped and the chunks computed so far are
+        # written, but the footer is not. The checkpoint is left in place,
+        # so that the run can be resumed.
+        try:
+            serializer.abort()
+        except Exception:
+            # The error of the case loop is the one raised, not a failure
+            # to write the chunks, which may have the same cause.
+            logging.exception("Failed to abort the point data table writer")
 
-        computations_cache = {}
-        computations_result = []
-        skip = False
-
-        for computation in base_computations:
-            computer = Computer(computation)
-
-            # Base computations normally shouldn't have more than one
-            # predictor input
-            predictor_code = computer.computation.inputs[0]["code"]
-
-            # Step generation and adjustment
-            if not config.predictand.is_accumulated:
-                steps = [step_s]
-            else:
-                if computation.field == "24H_SOLAR_RADIATION":
-                    if acc == 24:
-                        steps = [step_s, step_s + acc]
-                    else:
-                        if step_s + acc <= 24:
-                            steps = [0, 24]
-                        else:
-                            steps = [step_s + acc - 24, step_s + acc]
-                elif computation.field in [
-                    "WEIGHTED_AVERAGE_FIELD",
-                    "AVERAGE_FIELD",
-                ]:
-                    steps = list(
-                        range(
-                            step_s,
-                            step_s + acc + 1,
-                            config.predictors.sampling_interval,
-                        )
-                    )
-                elif computation.field in [
-                    "MAXIMUM_FIELD",
-                    "MINIMUM_FIELD",
-                ]:
-                    steps = list(
-                        range(
-                            step_s + config.predictors.sampling_interval,
-                            step_s + acc + 1,
-                            config.predictors.sampling_interval,
-                        )
-                    )
-                else:
-                    steps = [step_s, step_s + acc]
-
-            computation_steps = []
-
-            for path in [get_grib_path(predictor_code, step) for step in steps]:
-                logging.info(f"  Reading forecast file: {os.path.basename(path)}")
-
-                try:
-                    fieldset = Fieldset.from_path(path=path)
-                except IOError:
-                    logging.warning(f"  Forecast file not found: {path}.")
-                    skip = True
-                    break
-                except Exception:
-                    logging.error(f"  Reading forecast file failed: {path}.")
-                    skip = True
-                    break
-                else:
-                    computation_steps.append(fieldset)
-
-            if skip:
-                break
-
-            logging.info(
-                f"  Computing {computer.computation.fullname} using "
-                f"{len(computation_steps)} input(s)."
-            )
-
-            computed_value = computer.run(*computation_steps)
-            computations_cache[computation.shortname] = computed_value
-
-            # A base computation that is not post-processed, probably serves
-            # the only purpose of an input for a (future) derived computation.
-            if not computation.isPostProcessed:
-                continue
-
-            logging.info("  Selecting the nearest grid point to observations.")
-            geopoints = computed_value.nearest_gridpoint(obs)
-
-            if computation.is_reference:
-                ref_code = computation.shortname
-                if config.predictand.is_accumulated:
-                    mask = geopoints >= predictand_min_value
-                    logging.info(
-                        f"  Selecting values that correspond to {computation.shortname}"
-                        f" >= {predictand_min_value} {predictand_scaled_units}/{acc}h."
-                    )
-                    ref_geopoints = geopoints.filter(mask)
-                else:
-                    ref_geopoints = geopoints
-
-                if not ref_geopoints:
-                    if config.predictand.is_accumulated:
-                        logging.warning(
-                            f"  The observation file does not contain observations that correspond to "
-                            f" {computation.shortname} >= "
-                            f"{predictand_min_value} {predictand_scaled_units}/{acc}h."
-                        )
-                    else:
-                        # [TODO] - Add a specific logger message
-                        pass
-
-                    skip = True
-                    break
-
-                computations_result.append(
-                    (
-                        computation.shortname,
-                        np.around(geopoints_loader.get_values(ref_geopoints), decimals=3),
-                    )
-                )
-            else:
-                if config.predictand.is_accumulated:
-                    geopoints = geopoints.filter(mask)
-
-                computations_result.append(
-                    (computation.shortname, np.around(geopoints_loader.get_values(geopoints), decimals=3))
-                )
-
-            logging.info("")
-
-        if skip:
-            continue
-
-        for computation in derived_computations:
-            computer = Computer(computation)
-            steps = [
-                computations_cache[field_input["code"]]
-                for field_input in computation.inputs
-            ]
-
-            input_codes = [field_input["code"] for field_input in computation.inputs]
-            logging.info(
-                f"  Computing {computer.computation.fullname} using "
-                f"{len(computation.inputs)} input(s): {', '.join(input_codes)}."
-            )
+        raise
 
-            if computation.field == "RATIO_FIELD":
-                dividend, divisor = steps
-                if config.predictand.is_accumulated:
-                    computed_value = computer.run(
-                        geopoints_loader.get_values(dividend.nearest_gridpoint(obs).filter(mask)),
-                        geopoints_loader.get_values(divisor.nearest_gridpoint(obs).filter(mask)),
-                    )
-                else:
-                    computed_value = geopoints_loader.get_values(
-                        computer.run(dividend.values, divisor.values)
-                        .nearest_gridpoint(obs)
-                    )
-                computations_result.append(
-                    (computation.shortname, np.around(computed_value, decimals=3))
-                )
-            else:
-                computed_value = computer.run(*steps)
-                computations_result.append(
-                    (
-                        computation.shortname,
-                        np.around(
-                            geopoints_loader.get_values(computed_value.nearest_gridpoint(obs).filter(mask))
-                            if config.predictand.is_accumulated
-                            else geopoints_loader.get_values(computed_value.nearest_gridpoint(obs)),
-                            decimals=3,
-                        ),
-                    )
-                )
-
-        # Compute other parameters
-        if config.predictand.is_accumulated:
-            obs = obs.filter(mask)
-
-        latObs = obs.latitudes()
-        lonObs = obs.longitudes()
-
-        vals_errors = []
-
-        logging.info(f"  Computing the {config.predictand.error}.")
-        if config.predictand.error == "FER":
-            FER = geopoints_loader.get_values((obs - ref_geopoints) / ref_geopoints)
-            vals_errors.append(("FER", np.around(FER, decimals=3)))
-
-        if config.predictand.error == "FE":
-            FE = geopoints_loader.get_values(obs - ref_geopoints)
-            vals_errors.append(("FE", np.around(FE, decimals=3)))
-
-        LST_computation = next(
-            (
-                computation
-                for computation in computations
-                if computation.field == "LOCAL_SOLAR_TIME"
-            ),
-            None,
+    for name, title in (("fieldsets", "GRIB"), ("observations", "Observation")):
+        logging.info(
+            f"{title} cache: {stats[f'{name}_hits']} hit(s), "
+            f"{stats[f'{name}_misses']} miss(es), "
+            f"{stats[f'{name}_evictions']} eviction(s)."
         )
-        if LST_computation and LST_computation.isPostProcessed:
-            vals_LST = [
-                (
-                    "LST",
-                    np.around(
-                        Computer(LST_computation).run(lonObs, HourVF_num), decimals=3
-                    ),
-                )
-            ]
-        else:
-            vals_LST = []
-
-        # Saving the output file in ascii format
-        n = len(obs)
-        obsUSED += n
-        logging.info("")
-        logging.info("POINT DATA TABLE:")
-        logging.info(f"  Saving the point data table to output file: {config.parameters.out_path}")
-        logging.info(f"  Point data table format: {config.parameters.out_format}")
-
-        columns = (
-            [
-                ("BaseDate", [curr_date.strftime("%Y-%m-%d")] * n),
-                ("BaseTime", [curr_time] * n),
-                (
-                    "StepF" if config.predictand.is_accumulated else "Step",
-                    [step_s + acc] * n,
-                ),
-                ("DateOBS", [validDateF.strftime("%Y-%m-%d")] * n),
-                ("TimeOBS", [HourVF] * n),
-            ]
-            + [
-                ("LatOBS", latObs),
-                ("LonOBS", lonObs),
-                ("OBS", geopoints_loader.get_values(obs)),
-                ("Predictand", np.around(geopoints_loader.get_values(ref_geopoints), decimals=3)),
-            ]
-            + vals_errors
-            + vals_LST
-            + computations_result
+    if prefetcher:
+        logging.info(
+            f"Prefetch: {prefetcher.stats['files']} file(s), "
+            f"{prefetcher.stats['bytes']} bytes read ahead. "
+            f"Waited {prefetcher.stats['stall_seconds']:.1f}s for the input files, "
+            f"computed for {prefetcher.stats['compute_seconds']:.1f}s."
         )
-
-        serializer.add_columns_chunk(columns)
-
     logging.info(f"No of observations considered in the calibration period: {obsTOT}")
     if config.predictand.is_accumulated:
         logging.info(
             f"No of observations that correspond to {ref_code} >= {predictand_min_value} {predictand_scaled_units}/{acc}h: {obsUSED}"
         )
 
-    if config.predictand.is_accumulated:
-        footer = dedent(
-            f"""
-            # No of observations considered in the calibration period: {obsTOT}
-            # No of observations that correspond to {ref_code} >= {predictand_min_value} {predictand_scaled_units}/{acc}h: {obsUSED}
-            """
-        ).strip()
-    else:
-        footer = f"# No of observations considered in the calibration period: {obsTOT}"
+    footer = point_data_table_footer(config, obsTOT, obsUSED)
 
     serializer.add_footer(footer)
+    serializer.close()
+
+    if config.parameters.shards > 1:
+        # Mark the shard as finished, for merge_shards().
+        checkpoint.obs_total = obsTOT
+        checkpoint.obs_used = obsUSED
+        checkpoint.serializer = {}
+        checkpoint.save(get_shard_summary_path(config, config.parameters.shard))
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
@@ -0,0 +1,306 @@
+import os
+from collections import Counter, OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import attr
+import numpy as np
+
+from core.loaders import geopoints as geopoints_loader
+from core.loaders import grib
+from core.loaders.cube import ForecastCube
+from core.loaders.fieldset import Fieldset, NumpyFieldset
+from core.loaders.grid import GridIndex, find_grid_index
+from core.loaders.observations import ObservationStore
+
+
+@attr.s(slots=True)
+class _Entry(object):
+    value = attr.ib()
+    version = attr.ib()
+    size = attr.ib()
+
+
+@attr.s(slots=True)
+class LRUCache(object):
+    """
+    Least-recently-used cache with a budget on the total size of the
+    entries, and hit/miss/eviction counters.
+
+    Entries are stored with a version, and a lookup with a different version
+    is treated as a miss. An entry that alone exceeds the budget is returned
+    but not stored.
+    """
+
+    max_size = attr.ib(converter=int)
+
+    stats = attr.ib(factory=Counter)
+    _entries = attr.ib(factory=OrderedDict)
+    _size = attr.ib(default=0)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(
+        self,
+        key,
+        version,
+        loader: Callable[[], Any],
+        size: Union[int, Callable[[Any], int]],
+    ) -> Any:
+        """
+        :param size: Size of the value, or function computing it from the
+            loaded value.
+        """
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            if entry.version == version:
+                self.stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+
+            # Stale entry, for example a file modified after being read.
+            self._discard(key)
+
+        self.stats["misses"] += 1
+        value = loader()
+
+        if callable(size):
+            size = size(value)
+
+        if size <= self.max_size:
+            self._entries[key] = _Entry(value=value, version=version, size=size)
+            self._size += size
+
+            while self._size > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.stats["evictions"] += 1
+
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def _discard(self, key):
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+
+
+@attr.s(slots=True)
+class FieldsetCache(object):
+    """
+    Cache of the Fieldset instances read by the point data table builder,
+    keyed by the resolved path of the GRIB file.
+
+    The modification time of the file is checked on every lookup. With the
+    "metview" backend, the budget is expressed in bytes of encoded GRIB
+    data, and with the "numpy" backend, in bytes of decoded values.
+    """
+
+    max_bytes = attr.ib(converter=int)
+    backend = attr.ib(converter=str, default="metview")
+
+    # Forecast cube read by get_points() instead of the GRIB files it holds.
+    cube: Optional[ForecastCube] = attr.ib(default=None)
+
+    _lru = attr.ib(default=None)
+
+    # Grid keys of the fields read, by key of their grid section.
+    _grid_keys = attr.ib(factory=dict)
+
+    def __attrs_post_init__(self):
+        if self.backend not in ("metview", "numpy"):
+            raise ValueError(f"invalid fieldset backend: {self.backend}")
+
+        self._lru = LRUCache(max_size=self.max_bytes)
+
+    @property
+    def stats(self) -> Counter:
+        return self._lru.stats
+
+    def get(self, path: Union[Path, str]) -> Union[Fieldset, NumpyFieldset]:
+        path = os.path.realpath(path)
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise IOError(f"File does not exist: {path}")
+
+        if self.backend == "numpy":
+            return self._lru.get(
+                key=path,
+                version=stat.st_mtime_ns,
+                loader=lambda: NumpyFieldset.from_path(path),
+                size=lambda fieldset: fieldset.nbytes,
+            )
+
+        return self._lru.get(
+            key=path,
+            version=stat.st_mtime_ns,
+            loader=lambda: Fieldset.from_path(path=path),
+            size=stat.st_size,
+        )
+
+    def get_points(
+        self, path: Union[Path, str], stations: "PointObservations"
+    ) -> np.ndarray:
+        """
+        Get the values of a GRIB file at the nearest grid points of the
+        stations.
+
+        The values are read from the forecast cube if it holds the file and
+        the stations. Otherwise, once a field on the same grid has been read,
+        the GRIB messages with simple packing are decoded at the grid points
+        of the stations only, without reading the whole field in the cache.
+        """
+        if self.cube is not None:
+            values = self.cube.read(path, stations)
+            if values is not None:
+                return values
+
+        path = os.path.realpath(path)
+
+        if not os.path.exists(path):
+            raise IOError(f"File does not exist: {path}")
+
+        section_key = grib.read_grid_key(path)
+        grid_key = self._grid_keys.get(section_key)
+        index = find_grid_index(grid_key) if grid_key else None
+
+        if index is None:
+            fieldset = self.get(path)
+            if section_key:
+                self._grid_keys[section_key] = fieldset.grid_key
+
+            return fieldset.take(stations.nearest_gridpoint_indices(fieldset))
+
+        return Fieldset.from_path(
+            path, points=stations.grid_point_indices(grid_key, index)
+        )
+
+
+@attr.s(slots=True)
+class PointObservations(object):
+    """
+    Observations of a geopoints file as numpy arrays, along with the indices
+    of their nearest grid points for every grid geometry they were matched
+    with. Instances are shared across cases and must not be mutated.
+    """
+
+    latitudes: np.ndarray = attr.ib()
+    longitudes: np.ndarray = attr.ib()
+    values: np.ndarray = attr.ib()
+
+    _indices = attr.ib(factory=dict, repr=False)
+
+    @classmethod
+    def from_path(cls, path: Union[Path, str]) -> "PointObservations":
+        geopoints = geopoints_loader.load(path=Path(path))
+
+        return cls(
+            latitudes=np.asarray(geopoints.latitudes()),
+            longitudes=np.asarray(geopoints.longitudes()),
+            values=np.asarray(geopoints_loader.get_values(geopoints)),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self.latitudes.nbytes
+            + self.longitudes.nbytes
+            + self.values.nbytes
+            + sum(indices.nbytes for indices in self._indices.values())
+        )
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def nearest_gridpoint_indices(self, fieldset: Fieldset) -> np.ndarray:
+        return self.grid_point_indices(fieldset.grid_key, fieldset.grid_index)
+
+    def grid_point_indices(self, key: str, index: GridIndex) -> np.ndarray:
+        """
+        Flat indices of the nearest grid points of the observations, in the
+        grid identified by `key`.
+        """
+        if key not in self._indices:
+            self._indices[key] = index.query(self.latitudes, self.longitudes)
+
+        return self._indices[key]
+
+
+@attr.s(slots=True)
+class ObservationCache(object):
+    """
+    Cache of the observation files read by the point data table builder,
+    keyed by the resolved path of the geopoints file.
+
+    Cases with the same validity time read the same observation file, which
+    is parsed only once as long as it stays in the cache.
+
+    With an observation store, the observations are read from the store
+    instead, by validity time.
+    """
+
+    max_bytes = attr.ib(converter=int)
+    store: Optional[ObservationStore] = attr.ib(default=None)
+
+    _lru = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        self._lru = LRUCache(max_size=self.max_bytes)
+
+    @property
+    def stats(self) -> Counter:
+        return self._lru.stats
+
+    def get(self, path: Union[Path, str]) -> PointObservations:
+        path = os.path.realpath(path)
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise IOError(f"File does not exist: {path}")
+
+        # The size of the parsed observations is not known before reading the
+        # file, so the budget is charged with the size of the text file.
+        return self._lru.get(
+            key=path,
+            version=stat.st_mtime_ns,
+            loader=lambda: PointObservations.from_path(path),
+            size=stat.st_size,
+        )
+
+    def get_validity(self, validity: datetime) -> PointObservations:
+        path = self.store.get_path(validity)
+
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            raise IOError(f"File does not exist: {path}")
+
+        def loader():
+            observations = self.store.read(validity)
+            return PointObservations(
+                latitudes=observations["latitude"],
+                longitudes=observations["longitude"],
+                values=observations["value"],
+            )
+
+        return self._lru.get(
+            key=(str(path), validity),
+            version=stat.st_mtime_ns,
+            loader=loader,
+            size=lambda observations: observations.nbytes,
+        )
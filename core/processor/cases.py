@@ -0,0 +1,689 @@
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import attr
+import numpy as np
+
+from core.loaders.cube import ForecastCube
+from core.loaders.fieldset import NumpyFieldset
+from core.loaders.observations import ObservationStore
+from core.models import Computation, Config
+
+from ..computations.models import Computer
+from .cache import FieldsetCache, ObservationCache, PointObservations
+from .dag import ComputationGraph, Node
+from .utils import iter_daterange
+
+
+@attr.s(slots=True)
+class RunContext(object):
+    """
+    State of the point data table builder that outlives a single case, such
+    as the caches. Every process computing cases holds its own instance.
+    """
+
+    config: Config = attr.ib()
+    fieldsets: FieldsetCache = attr.ib()
+    observations: ObservationCache = attr.ib()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RunContext":
+        cube = None
+
+        if config.predictors.cube is not None:
+            if config.parameters.evaluation != "point":
+                raise ValueError("the forecast cube requires the point evaluation")
+
+            cube = ForecastCube(config.predictors.cube, archive=config.predictors.path)
+
+        return cls(
+            config=config,
+            fieldsets=FieldsetCache(
+                max_bytes=config.parameters.fieldset_cache_size * 1024 ** 2,
+                backend=config.parameters.fieldset_backend,
+                cube=cube,
+            ),
+            observations=ObservationCache(
+                max_bytes=config.parameters.observation_cache_size * 1024 ** 2,
+                store=get_observation_store(config),
+            ),
+        )
+
+    @property
+    def stats(self) -> Counter:
+        stats = Counter()
+
+        for name in ("fieldsets", "observations"):
+            cache = getattr(self, name)
+            stats.update({f"{name}_{key}": value for key, value in cache.stats.items()})
+
+        return stats
+
+
+@attr.s(slots=True)
+class CaseTask(object):
+    curr_date = attr.ib()
+    curr_time = attr.ib()
+    step_s = attr.ib()
+    case = attr.ib()
+
+    # Human readable description of the forecast, used to avoid repeating
+    # the same forecasts in different cases.
+    forecast = attr.ib()
+
+    # Reason for not processing the case, or None if it has to be computed.
+    skip = attr.ib(default=None)
+
+
+@attr.s(slots=True)
+class CaseResult(object):
+    # Columns of the point data table chunk, or None if the case was skipped.
+    # The values of a column are an array, or a scalar repeated on every row.
+    columns = attr.ib(default=None)
+
+    # Number of observations read for the case (obsTOT).
+    obs_total = attr.ib(default=0)
+
+    # Number of observations saved in the point data table (obsUSED).
+    obs_used = attr.ib(default=0)
+
+    # Increments of the RunContext counters while computing the case.
+    stats = attr.ib(factory=Counter)
+
+
+def get_forecast_label(config: Config, curr_date, curr_time, step_s) -> str:
+    acc = config.predictand.accumulation
+
+    if config.predictand.is_accumulated:
+        return f'{curr_date.strftime("%Y-%m-%d")}, {curr_time:02d} UTC, (t+{step_s}, t+{step_s + acc})'
+
+    return f'{curr_date.strftime("%Y-%m-%d")}, {curr_time:02d} UTC, (t+{step_s})'
+
+
+def get_validity_datetime(config: Config, curr_date, curr_time, step_s) -> datetime:
+    return (
+        datetime.combine(curr_date, datetime.min.time())
+        + timedelta(hours=curr_time)
+        + timedelta(hours=step_s + config.predictand.accumulation)
+    )
+
+
+def iter_cases(config: Config):
+    """
+    Generate the CaseTask instances of the calibration period, in the order
+    they must appear in the point data table.
+
+    Cases that repeat an already used forecast, or fall outside the
+    calibration period, are yielded with the `skip` attribute set.
+
+    With the "validity" case order, the cases are sorted by the validity
+    time of the forecast, so that the cases reading the same observation
+    file are computed one after another.
+    """
+    tasks = _iter_cases(config)
+
+    if config.parameters.case_order == "validity":
+        tasks = sorted(
+            tasks,
+            key=lambda task: get_validity_datetime(
+                config, task.curr_date, task.curr_time, task.step_s
+            ),
+        )
+    elif config.parameters.case_order != "forecast":
+        raise ValueError(f"invalid case order: {config.parameters.case_order}")
+
+    yield from tasks
+
+
+def _iter_cases(config: Config):
+    BaseDateS = config.parameters.date_start
+    BaseDateF = config.parameters.date_end
+    BaseDateSSTR = BaseDateS.strftime("%Y-%m-%d")
+    BaseDateFSTR = BaseDateF.strftime("%Y-%m-%d")
+
+    # Counter for the BaseDate and BaseTime to avoid repeating the same forecasts in different cases
+    counter_used_FC = {}
+
+    for curr_date, curr_time, step_s, case in iter_daterange(
+        start_date=BaseDateS,
+        end_date=BaseDateF,
+        start_hour=config.parameters.start_time,
+        model_interval=config.parameters.model_interval,
+        step_interval=config.parameters.step_interval,
+        spinup_limit=config.parameters.spinup_limit,
+    ):
+        forecast = get_forecast_label(config, curr_date, curr_time, step_s)
+        task = CaseTask(
+            curr_date=curr_date,
+            curr_time=curr_time,
+            step_s=step_s,
+            case=case,
+            forecast=forecast,
+        )
+
+        if forecast in counter_used_FC:
+            task.skip = f"  Forecast already used: case {counter_used_FC[forecast]}"
+        elif curr_date < BaseDateS or curr_date > BaseDateF:
+            task.skip = f"  Forecast not considered: outside calibration period {BaseDateSSTR} - {BaseDateFSTR}."
+        else:
+            counter_used_FC[forecast] = case
+
+        yield task
+
+
+def log_case_header(task: CaseTask):
+    logging.info("")
+    if task.case != 1:
+        logging.info("**********")
+    logging.info(f"Case {task.case}")
+    logging.info("FORECAST PARAMETERS:")
+    logging.info(f"  {task.forecast}")
+
+
+def get_observation_path(config: Config, validity: datetime) -> Path:
+    acc = config.predictand.accumulation
+    DateVF = validity.strftime("%Y%m%d")
+    HourVF = validity.strftime("%H")
+
+    if config.predictand.is_accumulated:
+        return (
+            config.observations.path
+            / f"Acc{acc:02}h"
+            / DateVF
+            / f"{config.predictand.code}_{acc:02d}_{DateVF}_{HourVF}.geo"
+        )
+
+    return (
+        config.observations.path
+        / DateVF
+        / f"{config.predictand.code}_{DateVF}_{HourVF}.geo"
+    )
+
+
+def get_observation_store(config: Config) -> Optional[ObservationStore]:
+    if config.observations.store is None:
+        return None
+
+    return ObservationStore(
+        path=config.observations.store,
+        code=config.predictand.code,
+        accumulation=(
+            config.predictand.accumulation if config.predictand.is_accumulated else None
+        ),
+    )
+
+
+def read_observations(context: RunContext, validity: datetime) -> PointObservations:
+    """
+    Read the observations of a validity time, from the observation store if
+    any, or from the .geo file.
+    """
+    if context.observations.store is not None:
+        return context.observations.get_validity(validity)
+
+    return context.observations.get(get_observation_path(context.config, validity))
+
+
+def get_grib_path(config: Config, curr_date, curr_time, predictor_code, step) -> Path:
+    file_name = "_".join(
+        [
+            predictor_code,
+            curr_date.strftime("%Y%m%d"),
+            f"{curr_time:02d}",
+            f"{step:02d}",
+        ]
+    )
+    file_ext = "grib"
+    return (
+        config.predictors.path
+        / predictor_code
+        / (curr_date.strftime("%Y%m%d") + f"{curr_time:02d}")
+        / f"{file_name}.{file_ext}"
+    )
+
+
+def get_computation_steps(config: Config, computation, step_s) -> List[int]:
+    """
+    Forecast steps of the GRIB files read by a base computation, for the
+    case starting at step `step_s`.
+    """
+    acc = config.predictand.accumulation
+
+    if not config.predictand.is_accumulated:
+        steps = [step_s]
+    else:
+        if computation.field == "24H_SOLAR_RADIATION":
+            if acc == 24:
+                steps = [step_s, step_s + acc]
+            else:
+                if step_s + acc <= 24:
+                    steps = [0, 24]
+                else:
+                    steps = [step_s + acc - 24, step_s + acc]
+        elif computation.field in ["WEIGHTED_AVERAGE_FIELD", "AVERAGE_FIELD"]:
+            steps = list(
+                range(step_s, step_s + acc + 1, config.predictors.sampling_interval)
+            )
+        elif computation.field in ["MAXIMUM_FIELD", "MINIMUM_FIELD"]:
+            steps = list(
+                range(
+                    step_s + config.predictors.sampling_interval,
+                    step_s + acc + 1,
+                    config.predictors.sampling_interval,
+                )
+            )
+        else:
+            steps = [step_s, step_s + acc]
+
+    return steps
+
+
+def split_computations(config: Config) -> Tuple[List[Computation], List[Computation]]:
+    """
+    Split the computations of the config, except the local solar time, into
+    the base computations, which read GRIB files, and the derived ones, which
+    use the output of other computations.
+
+    The base computations are sorted with the reference one first, and the
+    derived ones are in the order of the config, like the columns of the
+    point data table.
+    """
+    computations = config.computations
+    base_fields = set(config.predictors.codes)
+
+    derived_computations = [
+        computation
+        for computation in computations
+        if ({input["code"] for input in computation.inputs} - base_fields != set())
+        and computation.field != "LOCAL_SOLAR_TIME"
+    ]
+
+    # We want to compute the predictand computation, followed by other
+    # independent computations in order to populate the cache and use it
+    # for derived computations.
+    base_computations = sorted(
+        [
+            computation
+            for computation in computations
+            if computation not in derived_computations
+            and computation.field != "LOCAL_SOLAR_TIME"
+        ],
+        key=lambda computation: computation.is_reference,
+        reverse=True,
+    )
+
+    return base_computations, derived_computations
+
+
+def get_case_paths(config: Config, task: CaseTask) -> Tuple[Path, List[Path]]:
+    """
+    Paths of the observation file, or of the file of the observation store,
+    and of the GRIB files read by the base computations, of a case.
+    """
+    base_computations, _ = split_computations(config)
+    validity = get_validity_datetime(
+        config, task.curr_date, task.curr_time, task.step_s
+    )
+
+    grib_paths = [
+        get_grib_path(
+            config, task.curr_date, task.curr_time, computation.inputs[0]["code"], step
+        )
+        for computation in base_computations
+        for step in get_computation_steps(config, computation, task.step_s)
+    ]
+
+    store = get_observation_store(config)
+    if store is not None:
+        return store.get_path(validity), grib_paths
+
+    return get_observation_path(config, validity), grib_paths
+
+
+class MissingInput(Exception):
+    """
+    A forecast file of a case is missing or cannot be read.
+    """
+
+
+class _NoReferenceValue(Exception):
+    pass
+
+
+@attr.s(slots=True)
+class NodeEvaluator(object):
+    """
+    Evaluation of the nodes of the computation graph for a case, at the
+    `stations`, shared by process_case() and add_columns().
+
+    The base nodes read their steps from the forecast files, one at a time.
+    A missing or unreadable forecast file raises MissingInput, so that the
+    caller can treat the case as missing.
+    """
+
+    context: RunContext = attr.ib()
+    curr_date = attr.ib()
+    curr_time = attr.ib()
+    step_s = attr.ib()
+    stations: PointObservations = attr.ib()
+
+    # The forecast files are read one at a time by the computations.
+    _read_lock = attr.ib(factory=threading.Lock, repr=False)
+
+    @property
+    def point_space(self) -> bool:
+        # Every computation is pointwise, so they can run on the values at
+        # the stations instead of the whole fields.
+        return self.context.config.parameters.evaluation == "point"
+
+    @property
+    def threads(self) -> int:
+        # Metview is not thread-safe, see Parameters.computation_threads.
+        parameters = self.context.config.parameters
+
+        if not self.point_space and parameters.fieldset_backend != "numpy":
+            return 1
+
+        return parameters.computation_threads
+
+    def to_points(self, value):
+        """
+        Values of the output of a node at the stations.
+        """
+        if self.point_space or isinstance(value, np.ndarray):
+            return value
+
+        return value.take(self.stations.nearest_gridpoint_indices(value))
+
+    def load_step(self, path: Path):
+        with self._read_lock:
+            logging.info(f"  Reading forecast file: {os.path.basename(path)}")
+
+            try:
+                if self.point_space:
+                    return self.context.fieldsets.get_points(path, self.stations)
+
+                return self.context.fieldsets.get(path)
+            except IOError:
+                logging.warning(f"  Forecast file not found: {path}.")
+                raise MissingInput(path)
+            except Exception:
+                logging.error(f"  Reading forecast file failed: {path}.")
+                raise MissingInput(path)
+
+    def __call__(self, node: Node, inputs: list):
+        config = self.context.config
+        computation = node.computation
+        computer = Computer(computation)
+
+        if node.is_base:
+            # Base computations normally shouldn't have more than one
+            # predictor input
+            predictor_code = computation.inputs[0]["code"]
+
+            paths = [
+                get_grib_path(
+                    config, self.curr_date, self.curr_time, predictor_code, step
+                )
+                for step in get_computation_steps(config, computation, self.step_s)
+            ]
+
+            # The steps are loaded by the computation, so that the reductions
+            # over many steps hold only one of them at a time.
+            computed_value = computer.run_streaming(
+                [partial(self.load_step, path) for path in paths]
+            )
+
+            logging.info(
+                f"  Computing {computation.fullname} using {len(paths)} input(s)."
+            )
+        else:
+            input_codes = [field_input["code"] for field_input in computation.inputs]
+            logging.info(
+                f"  Computing {computation.fullname} using "
+                f"{len(inputs)} input(s): {', '.join(input_codes)}."
+            )
+
+            if computation.field == "RATIO_FIELD":
+                dividend, divisor = (self.to_points(value) for value in inputs)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    computed_value = computer.run(dividend, divisor)
+            else:
+                # The output of a ratio is at the stations already.
+                if any(isinstance(value, np.ndarray) for value in inputs):
+                    inputs = [self.to_points(value) for value in inputs]
+
+                computed_value = computer.run(*inputs)
+
+        if self.threads > 1 and isinstance(computed_value, NumpyFieldset):
+            # The lazy expressions are not evaluated concurrently.
+            computed_value.evaluate()
+
+        return computed_value
+
+
+def process_case(context: RunContext, task: CaseTask) -> CaseResult:
+    """
+    Compute the point data table chunk of a single (date, base time, step)
+    case.
+
+    This function only depends on its arguments, so that the cases can be
+    computed in any process, and merged by the caller in case order.
+    """
+    config = context.config
+    acc = config.predictand.accumulation
+    computations = config.computations
+
+    curr_date, curr_time, step_s = task.curr_date, task.curr_time, task.step_s
+
+    predictand_min_value = (
+        config.predictand.min_value + config.computations[0].addScale
+    ) * config.computations[0].mulScale
+    predictand_scaled_units = config.observations.units
+
+    log_case_header(task)
+    logging.info("")
+
+    # Note about the computation of the sr.
+    # The solar radiation is a cumulative variable and its units is J/m2 (which means, W*s/m2).
+    # One wants the 24h. The 24h mean is obtained by taking the difference between the beginning and the end of the 24 hourly period
+    # and dividing by the number of seconds in that period (24h = 86400 sec). Thus, the unit will be W/m2
+
+    # Defining the parameters for the rainfall observations
+    validDateF = get_validity_datetime(config, curr_date, curr_time, step_s)
+    HourVF = validDateF.strftime("%H")
+    HourVF_num = validDateF.hour
+    logging.info("OBSERVATIONS PARAMETERS:")
+
+    if config.predictand.is_accumulated:
+        logging.info(f"  Validity date/time (end of {acc} h period) = {validDateF}")
+    else:
+        logging.info(f"  Validity date/time = {validDateF}")
+
+    obs_path = get_observation_path(config, validDateF)
+
+    # Reading Rainfall Observations
+    logging.info(f"  Read observation file: {os.path.basename(obs_path)}")
+    try:
+        obs = read_observations(context, validDateF)
+    except IOError:
+        logging.warning(f"  Observation file not found in DB: {obs_path}.")
+        return CaseResult()
+    except Exception:
+        logging.error(f"  Error reading observation file: {os.path.basename(obs_path)}")
+        return CaseResult()
+
+    nOBS = len(obs)
+
+    if nOBS == 0:
+        logging.warning(
+            f"  No observation in the file: {os.path.basename(obs_path)}. Forecast not considered."
+        )
+        return CaseResult()
+
+    result = CaseResult(obs_total=nOBS)
+
+    latObs = obs.latitudes
+    lonObs = obs.longitudes
+    valuesObs = obs.values
+
+    # All the observations are kept for instantaneous predictands. For
+    # accumulated ones, the mask is computed from the reference computation.
+    mask = np.ones(nOBS, dtype=bool)
+
+    if config.parameters.evaluation not in ("field", "point"):
+        raise ValueError(f"invalid evaluation mode: {config.parameters.evaluation}")
+
+    evaluator = NodeEvaluator(
+        context=context,
+        curr_date=curr_date,
+        curr_time=curr_time,
+        step_s=step_s,
+        stations=obs,
+    )
+
+    logging.info("")
+    logging.info("PREDICTORS COMPUTATIONS:")
+
+    base_computations, derived_computations = split_computations(config)
+    graph = ComputationGraph.from_config(config)
+
+    # Values of the post-processed computations at the stations, by short
+    # name. The mask is applied once all the computations are done.
+    points = {}
+    ref_values = None
+
+    def evaluate(node: Node, inputs: list):
+        nonlocal mask, ref_values
+
+        computation = node.computation
+        computed_value = evaluator(node, inputs)
+
+        # A computation that is not post-processed, probably serves the only
+        # purpose of an input for a (future) derived computation.
+        if not node.is_post_processed:
+            return computed_value
+
+        if node.is_base:
+            logging.info("  Selecting the nearest grid point to observations.")
+
+        values = evaluator.to_points(computed_value)
+        for shortname in (c.shortname for c in node.computations):
+            points[shortname] = values
+
+        if node.is_reference:
+            if config.predictand.is_accumulated:
+                mask = values >= predictand_min_value
+                logging.info(
+                    f"  Selecting values that correspond to {computation.shortname}"
+                    f" >= {predictand_min_value} {predictand_scaled_units}/{acc}h."
+                )
+
+            ref_values = values[mask]
+
+            if ref_values.size == 0:
+                if config.predictand.is_accumulated:
+                    logging.warning(
+                        f"  The observation file does not contain observations that correspond to "
+                        f" {computation.shortname} >= "
+                        f"{predictand_min_value} {predictand_scaled_units}/{acc}h."
+                    )
+                else:
+                    # [TODO] - Add a specific logger message
+                    pass
+
+                raise _NoReferenceValue()
+
+        if node.is_base:
+            logging.info("")
+
+        return computed_value
+
+    try:
+        graph.run(evaluate, threads=evaluator.threads)
+    except (MissingInput, _NoReferenceValue):
+        return result
+
+    computations_result = [
+        (
+            computation.shortname,
+            np.around(points[computation.shortname][mask], decimals=3),
+        )
+        for computation in base_computations + derived_computations
+        if computation.isPostProcessed
+    ]
+
+    # Compute other parameters
+    latObs = latObs[mask]
+    lonObs = lonObs[mask]
+    valuesObs = valuesObs[mask]
+
+    vals_errors = []
+
+    logging.info(f"  Computing the {config.predictand.error}.")
+    if config.predictand.error == "FER":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            FER = (valuesObs - ref_values) / ref_values
+        vals_errors.append(("FER", np.around(FER, decimals=3)))
+
+    if config.predictand.error == "FE":
+        FE = valuesObs - ref_values
+        vals_errors.append(("FE", np.around(FE, decimals=3)))
+
+    LST_computation = next(
+        (
+            computation
+            for computation in computations
+            if computation.field == "LOCAL_SOLAR_TIME"
+        ),
+        None,
+    )
+    if LST_computation and LST_computation.isPostProcessed:
+        vals_LST = [
+            (
+                "LST",
+                np.around(
+                    Computer(LST_computation).run(lonObs, HourVF_num), decimals=3
+                ),
+            )
+        ]
+    else:
+        vals_LST = []
+
+    # Saving the output file in ascii format
+    n = len(valuesObs)
+    logging.info("")
+    logging.info("POINT DATA TABLE:")
+    logging.info(
+        f"  Saving the point data table to output file: {config.parameters.out_path}"
+    )
+    logging.info(f"  Point data table format: {config.parameters.out_format}")
+
+    # The columns of the case are scalars, repeated by the serializers.
+    result.columns = (
+        [
+            ("BaseDate", curr_date.strftime("%Y-%m-%d")),
+            ("BaseTime", curr_time),
+            ("StepF" if config.predictand.is_accumulated else "Step", step_s + acc),
+            ("DateOBS", validDateF.strftime("%Y-%m-%d")),
+            ("TimeOBS", HourVF),
+        ]
+        + [
+            ("LatOBS", latObs),
+            ("LonOBS", lonObs),
+            ("OBS", valuesObs),
+            ("Predictand", np.around(ref_values, decimals=3)),
+        ]
+        + vals_errors
+        + vals_LST
+        + computations_result
+    )
+    result.obs_used = n
+
+    return result
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+import attr
+
+from core.models import Config
+
+
+def get_checkpoint_path(path: str) -> str:
+    return f"{path}.checkpoint"
+
+
+def get_config_fingerprint(config: Config) -> str:
+    """
+    Hash of the parts of the config that define the content of the point
+    data table. Parameters that only affect how the table is computed, like
+    the number of workers, are left out.
+    """
+    data = attr.asdict(
+        config, filter=lambda attribute, _: not attribute.metadata.get("runtime")
+    )
+    text = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+@attr.s(slots=True)
+class Checkpoint(object):
+    """
+    Progress of a point data table computation, saved next to the output
+    file so that an interrupted run can be resumed.
+    """
+
+    fingerprint = attr.ib(converter=str)
+
+    # Number of cases processed from the beginning of the run, including
+    # the skipped ones.
+    completed = attr.ib(converter=int, default=0)
+
+    # Running values of the footer counters.
+    obs_total = attr.ib(converter=int, default=0)
+    obs_used = attr.ib(converter=int, default=0)
+
+    # State of the point data table writer.
+    serializer = attr.ib(factory=dict)
+
+    # Header of the point data table, if different from the one of the
+    # config, like when extending an existing table.
+    header = attr.ib(default=None)
+
+    # Calibration period (start, end) of the point data table being extended,
+    # whose cases are not computed again.
+    skip_period = attr.ib(default=None)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Checkpoint"]:
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            return cls(**json.load(f))
+
+    def save(self, path: str):
+        # Write the file atomically, so that a crash while saving the
+        # checkpoint does not corrupt the previous one.
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(attr.asdict(self), f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, path)
@@ -0,0 +1,190 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.loaders import load_point_data_by_path
+from core.loaders.ascii import ASCIIDecoder, ASCIIEncoder
+from core.loaders.parquet import ParquetPointDataTableWriter
+from core.models import Computation, Config
+
+from ..computations.models import Computer
+from .cache import PointObservations
+from .cases import MissingInput, NodeEvaluator, RunContext
+from .dag import ComputationGraph, Node
+from .log_factory import point_data_table_header
+from .writer import get_parquet_options
+
+
+def get_column_name(computation: Computation) -> str:
+    """
+    Name of the column of a computation in the point data table. The local
+    solar time is always written as LST by run().
+    """
+    if computation.field == "LOCAL_SOLAR_TIME":
+        return "LST"
+
+    return computation.shortname
+
+
+def get_new_computations(config: Config, columns: List[str]) -> List[Computation]:
+    """
+    Post-processed computations of the config missing from the columns of a
+    point data table.
+    """
+    return [
+        computation
+        for computation in config.computations
+        if computation.isPostProcessed and get_column_name(computation) not in columns
+    ]
+
+
+def compute_case_columns(
+    context: RunContext,
+    graph: ComputationGraph,
+    new_computations: List[Computation],
+    rows: pd.DataFrame,
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Compute the values of the `new_computations` at the stations of the rows
+    of a point data table that belong to the same case.
+
+    :param graph: Graph of the computations needed by `new_computations`.
+
+    :return: The computed values, by column name, or None if a forecast file
+        is missing or cannot be read.
+    """
+    config = context.config
+    acc = config.predictand.accumulation
+    step_column = "StepF" if config.predictand.is_accumulated else "Step"
+
+    lats = rows["LatOBS"].to_numpy(dtype=np.float64)
+    lons = rows["LonOBS"].to_numpy(dtype=np.float64)
+
+    evaluator = NodeEvaluator(
+        context=context,
+        curr_date=datetime.strptime(str(rows["BaseDate"].iloc[0]), "%Y-%m-%d").date(),
+        curr_time=int(rows["BaseTime"].iloc[0]),
+        step_s=int(rows[step_column].iloc[0]) - acc,
+        stations=PointObservations(
+            latitudes=lats, longitudes=lons, values=np.full(len(lats), np.nan)
+        ),
+    )
+
+    values = {}
+
+    def evaluate(node: Node, inputs: list):
+        computed_value = evaluator(node, inputs)
+
+        for computation in node.computations:
+            if computation in new_computations:
+                logging.info(f"  Computed {computation.fullname}.")
+                values[computation.shortname] = np.around(
+                    evaluator.to_points(computed_value), decimals=3
+                )
+
+        return computed_value
+
+    try:
+        graph.run(evaluate, threads=evaluator.threads)
+    except MissingInput:
+        return None
+
+    for computation in new_computations:
+        if computation.field == "LOCAL_SOLAR_TIME":
+            values["LST"] = np.around(
+                Computer(computation).run(lons, int(rows["TimeOBS"].iloc[0])),
+                decimals=3,
+            )
+
+    return values
+
+
+def add_columns(config: Config, path: str):
+    """
+    Write a new point data table at the output path of the config, with the
+    rows and columns of the point data table at `path`, plus the columns of
+    the post-processed computations of the config that it does not contain.
+
+    Only the computations needed by the new columns are run, and only the
+    forecast files they need are read. The values are computed at the
+    stations of the existing rows, case by case, so that the new columns
+    are aligned with the (BaseDate, BaseTime, Step, LatOBS, LonOBS) keys of
+    the existing rows. If a forecast file is missing, the new columns of
+    the case are set to NaN.
+    """
+    loader = load_point_data_by_path(path)
+    columns = loader.columns
+
+    computations = get_new_computations(config, columns)
+    if not computations:
+        raise ValueError(f"No new computation to add to the point data table: {path}")
+
+    for computation in computations:
+        if (
+            len(computation.inputs) == 1
+            and computation.inputs[0]["code"] == config.predictand.code
+        ):
+            raise ValueError(
+                f"Cannot add the reference computation {computation.shortname} "
+                f"to an existing point data table"
+            )
+
+    graph = ComputationGraph.from_config(config).subgraph(computations)
+
+    if isinstance(loader, ASCIIDecoder):
+        _, footer = loader.read_footer()
+    else:
+        footer = loader.metadata.get("footer", "")
+
+    if config.parameters.out_format == "ASCII":
+        serializer = ASCIIEncoder(
+            path=config.parameters.out_path, dialect=config.parameters.ascii_dialect
+        )
+    elif config.parameters.out_format == "PARQUET":
+        serializer = ParquetPointDataTableWriter(
+            path=config.parameters.out_path, **get_parquet_options(config)
+        )
+
+    serializer.add_header(point_data_table_header(config).strip())
+
+    logging.info(
+        f"Adding {', '.join(c.shortname for c in computations)} to the point data "
+        f"table: {path}"
+    )
+
+    context = RunContext.from_config(config)
+    keys = [
+        "BaseDate",
+        "BaseTime",
+        "StepF" if config.predictand.is_accumulated else "Step",
+    ]
+
+    for chunk in loader:
+        # The rows of a case are contiguous in a point data table.
+        cases = (chunk[keys] != chunk[keys].shift()).any(axis=1).cumsum()
+
+        for _, rows in chunk.groupby(cases, sort=False):
+            logging.info("")
+            logging.info(
+                f"Case {rows['BaseDate'].iloc[0]}, {int(rows['BaseTime'].iloc[0]):02d} UTC, "
+                f"{keys[-1]} {int(rows[keys[-1]].iloc[0])}: {len(rows)} row(s)"
+            )
+
+            values = compute_case_columns(context, graph, computations, rows)
+
+            if values is None:
+                values = {
+                    get_column_name(computation): np.full(len(rows), np.nan)
+                    for computation in computations
+                }
+
+            serializer.add_columns_chunk(
+                [(column, rows[column].to_numpy()) for column in columns]
+                + [(name, values[name]) for name in map(get_column_name, computations)]
+            )
+
+    serializer.add_footer(footer)
+    serializer.close()
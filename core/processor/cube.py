@@ -0,0 +1,181 @@
+import copy
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from core.loaders import grib
+from core.loaders.cube import (
+    LATITUDES_FILE,
+    LONGITUDES_FILE,
+    METADATA_FILE,
+    POINTS_FILE,
+    ForecastCube,
+    get_present_path,
+    get_values_path,
+)
+from core.loaders.fieldset import Fieldset, NumpyFieldset
+from core.models import Config
+
+from .cases import (
+    RunContext,
+    get_computation_steps,
+    get_grib_path,
+    get_validity_datetime,
+    iter_cases,
+    read_observations,
+    split_computations,
+)
+
+
+def build_cube(config: Config) -> ForecastCube:
+    """
+    Extract the values of the GRIB files read by the cases of the config at
+    the grid points nearest to the stations of their observations, into a
+    forecast cube at the cube path of the predictors.
+
+    Later runs of configurations with the point evaluation read the values
+    from the cube instead of the GRIB files, as long as they use the same
+    files and stations. The GRIB files that are not on the grid of the
+    first one are left out of the cube, and read from the GRIB files.
+    """
+    path = config.predictors.cube
+    if path is None:
+        raise ValueError("no forecast cube path in the configuration")
+
+    # The cube does not exist yet, and is not read by the context.
+    cube_config = copy.copy(config)
+    cube_config.predictors = copy.copy(config.predictors)
+    cube_config.predictors.cube = None
+    context = RunContext.from_config(cube_config)
+
+    tasks = [task for task in iter_cases(config) if not task.skip]
+    base_computations, _ = split_computations(config)
+
+    # Position of the GRIB files in the cube, by path.
+    files = {}
+    latitudes, longitudes = [], []
+
+    for task in tasks:
+        base = datetime.combine(task.curr_date, datetime.min.time()) + timedelta(
+            hours=task.curr_time
+        )
+
+        for computation in base_computations:
+            code = computation.inputs[0]["code"]
+
+            for step in get_computation_steps(config, computation, task.step_s):
+                grib_path = get_grib_path(
+                    config, task.curr_date, task.curr_time, code, step
+                )
+                files[grib_path] = (code, base, step)
+
+        validity = get_validity_datetime(
+            config, task.curr_date, task.curr_time, task.step_s
+        )
+        try:
+            observations = read_observations(context, validity)
+        except Exception:
+            continue
+
+        latitudes.append(observations.latitudes)
+        longitudes.append(observations.longitudes)
+
+    grid_path = next((p for p in files if os.path.exists(p)), None)
+    if grid_path is None:
+        raise ValueError("No GRIB file found for the cases of the configuration.")
+
+    geometry = NumpyFieldset.from_path(grid_path).geometry
+    section_key = grib.read_grid_key(grid_path)
+
+    def on_grid(grib_path) -> bool:
+        # The grid sections are compared if both files use the simple
+        # packing, and the grid geometries otherwise.
+        key = grib.read_grid_key(grib_path) if section_key else None
+        if key is not None:
+            return key == section_key
+
+        return NumpyFieldset.from_path(grib_path).grid_key == geometry.key
+
+    points = np.unique(
+        geometry.grid_index.query(
+            np.concatenate(latitudes or [np.empty(0)]),
+            np.concatenate(longitudes or [np.empty(0)]),
+        )
+    )
+
+    path.mkdir(parents=True, exist_ok=True)
+    np.save(path / LATITUDES_FILE, geometry.latitudes)
+    np.save(path / LONGITUDES_FILE, geometry.longitudes)
+    np.save(path / POINTS_FILE, points)
+
+    times = sorted({base for _, base, _ in files.values()})
+    steps = sorted({step for _, _, step in files.values()})
+    codes = sorted({code for code, _, _ in files.values()})
+
+    time_index = {base: i for i, base in enumerate(times)}
+    step_index = {step: i for i, step in enumerate(steps)}
+
+    for code in codes:
+        values = np.lib.format.open_memmap(
+            get_values_path(path, code),
+            mode="w+",
+            dtype=np.float64,
+            shape=(len(times), len(steps), len(points)),
+        )
+        values[:] = np.nan
+        present = np.zeros((len(times), len(steps)), dtype=bool)
+
+        for grib_path, (file_code, base, step) in list(files.items()):
+            if file_code != code:
+                continue
+
+            i, j = time_index[base], step_index[step]
+
+            try:
+                if not on_grid(grib_path):
+                    logging.warning(
+                        f"Forecast file on another grid, left out of the cube: "
+                        f"{grib_path}."
+                    )
+                    del files[grib_path]
+                    continue
+
+                values[i, j] = Fieldset.from_path(grib_path, points=points)
+            except IOError:
+                logging.warning(f"Forecast file not found: {grib_path}.")
+                continue
+            except Exception:
+                logging.error(f"Reading forecast file failed: {grib_path}.")
+                continue
+
+            present[i, j] = True
+
+        values.flush()
+        del values
+        np.save(get_present_path(path, code), present)
+
+        logging.info(
+            f"Forecast cube: {int(present.sum())} GRIB file(s) of {code} "
+            f"at {len(points)} grid point(s)."
+        )
+
+    # The metadata is written last, so that the cube is only readable once
+    # complete.
+    metadata = {
+        "grid_key": geometry.key,
+        "files": {
+            os.path.relpath(grib_path, config.predictors.path): [
+                code,
+                time_index[base],
+                step_index[step],
+            ]
+            for grib_path, (code, base, step) in files.items()
+        },
+    }
+    with open(path / METADATA_FILE, "w") as f:
+        json.dump(metadata, f)
+
+    return ForecastCube(path, archive=config.predictors.path)
@@ -0,0 +1,246 @@
+import heapq
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List
+
+import attr
+
+from core.models import Computation, Config
+
+
+@attr.s(slots=True, eq=False)
+class Node(object):
+    """
+    Expression of the computation graph of a config. The computations with
+    the same field, scaling and inputs share the same node, and are only
+    evaluated once.
+    """
+
+    # Computations evaluated by the node, in the order of the config.
+    computations: List[Computation] = attr.ib()
+
+    # Nodes of the inputs of the computation, or an empty list if the inputs
+    # are predictors read from the GRIB files.
+    inputs: List["Node"] = attr.ib(factory=list)
+
+    @property
+    def computation(self) -> Computation:
+        return self.computations[0]
+
+    @property
+    def is_base(self) -> bool:
+        return not self.inputs
+
+    @property
+    def is_reference(self) -> bool:
+        return any(computation.is_reference for computation in self.computations)
+
+    @property
+    def is_post_processed(self) -> bool:
+        return any(computation.isPostProcessed for computation in self.computations)
+
+
+@attr.s(slots=True)
+class ComputationGraph(object):
+    """
+    Computations of a config, except the local solar time, as a directed
+    acyclic graph of nodes.
+
+    The nodes are sorted topologically. Among the nodes whose inputs are
+    available, the base nodes come first, the reference one leading, then
+    the derived ones, in the order of the config, so that a sequential
+    evaluation runs the computations in the order of the point data table.
+    """
+
+    nodes: List[Node] = attr.ib()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "ComputationGraph":
+        codes = set(config.predictors.codes)
+        computations = [
+            computation
+            for computation in config.computations
+            if computation.field != "LOCAL_SOLAR_TIME"
+        ]
+        by_shortname = {
+            computation.shortname: computation for computation in computations
+        }
+        position = {
+            computation.shortname: i for i, computation in enumerate(computations)
+        }
+
+        nodes = {}
+        node_of = {}
+        visiting = set()
+
+        def visit(computation: Computation) -> Node:
+            if computation.shortname in node_of:
+                return node_of[computation.shortname]
+
+            if computation.shortname in visiting:
+                raise ValueError(
+                    f"Cyclic inputs of the computation {computation.shortname}."
+                )
+
+            input_codes = [field_input["code"] for field_input in computation.inputs]
+            inputs = []
+
+            if not set(input_codes) <= codes:
+                visiting.add(computation.shortname)
+
+                for code in input_codes:
+                    if code not in by_shortname:
+                        raise ValueError(
+                            f"Unknown input {code} of the computation "
+                            f"{computation.shortname}."
+                        )
+                    inputs.append(visit(by_shortname[code]))
+
+                visiting.discard(computation.shortname)
+
+            # Derived computations are identified by the nodes of their
+            # inputs, so that common subexpressions are shared transitively.
+            key = (
+                computation.field,
+                tuple(id(node) for node in inputs) if inputs else tuple(input_codes),
+                computation.mulScale,
+                computation.addScale,
+            )
+
+            if key in nodes:
+                node = nodes[key]
+                node.computations.append(computation)
+                node.computations.sort(key=lambda c: position[c.shortname])
+            else:
+                node = nodes[key] = Node(computations=[computation], inputs=inputs)
+
+            node_of[computation.shortname] = node
+            return node
+
+        for computation in computations:
+            visit(computation)
+
+        def rank(node: Node):
+            return (
+                not node.is_base,
+                not node.is_reference,
+                position[node.computation.shortname],
+            )
+
+        return cls(nodes=_topological_sort(list(nodes.values()), key=rank))
+
+    def subgraph(self, computations: Iterable[Computation]) -> "ComputationGraph":
+        """
+        Graph of the nodes needed to evaluate `computations`, like the new
+        columns of add_columns(), in the order of the graph.
+        """
+        shortnames = {computation.shortname for computation in computations}
+        required = set()
+        pending = [
+            node
+            for node in self.nodes
+            if any(c.shortname in shortnames for c in node.computations)
+        ]
+
+        while pending:
+            node = pending.pop()
+            if node not in required:
+                required.add(node)
+                pending.extend(node.inputs)
+
+        return ComputationGraph(nodes=[node for node in self.nodes if node in required])
+
+    def run(self, evaluate: Callable[[Node, List[Any]], Any], threads: int = 1) -> None:
+        """
+        Evaluate the nodes of the graph.
+
+        `evaluate(node, inputs)` is called with the values of the input nodes,
+        and returns the value of the node. The value of a node is released
+        as soon as the last node using it has been evaluated, so the caller
+        has to keep what it needs of it, like the values at the stations.
+
+        With more than one thread, the nodes whose inputs are available are
+        evaluated concurrently, and `evaluate` must be thread-safe. The
+        first exception raised by `evaluate` stops the evaluation, once the
+        running nodes are done, and is raised again.
+        """
+        # Number of nodes still to evaluate using the value of every node.
+        consumers = Counter(
+            input_node for node in self.nodes for input_node in node.inputs
+        )
+        values: Dict[Node, Any] = {}
+
+        def complete(node: Node, value: Any):
+            for input_node in node.inputs:
+                consumers[input_node] -= 1
+                if consumers[input_node] == 0:
+                    del values[input_node]
+
+            if consumers[node] > 0:
+                values[node] = value
+
+        if threads <= 1:
+            for node in self.nodes:
+                complete(node, evaluate(node, [values[n] for n in node.inputs]))
+            return
+
+        # Nodes waiting for their inputs, and nodes ready to run, by position.
+        position = {node: i for i, node in enumerate(self.nodes)}
+        waiting = {node: len(set(node.inputs)) for node in self.nodes}
+        dependents = defaultdict(set)
+        for node in self.nodes:
+            for input_node in node.inputs:
+                dependents[input_node].add(node)
+
+        ready = [position[node] for node in self.nodes if waiting[node] == 0]
+        heapq.heapify(ready)
+        running = {}
+
+        with ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="computation"
+        ) as executor:
+            while ready or running:
+                while ready and len(running) < threads:
+                    node = self.nodes[heapq.heappop(ready)]
+                    inputs = [values[n] for n in node.inputs]
+                    running[executor.submit(evaluate, node, inputs)] = node
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    node = running.pop(future)
+                    complete(node, future.result())
+
+                    for dependent in dependents[node]:
+                        waiting[dependent] -= 1
+                        if waiting[dependent] == 0:
+                            heapq.heappush(ready, position[dependent])
+
+
+def _topological_sort(nodes: List[Node], key: Callable[[Node], Any]) -> List[Node]:
+    """
+    Sort the nodes after their inputs, picking the smallest `key` among the
+    nodes whose inputs are sorted.
+    """
+    position = {node: i for i, node in enumerate(nodes)}
+    waiting = {node: len(set(node.inputs)) for node in nodes}
+    dependents = defaultdict(set)
+    for node in nodes:
+        for input_node in node.inputs:
+            dependents[input_node].add(node)
+
+    ready = [(key(node), position[node]) for node in nodes if waiting[node] == 0]
+    heapq.heapify(ready)
+    result = []
+
+    while ready:
+        _, i = heapq.heappop(ready)
+        node = nodes[i]
+        result.append(node)
+
+        for dependent in dependents[node]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                heapq.heappush(ready, (key(dependent), position[dependent]))
+
+    return result
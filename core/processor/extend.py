@@ -0,0 +1,192 @@
+import logging
+import re
+from datetime import date
+from typing import Iterable, Iterator, Optional, Set, Tuple
+
+import attr
+
+from core.loaders import load_point_data_by_path
+from core.loaders.ascii import ASCIIDecoder
+from core.models import Config
+from core.utils import format_date
+
+from .cases import CaseTask
+from .checkpoint import Checkpoint
+
+
+def read_calibration_period(header: str) -> Optional[Tuple[date, date]]:
+    start = re.search(r"Start Calibration Period\s+= (\S+)", header)
+    end = re.search(r"End Calibration Period\s+= (\S+)", header)
+
+    if not start or not end:
+        return None
+
+    return format_date(start.group(1)), format_date(end.group(1))
+
+
+def update_calibration_period(header: str, config: Config) -> str:
+    """
+    Replace the calibration period in the header of a point data table. The
+    length of the header is unchanged, so that it can be rewritten in place.
+    """
+    for name, value in (
+        ("Start", config.parameters.date_start),
+        ("End", config.parameters.date_end),
+    ):
+        header = re.sub(
+            rf"({name} Calibration Period\s+= )(\S+)", rf"\g<1>{value}", header
+        )
+
+    return header
+
+
+def read_footer_counters(footer: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse the number of observations considered in the calibration period
+    (obsTOT), and the number of observations used (obsUSED), from the footer
+    of a point data table.
+    """
+    total = re.search(r"considered in the calibration period: (\d+)", footer)
+    used = re.search(r"that correspond to .*: (\d+)", footer)
+
+    return (
+        int(total.group(1)) if total else None,
+        int(used.group(1)) if used else None,
+    )
+
+
+@attr.s(slots=True)
+class Extension(object):
+    # Starting point of the computation: footer counters, header and writer
+    # state of the existing point data table.
+    checkpoint: Checkpoint = attr.ib()
+
+    # (BaseDate, BaseTime, Step) of the cases in the existing table.
+    keys: Set[Tuple[str, int, int]] = attr.ib(factory=set)
+
+
+def prepare_extension(config: Config, fingerprint: str) -> Extension:
+    """
+    Read an existing point data table at the output path of the config, so
+    that run() can append the cases that are not in the table yet.
+
+    The table must have been created with the same configuration, except
+    for a calibration period included in the one of the config.
+    """
+    path = config.parameters.out_path
+    loader = load_point_data_by_path(path)
+
+    if not loader.columns:
+        raise ValueError(f"Cannot extend an empty point data table: {path}")
+
+    header = loader.metadata["header"]
+    period = read_calibration_period(header)
+    if period is None:
+        raise ValueError(f"Calibration period not found in the header of {path}")
+
+    if (
+        period[0] < config.parameters.date_start
+        or period[1] > config.parameters.date_end
+    ):
+        raise ValueError(
+            f"The calibration period of {path} ({period[0]} - {period[1]}) is not "
+            f"included in the calibration period of the configuration."
+        )
+
+    expected_predictors = {
+        computation.shortname
+        for computation in config.computations
+        if computation.isPostProcessed
+    }
+    if set(loader.predictors) != expected_predictors:
+        raise ValueError(
+            f"The predictors of {path} do not match the configuration: "
+            f"{sorted(loader.predictors)} != {sorted(expected_predictors)}"
+        )
+
+    step = "StepF" if config.predictand.is_accumulated else "Step"
+    df = loader.select("BaseDate", "BaseTime", step, series=False)
+    keys = {
+        (str(base_date), int(base_time), int(step_f))
+        for base_date, base_time, step_f in zip(
+            df["BaseDate"].astype(str), df["BaseTime"], df[step]
+        )
+    }
+    n_rows = len(df)
+
+    header = update_calibration_period(header, config)
+
+    if isinstance(loader, ASCIIDecoder):
+        if loader.dialect != config.parameters.ascii_dialect:
+            raise ValueError(
+                f"The rows of {path} are in the {loader.dialect} layout, not in "
+                f"the {config.parameters.ascii_dialect} one of the configuration."
+            )
+
+        offset, footer = loader.read_footer()
+
+        # Rewrite the calibration period in place.
+        with open(path, "r+") as f:
+            f.write(header)
+
+        serializer_state = {"offset": offset}
+    else:
+        footer = loader.metadata.get("footer", "")
+
+        # The row groups of the new cases are appended to the existing
+        # table, without rewriting it.
+        serializer_state = {"parts": [], "extend": True}
+
+    obs_total, obs_used = read_footer_counters(footer)
+
+    # Every row of the table is an observation used in the calibration.
+    if obs_used is None:
+        obs_used = n_rows
+
+    if obs_total is None:
+        logging.warning(
+            f"The number of observations considered in the calibration period is "
+            f"missing from the footer of {path}. Counting only the rows of the table."
+        )
+        obs_total = obs_used
+
+    checkpoint = Checkpoint(
+        fingerprint=fingerprint,
+        obs_total=obs_total,
+        obs_used=obs_used,
+        serializer=serializer_state,
+        header=header,
+        skip_period=[str(period[0]), str(period[1])],
+    )
+
+    return Extension(checkpoint=checkpoint, keys=keys)
+
+
+def skip_existing_cases(
+    config: Config,
+    tasks: Iterable[CaseTask],
+    checkpoint: Checkpoint,
+    keys: Set[Tuple[str, int, int]] = frozenset(),
+) -> Iterator[CaseTask]:
+    """
+    Mark as skipped the cases already computed in the point data table being
+    extended: the ones in its calibration period, and the ones with a
+    (BaseDate, BaseTime, Step) tuple found in the table.
+
+    The cases are still yielded, so that the number of cases processed
+    saved in the checkpoints counts all the cases of the calibration period.
+    """
+    start, end = (format_date(value) for value in checkpoint.skip_period)
+
+    for task in tasks:
+        if not task.skip:
+            key = (
+                task.curr_date.strftime("%Y-%m-%d"),
+                task.curr_time,
+                task.step_s + config.predictand.accumulation,
+            )
+
+            if start <= task.curr_date <= end or key in keys:
+                task.skip = "  Forecast already in the point data table."
+
+        yield task
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 from textwrap import dedent
 
 
@@ -119,3 +120,51 @@ def step_information_logs(config):
     Therefore, {step} will range between t+{config.parameters.spinup_limit} and t+{config.parameters.model_interval + config.parameters.spinup_limit - 1}
     """
     )
+
+
+def point_data_table_header(config):
+    header = dedent(
+        f"""
+        # THIS IS AN AUTOGENERATED FILE. DO NOT EDIT THIS FILE DIRECTLY.
+        #
+        # Created on {datetime.now()}.
+        #
+        # """  # Do NOT strip
+    )
+
+    header += "\n# ".join(general_parameters_logs(config).split("\n"))
+    header += "\n# ".join(predictand_logs(config).split("\n"))
+    header += "\n# ".join(predictors_logs(config).split("\n"))
+    header += "\n# ".join(observations_logs(config).split("\n"))
+    header += "\n# ".join(output_file_logs(config).split("\n"))
+    header += "\n# ".join(point_data_table_logs(config).split("\n"))
+    header += "\n# ".join(step_information_logs(config).split("\n"))
+
+    return header
+
+
+def point_data_table_footer(config, obs_total, obs_used):
+    if not config.predictand.is_accumulated:
+        return f"# No of observations considered in the calibration period: {obs_total}"
+
+    acc = config.predictand.accumulation
+    predictand_min_value = (
+        config.predictand.min_value + config.computations[0].addScale
+    ) * config.computations[0].mulScale
+    predictand_scaled_units = config.observations.units
+    ref_code = next(
+        (
+            computation.shortname
+            for computation in config.computations
+            if len(computation.inputs) == 1
+            and computation.inputs[0]["code"] == config.predictand.code
+        ),
+        None,
+    )
+
+    return dedent(
+        f"""
+        # No of observations considered in the calibration period: {obs_total}
+        # No of observations that correspond to {ref_code} >= {predictand_min_value} {predictand_scaled_units}/{acc}h: {obs_used}
+        """
+    ).strip()
@@ -0,0 +1,118 @@
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Tuple
+
+from core.models import Config
+
+from .cases import CaseResult, CaseTask, RunContext, log_case_header, process_case
+
+
+class _BufferingHandler(logging.Handler):
+    """
+    Logging handler used in the worker processes to hold the log records of
+    the case being computed, so that they can be replayed by the parent
+    process in case order.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        # Render the message, since the arguments and the traceback objects
+        # are not guaranteed to be picklable.
+        record.msg = self.format(record)
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        self.records.append(record)
+
+
+_worker_context = None
+_worker_handler = None
+
+
+def _process_case(context: RunContext, task: CaseTask) -> CaseResult:
+    stats = context.stats.copy()
+    result = process_case(context, task)
+    result.stats = context.stats - stats
+    return result
+
+
+def _init_worker(config: Config):
+    global _worker_context, _worker_handler
+
+    _worker_context = RunContext.from_config(config)
+    _worker_handler = _BufferingHandler()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_worker_handler)
+    root.setLevel(logging.INFO)
+
+
+def _process_case_in_worker(task: CaseTask):
+    _worker_handler.records = []
+    result = _process_case(_worker_context, task)
+    return result, _worker_handler.records
+
+
+def iter_case_results(
+    context: RunContext, tasks: Iterable[CaseTask]
+) -> Iterator[Tuple[CaseTask, CaseResult]]:
+    """
+    Compute the cases and yield (task, result) tuples in the order of `tasks`.
+
+    Skipped tasks are yielded with a None result. If the number of workers in
+    the config is greater than 1, the cases are fanned out to a pool of
+    processes, each with its own RunContext. The log records of every case are
+    replayed in the parent process, so that the log file is identical to a
+    serial run.
+    """
+    config = context.config
+    workers = config.parameters.workers
+
+    if workers <= 1:
+        for task in tasks:
+            if task.skip:
+                log_case_header(task)
+                logging.info(task.skip)
+                yield task, None
+            else:
+                yield task, _process_case(context, task)
+        return
+
+    # Bound the number of cases in flight, in order to limit the memory used
+    # by the results waiting to be merged.
+    window = 2 * workers
+    pending = deque()
+
+    def drain(limit):
+        while len(pending) > limit:
+            task, future = pending.popleft()
+
+            if future is None:
+                log_case_header(task)
+                logging.info(task.skip)
+                yield task, None
+                continue
+
+            result, records = future.result()
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+
+            yield task, result
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(config,)
+    ) as executor:
+        for task in tasks:
+            future = (
+                None if task.skip else executor.submit(_process_case_in_worker, task)
+            )
+            pending.append((task, future))
+            yield from drain(window)
+
+        yield from drain(0)
@@ -0,0 +1,158 @@
+import logging
+import os
+from collections import Counter
+from typing import Dict, List
+
+import attr
+
+from core.models import Config
+
+from .cases import get_case_paths, iter_cases
+
+
+@attr.s(slots=True)
+class Plan(object):
+    """
+    Files read by the computation of a point data table, as expanded from
+    the config before running it.
+    """
+
+    # Number of cases in the calibration period, and number of cases that
+    # are skipped because they repeat a forecast, fall outside the period or
+    # have no observation file.
+    cases = attr.ib(default=0)
+    skipped_cases = attr.ib(default=0)
+
+    # Number of times every file is read, by path.
+    observation_reads: Counter = attr.ib(factory=Counter)
+    forecast_reads: Counter = attr.ib(factory=Counter)
+
+    # Sizes of the files found, by path.
+    sizes: Dict[str, int] = attr.ib(factory=dict)
+
+    @property
+    def missing_observations(self) -> List[str]:
+        return sorted(path for path in self.observation_reads if path not in self.sizes)
+
+    @property
+    def missing_forecasts(self) -> List[str]:
+        return sorted(path for path in self.forecast_reads if path not in self.sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        """Size of the files to read, counting every file once."""
+        return sum(self.sizes.values())
+
+    @property
+    def cache_reuse(self) -> Dict[str, float]:
+        """
+        Fraction of the file reads served by the caches, if they are large
+        enough to hold every file.
+        """
+        return {
+            name: (1 - len(reads) / sum(reads.values())) if reads else 0.0
+            for name, reads in (
+                ("observations", self.observation_reads),
+                ("forecasts", self.forecast_reads),
+            )
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "cases": self.cases,
+            "skippedCases": self.skipped_cases,
+            "observationFiles": len(self.observation_reads),
+            "forecastFiles": len(self.forecast_reads),
+            "missingObservations": self.missing_observations,
+            "missingForecasts": self.missing_forecasts,
+            "totalBytes": self.total_bytes,
+            "cacheReuse": self.cache_reuse,
+        }
+
+
+def _scan(paths) -> Dict[str, int]:
+    """
+    Sizes of the files in `paths` that exist, listing every directory only
+    once instead of calling stat() on every path.
+    """
+    by_directory = {}
+    for path in paths:
+        directory, name = os.path.split(path)
+        by_directory.setdefault(directory, set()).add(name)
+
+    sizes = {}
+    for directory, names in by_directory.items():
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name in names and entry.is_file():
+                        path = os.path.join(directory, entry.name)
+                        sizes[path] = entry.stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+
+    return sizes
+
+
+def plan(config: Config) -> Plan:
+    """
+    Expand the cases of the config into the observation and forecast files
+    that run() would read, and check that they exist, without reading them.
+
+    The cases whose observation file is missing are counted as skipped, and
+    their forecast files are not counted, since these cases are skipped by
+    run().
+    """
+    result = Plan()
+
+    tasks = list(iter_cases(config))
+    result.cases = len(tasks)
+
+    cases = []
+    for task in tasks:
+        if task.skip:
+            result.skipped_cases += 1
+        else:
+            obs_path, grib_paths = get_case_paths(config, task)
+            cases.append((str(obs_path), [str(path) for path in grib_paths]))
+
+    result.observation_reads.update(obs_path for obs_path, _ in cases)
+    result.sizes.update(_scan(result.observation_reads))
+
+    for obs_path, grib_paths in cases:
+        if obs_path in result.sizes:
+            result.forecast_reads.update(grib_paths)
+        else:
+            result.skipped_cases += 1
+
+    result.sizes.update(_scan(result.forecast_reads))
+
+    log_plan(result)
+    return result
+
+
+def log_plan(result: Plan):
+    logging.info(
+        f"Cases: {result.cases} ({result.skipped_cases} skipped, "
+        f"{result.cases - result.skipped_cases} to compute)."
+    )
+
+    for name, reads, missing in (
+        ("Observation", result.observation_reads, result.missing_observations),
+        ("Forecast", result.forecast_reads, result.missing_forecasts),
+    ):
+        logging.info(
+            f"{name} files: {len(reads)} file(s), {sum(reads.values())} read(s), "
+            f"{len(missing)} missing."
+        )
+
+        for path in missing:
+            logging.warning(f"  Missing {name.lower()} file: {path}")
+
+    logging.info(f"Total size of the files to read: {result.total_bytes} bytes.")
+
+    reuse = result.cache_reuse
+    logging.info(
+        f"Expected cache reuse: {reuse['observations']:.1%} of the observation "
+        f"reads, {reuse['forecasts']:.1%} of the forecast reads."
+    )
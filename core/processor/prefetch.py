@@ -0,0 +1,122 @@
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+
+import attr
+
+from core.models import Config
+
+from .cases import CaseTask, get_case_paths
+
+# Size of the blocks read by the prefetch threads.
+_BLOCK_SIZE = 1024 ** 2
+
+
+def read_ahead(paths: List[Union[Path, str]]) -> int:
+    """
+    Read the files in `paths` and discard their content, so that they are
+    in the page cache of the operating system when Metview reads them.
+
+    Missing or unreadable files are ignored: they are reported by the
+    computation of the case.
+
+    :return: The number of bytes read.
+    """
+    buffer = bytearray(_BLOCK_SIZE)
+    total = 0
+
+    for path in paths:
+        try:
+            with open(path, "rb", buffering=0) as f:
+                while n := f.readinto(buffer):
+                    total += n
+        except OSError:
+            continue
+
+    return total
+
+
+@attr.s(slots=True)
+class Prefetcher(object):
+    """
+    Read-ahead stage between the generation of the cases and their
+    computation.
+
+    A pool of threads reads the observation and GRIB files of the next
+    `depth` cases, while the current case is being computed. Metview is not
+    thread-safe, so the files are only loaded in the page cache, and the
+    decoding still happens in the compute loop.
+
+    The time spent by the compute loop waiting for the files of a case
+    (stall time) is measured, along with the time spent computing the
+    cases, to tell whether a run is I/O-bound or CPU-bound.
+    """
+
+    config: Config = attr.ib()
+    depth = attr.ib(converter=int)
+    workers = attr.ib(converter=int, default=4)
+
+    stats = attr.ib(factory=Counter)
+
+    # Paths read recently, which are not read again.
+    _recent = attr.ib(factory=OrderedDict)
+
+    def _new_paths(self, task: CaseTask) -> List[Path]:
+        obs_path, grib_paths = get_case_paths(self.config, task)
+        paths = []
+
+        for path in [obs_path] + grib_paths:
+            if path in self._recent:
+                self._recent.move_to_end(path)
+                continue
+
+            self._recent[path] = None
+            paths.append(path)
+
+        while len(self._recent) > 64 * self.depth:
+            self._recent.popitem(last=False)
+
+        return paths
+
+    def iter_tasks(self, tasks: Iterable[CaseTask]) -> Iterator[CaseTask]:
+        """
+        Yield the tasks in order, once their files have been read ahead.
+        """
+        pending = deque()
+        tasks = iter(tasks)
+
+        def submit(executor) -> bool:
+            task = next(tasks, None)
+            if task is None:
+                return False
+
+            if task.skip:
+                pending.append((task, None))
+            else:
+                paths = self._new_paths(task)
+                self.stats["files"] += len(paths)
+                pending.append((task, executor.submit(read_ahead, paths)))
+
+            return True
+
+        with ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="prefetch"
+        ) as executor:
+            while len(pending) < self.depth and submit(executor):
+                pass
+
+            while pending:
+                task, future = pending.popleft()
+
+                if future is not None:
+                    start = time.perf_counter()
+                    self.stats["bytes"] += future.result()
+                    self.stats["stall_seconds"] += time.perf_counter() - start
+
+                submit(executor)
+
+                start = time.perf_counter()
+                yield task
+                self.stats["compute_seconds"] += time.perf_counter() - start
@@ -0,0 +1,176 @@
+import copy
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from core.loaders.parquet import merge_parquet_files
+from core.models import Config
+
+from .cases import CaseTask
+from .checkpoint import Checkpoint, get_config_fingerprint
+from .log_factory import point_data_table_footer, point_data_table_header
+from .writer import get_parquet_options
+
+
+def get_shard_path(config: Config, shard: int) -> str:
+    return f"{config.parameters.out_path}.shard-{shard:05d}"
+
+
+def get_shard_summary_path(config: Config, shard: int) -> str:
+    return f"{get_shard_path(config, shard)}.done"
+
+
+def get_output_path(config: Config) -> str:
+    """
+    Path of the point data table written by run(): the output path of the
+    config, or the part file of the shard.
+    """
+    if config.parameters.shards > 1:
+        return get_shard_path(config, config.parameters.shard)
+
+    return f"{config.parameters.out_path}"
+
+
+def get_shard_period(config: Config, shard: int) -> Tuple[date, date]:
+    """
+    Block of consecutive base dates of the calibration period computed by a
+    shard. The blocks of all the shards have the same number of days, except
+    the last one.
+    """
+    start, end = config.parameters.date_start, config.parameters.date_end
+    shards = config.parameters.shards
+
+    days = (end - start).days + 1
+    block = -(-days // shards)
+
+    shard_start = start + timedelta(days=shard * block)
+    shard_end = min(end, shard_start + timedelta(days=block - 1))
+    return shard_start, shard_end
+
+
+def check_shard_config(config: Config):
+    shards, shard = config.parameters.shards, config.parameters.shard
+
+    if shards <= 1:
+        return
+
+    if not 0 <= shard < shards:
+        raise ValueError(f"invalid shard: {shard} (shards: {shards})")
+
+    if config.parameters.out_format != "PARQUET":
+        raise ValueError("sharding requires the PARQUET output format")
+
+    if config.parameters.extend:
+        raise ValueError("cannot extend a point data table with sharding")
+
+
+def iter_shard_cases(config: Config, tasks: Iterable[CaseTask]) -> Iterator[CaseTask]:
+    """
+    Select the cases of the shard of the config, by base date.
+
+    The cases of the whole calibration period are generated by every shard,
+    so that the forecasts repeated across cases are skipped as in a single
+    run.
+    """
+    start, end = get_shard_period(config, config.parameters.shard)
+
+    for task in tasks:
+        if start <= task.curr_date <= end:
+            yield task
+
+
+def _common_schema(schemas: List[pa.Schema]) -> pa.Schema:
+    """
+    Schema able to hold the tables of all the shards. The integer columns
+    are downcast by the writer according to the values of every shard, so
+    the widest integer type is kept.
+    """
+
+    def width(type_):
+        if pa.types.is_dictionary(type_):
+            type_ = type_.index_type
+        return type_.bit_width if pa.types.is_integer(type_) else 0
+
+    schema = schemas[0]
+
+    for i, field in enumerate(schema):
+        types = [other.field(field.name).type for other in schemas]
+        widest = max(types, key=width)
+
+        if widest != field.type:
+            schema = schema.set(i, field.with_type(widest))
+
+    return schema
+
+
+def merge_shards(config: Config):
+    """
+    Merge the part files written by the shards of the config into a single
+    point data table at the output path, with a new header, and the footer
+    counters of all the shards.
+
+    Every shard must have finished. The part files are copied one row group
+    at a time, and are not removed.
+    """
+    shards = config.parameters.shards
+    if shards <= 1:
+        raise ValueError("the configuration is not sharded")
+
+    summaries = []
+    for shard in range(shards):
+        summary = Checkpoint.load(get_shard_summary_path(config, shard))
+
+        if summary is None:
+            raise ValueError(f"Shard {shard} of {shards} has not finished.")
+
+        shard_config = copy.copy(config)
+        shard_config.parameters = copy.copy(config.parameters)
+        shard_config.parameters.shard = shard
+
+        if summary.fingerprint != get_config_fingerprint(shard_config):
+            raise ValueError(
+                f"Shard {shard} of {shards} was computed with a different configuration."
+            )
+
+        summaries.append(summary)
+
+    # Shards without any observation do not write a part file.
+    paths = [
+        get_shard_path(config, shard)
+        for shard in range(shards)
+        if os.path.exists(get_shard_path(config, shard))
+    ]
+    if not paths:
+        raise ValueError("No point data table was written by the shards.")
+
+    obs_total = sum(summary.obs_total for summary in summaries)
+    obs_used = sum(summary.obs_used for summary in summaries)
+
+    options = get_parquet_options(config)
+    metadata = {
+        "writer": json.dumps(options),
+        "header": point_data_table_header(config).strip(),
+        "footer": point_data_table_footer(config, obs_total, obs_used),
+    }
+    schema = _common_schema([pq.read_schema(path) for path in paths])
+
+    tmp_path = f"{config.parameters.out_path}.tmp"
+    merge_parquet_files(
+        paths,
+        tmp_path,
+        metadata=metadata,
+        schema=schema,
+        compression=options["compression"],
+        compression_level=options["compression_level"],
+    )
+    os.replace(tmp_path, f"{config.parameters.out_path}")
+
+    logging.info(
+        f"Merged {len(paths)} shard(s) into {config.parameters.out_path}: "
+        f"{obs_total} observation(s) considered, {obs_used} used."
+    )
@@ -0,0 +1,169 @@
+import queue
+import threading
+
+import attr
+import pyarrow as pa
+
+from core.models import Config
+
+from .cases import split_computations
+
+# Marker telling the writer thread to stop.
+_STOP = object()
+
+
+def get_parquet_options(config: Config) -> dict:
+    """
+    Settings of the ParquetPointDataTableWriter from the parameters of the
+    config.
+    """
+    parameters = config.parameters
+
+    return {
+        "row_group_size": parameters.parquet_row_group_size,
+        "row_group_bytes": parameters.parquet_row_group_mb * 1024**2,
+        "compression": parameters.parquet_compression,
+        "compression_level": parameters.parquet_compression_level,
+    }
+
+
+def get_point_data_table_schema(config: Config) -> pa.Schema:
+    """
+    Arrow schema of the point data table computed by run(), with the columns
+    in the order of the chunks of process_case().
+
+    The computations must have their is_reference attribute set.
+    """
+    dates = pa.dictionary(pa.int32(), pa.string())
+    step = "StepF" if config.predictand.is_accumulated else "Step"
+
+    fields = [
+        ("BaseDate", dates),
+        ("BaseTime", pa.uint8()),
+        (step, pa.uint16()),
+        ("DateOBS", dates),
+        ("TimeOBS", pa.uint8()),
+    ]
+
+    values = ["LatOBS", "LonOBS", "OBS", "Predictand"]
+
+    if config.predictand.error in ("FER", "FE"):
+        values.append(config.predictand.error)
+
+    if any(
+        computation.field == "LOCAL_SOLAR_TIME" and computation.isPostProcessed
+        for computation in config.computations
+    ):
+        values.append("LST")
+
+    base_computations, derived_computations = split_computations(config)
+    values += [
+        computation.shortname
+        for computation in base_computations + derived_computations
+        if computation.isPostProcessed
+    ]
+
+    return pa.schema(fields + [(name, pa.float32()) for name in values])
+
+
+@attr.s(slots=True)
+class BackgroundWriter(object):
+    """
+    Serializer of the point data table writing the chunks in a background
+    thread, so that the formatting and compression of a case overlap with
+    the computation of the next ones.
+
+    The chunks are passed through a queue of `size` chunks at most:
+    add_columns_chunk() blocks while the queue is full, so that the compute
+    loop does not outrun the writer. The other methods wait for the queued
+    chunks to be written before calling the serializer, so that checkpoints
+    and the footer follow the chunks written so far.
+
+    An exception raised by the serializer in the writer thread is raised
+    again by the next call of the compute loop, and the chunks queued after
+    it are discarded.
+    """
+
+    serializer = attr.ib()
+    size = attr.ib(converter=int, default=4)
+
+    # Internal instance attributes
+    _queue = attr.ib(default=None)
+    _thread = attr.ib(default=None)
+    _error = attr.ib(default=None)
+
+    def __attrs_post_init__(self):
+        self._queue = queue.Queue(maxsize=self.size)
+        self._thread = threading.Thread(
+            target=self._write, name="pdt-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _write(self):
+        while True:
+            columns = self._queue.get()
+
+            try:
+                if columns is _STOP:
+                    return
+
+                if self._error is None:
+                    self.serializer.add_columns_chunk(columns)
+            except Exception as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def flush(self):
+        """
+        Wait for the queued chunks to be written.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def add_columns_chunk(self, columns):
+        self._raise_error()
+        self._queue.put(columns)
+
+    def add_header(self, header):
+        self.flush()
+        return self.serializer.add_header(header)
+
+    def add_footer(self, footer):
+        self.flush()
+        return self.serializer.add_footer(footer)
+
+    def checkpoint(self) -> dict:
+        self.flush()
+        return self.serializer.checkpoint()
+
+    def resume(self, state: dict, header: str):
+        self.flush()
+        return self.serializer.resume(state, header=header)
+
+    def stop(self):
+        """
+        Stop the writer thread, once the queued chunks are written.
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self._raise_error()
+        self.serializer.close()
+
+    def abort(self):
+        """
+        Stop the writer thread after a failure of the compute loop, and
+        abort the serializer. An error of the writer thread is not raised, so
+        that the failure of the compute loop is.
+        """
+        self.stop()
+        self.serializer.abort()
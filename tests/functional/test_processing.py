@@ -4,10 +4,12 @@ from pandas.testing import assert_frame_equal
 from core.loaders import ErrorType, load_point_data_by_path
 
 
+@pytest.mark.parametrize("workers", (1, 2))
 @pytest.mark.parametrize("fmt", ("ASCII", "PARQUET"))
-def test_alfa(client, alfa_cassette, alfa_loader, fmt, tmp_path):
+def test_alfa(client, alfa_cassette, alfa_loader, fmt, workers, tmp_path):
     path = tmp_path / f"pdt.{fmt.lower()}"
     request = alfa_cassette(output_path=str(path), fmt=fmt)
+    request["parameters"]["workers"] = str(workers)
     response = client.post("/computations/start", json=request)
     assert response.status_code == 200
 
@@ -1,7 +1,11 @@
+from collections import OrderedDict
+
 import numpy
+import pytest
+import pandas as pd
 from pandas.testing import assert_frame_equal
 
-from core.loaders.ascii import ASCIIDecoder
+from core.loaders.ascii import ASCIIDecoder, ASCIIEncoder
 from tests.conf import TEST_DATA_DIR
 
 
@@ -45,3 +49,187 @@ def test_good_ascii_file_clone(tmp_path):
     cloned_data = ASCIIDecoder(path=cloned_path)
 
     assert_frame_equal(cloned_data.dataframe, data.dataframe.drop(exclude_cols, axis=1))
+
+
+def test_ascii_encoder_resume(tmp_path):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.add_header("# header")
+    encoder.add_columns_chunk([("A", [1, 2]), ("B", [0.5, 1.5])])
+    state = encoder.checkpoint()
+    encoder.add_columns_chunk([("A", [3]), ("B", [2.5])])
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.resume(state, header="# header")
+    encoder.add_columns_chunk([("A", [4]), ("B", [3.5])])
+    encoder.add_footer("# footer")
+    encoder.close()
+
+    data = ASCIIDecoder(path=path)
+    assert data.dataframe["A"].tolist() == [1, 2, 4]
+    assert data.dataframe["B"].tolist() == [0.5, 1.5, 3.5]
+
+
+def test_ascii_encoder_resume_before_first_chunk(tmp_path):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.add_header("# header")
+    state = encoder.checkpoint()
+    encoder.add_columns_chunk([("A", [1]), ("B", [0.5])])
+
+    # The column names are written with the first chunk after the
+    # checkpoint.
+    encoder = ASCIIEncoder(path=path)
+    encoder.resume(state, header="# header")
+    encoder.add_columns_chunk([("A", [2]), ("B", [1.5])])
+    encoder.add_footer("# footer")
+    encoder.close()
+
+    data = ASCIIDecoder(path=path)
+    assert data.dataframe["A"].tolist() == [2]
+    assert data.dataframe["B"].tolist() == [1.5]
+
+
+def test_ascii_decoder_read_footer(tmp_path):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.add_header("# header")
+    encoder.add_columns_chunk([("A", [1, 2]), ("B", [0.5, 1.5])])
+    size = path.stat().st_size
+    encoder.add_footer("# foo: 1\n# bar: 2")
+
+    offset, footer = ASCIIDecoder(path=path).read_footer()
+    assert offset == size
+    assert footer == "# foo: 1\n# bar: 2"
+
+
+def test_ascii_encoder_fixed_layout(tmp_path):
+    path = tmp_path / "pdt.ascii"
+    columns = [
+        ("BaseDate", "2015-06-01"),
+        ("BaseTime", 12),
+        ("LatOBS", numpy.array([-21.99, 4.5, 10.0])),
+        ("Predictand", numpy.array([0.5, numpy.nan, 1234567.125])),
+        ("CAPE", [1.0, 2.0, 3.0]),
+    ]
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.add_header("# header")
+    encoder.add_columns_chunk(columns)
+    encoder.add_columns_chunk(columns)
+    encoder.close()
+
+    df = pd.DataFrame.from_dict(OrderedDict(columns))
+    assert path.read_text() == (
+        "# header\n\n"
+        + df.to_string(index=False, col_space=10)
+        + "\n"
+        + df.to_string(index=False, header=False, col_space=10)
+        + "\n"
+    )
+
+
+def test_ascii_encoder_csv_layout(tmp_path):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path, dialect="csv")
+    encoder.add_header("# header")
+    encoder.add_columns_chunk(
+        [("BaseDate", "2015-06-01"), ("A", [1, 2]), ("B", [0.5, numpy.nan])]
+    )
+    encoder.add_columns_chunk([("BaseDate", "2015-06-02"), ("A", [3]), ("B", [2.5])])
+    encoder.add_footer("# footer")
+    encoder.close()
+
+    assert path.read_text() == (
+        "# header\n\n"
+        "BaseDate,A,B\n"
+        "2015-06-01,1,0.5\n"
+        "2015-06-01,2,NaN\n"
+        "2015-06-02,3,2.5\n"
+        "# footer"
+    )
+
+    data = ASCIIDecoder(path=path)
+    assert data.dialect == "csv"
+    assert data.dataframe["A"].tolist() == [1, 2, 3]
+    assert data.dataframe["B"].tolist()[::2] == [0.5, 2.5]
+
+
+def test_ascii_decoder_iter_chunks(tmp_path):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path)
+    encoder.add_header("# header")
+    for i in range(0, 10, 2):
+        encoder.add_columns_chunk([("A", [i, i + 1]), ("B", [i / 2, i / 2 + 0.5])])
+    encoder.add_footer("# footer")
+    encoder.close()
+
+    data = ASCIIDecoder(path=path)
+    chunks = list(data.iter_chunks("B", "A", dtype={"B": "float32"}, chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert all(list(chunk.columns) == ["B", "A"] for chunk in chunks)
+    assert all(chunk["B"].dtype == numpy.float32 for chunk in chunks)
+
+    df = pd.concat(chunks, ignore_index=True)
+    assert df["A"].tolist() == list(range(10))
+    assert df["B"].tolist() == [i / 2 for i in range(10)]
+
+    # Iterating the decoder reads every row once.
+    data._chunk_size = 4
+    assert_frame_equal(pd.concat(data, ignore_index=True), data.dataframe)
+
+
+@pytest.mark.parametrize("dialect", ["fixed", "csv"])
+def test_ascii_decoder_pyarrow(tmp_path, dialect):
+    path = tmp_path / "pdt.ascii"
+
+    encoder = ASCIIEncoder(path=path, dialect=dialect)
+    encoder.add_header("# header")
+    for i in range(0, 10, 2):
+        encoder.add_columns_chunk(
+            [
+                ("BaseDate", "2015-06-01"),
+                ("BaseTime", [0, 12]),
+                ("OBS", [i * 10.5, numpy.nan]),
+                ("CAPE", [i / 4, 100.0 * i]),
+            ]
+        )
+    encoder.add_footer("# footer")
+    encoder.close()
+
+    expected = pd.read_csv(path, comment="#", sep="," if dialect == "csv" else r"\s+")
+
+    # The file is read in byte ranges of a few rows.
+    data = ASCIIDecoder(path=path)
+    data._block_size = 50
+    assert_frame_equal(data.dataframe, expected, check_exact=True)
+    assert_frame_equal(data.select("CAPE", "BaseDate"), expected[["BaseDate", "CAPE"]])
+
+    data = ASCIIDecoder(path=path, threads=1)
+    data._block_size = 50
+    assert_frame_equal(data.dataframe, expected, check_exact=True)
+
+    data = ASCIIDecoder(path=path, float_dtype="float32")
+    assert data.dataframe["OBS"].dtype == numpy.float32
+    assert data.dataframe["BaseTime"].tolist() == [0, 12] * 5
+
+
+def test_ascii_decoder_pandas_fallback(tmp_path):
+    path = tmp_path / "pdt.ascii"
+    path.write_text(
+        "# header\n\n"
+        "         A          B\n"
+        "         1        0.5\n"
+        "# comment between the rows\n"
+        "         2        1.5\n"
+    )
+
+    data = ASCIIDecoder(path=path, float_dtype="float32")
+    assert data.dataframe["A"].tolist() == [1, 2]
+    assert data.dataframe["B"].dtype == numpy.float32
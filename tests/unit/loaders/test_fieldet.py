@@ -4,9 +4,15 @@ import numpy as np
 import pandas
 import pytest
 
+from core.computations.utils import (
+    compute_weighted_average_field,
+    stream_weighted_average_field,
+)
 from core.loaders import geopoints as geopoints_loader
-from core.loaders.fieldset import Fieldset
+from core.loaders.fieldset import Fieldset, NumpyFieldset
+from core.loaders.grid import get_grid_geometry
 from tests.conf import TEST_DATA_DIR
+from tests.unit.loaders.test_grid import regular_grid
 
 
 def test_dataframe():
@@ -144,3 +150,74 @@ def test_nearest_gridpoint_new_geofile_format():
         != geopoints_loader.get_values(geopoints_out)
     ).all()
     assert geopoints_loader.get_values(geopoints_out).tolist() == [0.25, 24.25, 0, 17.5]
+
+
+def test_nearest_gridpoint_indices():
+    fieldset = Fieldset.from_path(path=TEST_DATA_DIR / "cape_20150601_00_03.grib")
+
+    geopoints = geopoints_loader.read(path=TEST_DATA_DIR / "new_geo_file_format.geo")
+    indices = fieldset.nearest_gridpoint_indices(
+        geopoints.latitudes(), geopoints.longitudes()
+    )
+
+    assert (
+        fieldset.take(indices).tolist()
+        == geopoints_loader.get_values(fieldset.nearest_gridpoint(geopoints)).tolist()
+    )
+
+
+def test_grid_index_is_shared():
+    grib_a = Fieldset.from_path(path=TEST_DATA_DIR / "cape_20150601_00_03.grib")
+    grib_b = Fieldset.from_path(path=TEST_DATA_DIR / "cape_20150601_00_27.grib")
+
+    assert grib_a.grid_key == grib_b.grid_key
+    assert grib_a.grid_index is grib_b.grid_index
+
+
+def test_numpy_fieldset_arithmetic():
+    geometry = get_grid_geometry("test-geometry", lambda: regular_grid(10.0))
+    a = NumpyFieldset(np.arange(geometry.size, dtype=float), geometry, None)
+    b = a.with_values(np.full(geometry.size, 2.0))
+
+    result = (10 - (b - a) / 2 * 3) ** 2
+    expected = (10 - (b.values - a.values) / 2 * 3) ** 2
+
+    assert isinstance(result, NumpyFieldset)
+    assert result.geometry is geometry
+    np.testing.assert_array_equal(result.values, expected)
+    np.testing.assert_array_equal((a >= 2).values[:4], [0, 0, 1, 1])
+    np.testing.assert_array_equal(Fieldset.max_of(a, b).values[:4], [2, 2, 2, 3])
+    assert result.grid_key == "test-geometry"
+
+
+def test_numpy_fieldset_lazy_evaluation():
+    geometry = get_grid_geometry("test-geometry", lambda: regular_grid(10.0))
+    steps = [
+        NumpyFieldset(np.arange(geometry.size) * float(i), geometry, None)
+        for i in range(1, 5)
+    ]
+    copies = [step.values.copy() for step in steps]
+
+    result = (stream_weighted_average_field([lambda s=s: s for s in steps]) + 1) * 2
+    assert result.is_lazy
+
+    expected = (compute_weighted_average_field(*copies) + 1) * 2
+    np.testing.assert_array_equal(result.values, expected)
+    assert not result.is_lazy
+
+    # The inputs are not modified by the evaluation in place.
+    for step, values in zip(steps, copies):
+        np.testing.assert_array_equal(step.values, values)
+
+
+def test_numpy_fieldset_evaluate_aliasing():
+    geometry = get_grid_geometry("test-geometry", lambda: regular_grid(10.0))
+    buffer = np.arange(geometry.size, dtype=float)
+    a = NumpyFieldset(buffer, geometry, None)
+    b = a.with_values(np.full(geometry.size, 2.0))
+    expected = b.values * 2 + (a.values * 3 - 1)
+
+    # `a` is an operand of a nested expression evaluated after the first
+    # one, which cannot be evaluated in its buffer.
+    result = (b * 2 + (a * 3 - 1)).evaluate(out=buffer)
+    np.testing.assert_array_equal(result.values, expected)
@@ -1,5 +1,6 @@
 import textwrap
 
+import numpy as np
 import pytest
 
 from core.loaders import geopoints as geopoints_loader
@@ -128,3 +129,73 @@ def test_geopoints_units_bad_comments_order(tmp_path):
 
     with pytest.raises(ValueError):
         geopoints_loader.read_units(path)
+
+
+def test_geopoints_read_native(tmp_path):
+    path = tmp_path / "file.geo"
+    path.write_text(
+        textwrap.dedent(
+            """
+            #GEO
+            #FORMAT NCOLS
+            #COLUMNS
+            stnid	latitude	longitude	level	date	time	elevation	value_0
+            # Missing values represented by 3e+38 (not user-changeable)
+            #METADATA
+            units=mm
+            #DATA
+            21921	70.68	127.4	0	20190101	0	33	0.9
+            6370	51.45	5.38	0	20190101	0	22	3e+38
+            1001	-33.9	-70.6	0	20190101	0	10	1.5
+            """
+        ).strip()
+    )
+
+    geopoints = geopoints_loader.read_native(path)
+
+    assert len(geopoints) == 3
+    assert geopoints.metadata == {"units": "mm"}
+    assert geopoints["stnid"].tolist() == ["21921", "6370", "1001"]
+    assert geopoints.latitudes().tolist() == [70.68, 51.45, -33.9]
+    assert geopoints.longitudes().tolist() == [127.4, 5.38, -70.6]
+
+    values = geopoints_loader.get_values(geopoints)
+    assert values[[0, 2]].tolist() == [0.9, 1.5]
+    assert np.isnan(values[1])
+
+    filtered = geopoints.filter(geopoints >= 1)
+    assert filtered["stnid"].tolist() == ["1001"]
+    assert (filtered * 2).values().tolist() == [3.0]
+
+
+@pytest.mark.parametrize(
+    "format_, data",
+    [
+        ("", "70.68 127.4 0 20190101 0 0.9\n51.45 5.38 0 20190101 0 0.3"),
+        ("#FORMAT XYV", "127.4 70.68 0.9\n5.38 51.45 0.3"),
+    ],
+)
+def test_geopoints_read_native_formats(tmp_path, format_, data):
+    path = tmp_path / "file.geo"
+    path.write_text(f"#GEO\n{format_}\n#DATA\n{data}\n")
+
+    geopoints = geopoints_loader.read_native(path)
+
+    assert geopoints.latitudes().tolist() == [70.68, 51.45]
+    assert geopoints.longitudes().tolist() == [127.4, 5.38]
+    assert geopoints.values().tolist() == [0.9, 0.3]
+
+
+def test_geopoints_read_native_empty(tmp_path):
+    path = tmp_path / "file.geo"
+    path.write_text("#GEO\n#FORMAT XYV\n#DATA\n")
+
+    assert len(geopoints_loader.read_native(path)) == 0
+
+
+def test_geopoints_read_native_unsupported_format(tmp_path):
+    path = tmp_path / "file.geo"
+    path.write_text("#GEO\n#FORMAT XY_VECTOR\n#DATA\n")
+
+    with pytest.raises(ValueError):
+        geopoints_loader.read_native(path)
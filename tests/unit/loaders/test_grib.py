@@ -0,0 +1,64 @@
+import struct
+
+import numpy as np
+
+from core.loaders.grib import read_grid_key, read_points
+
+
+def section(number, body):
+    return struct.pack(">IB", 5 + len(body), number) + body
+
+
+def simple_packing_message(packed, bits, reference_value, e, d, bitmap=255):
+    """
+    GRIB2 message with simple packing, where only the sections read by the
+    decoder are filled in.
+    """
+    data = "".join(format(x, f"0{bits}b") for x in packed)
+    data += "0" * (-len(data) % 8)
+    data_bytes = int(data, 2).to_bytes(len(data) // 8, "big")
+
+    sign_magnitude = lambda x: (abs(x) | (0x8000 if x < 0 else 0)).to_bytes(2, "big")
+
+    body = (
+        section(1, bytes(16))
+        + section(3, b"grid" + bytes(8))
+        + section(4, bytes(29))
+        + section(
+            5,
+            struct.pack(">IH", len(packed), 0)
+            + struct.pack(">f", reference_value)
+            + sign_magnitude(e)
+            + sign_magnitude(d)
+            + bytes([bits, 0]),
+        )
+        + section(6, bytes([bitmap]))
+        + section(7, data_bytes)
+        + b"7777"
+    )
+
+    return b"GRIB" + bytes(2) + bytes([0, 2]) + struct.pack(">Q", 16 + len(body)) + body
+
+
+def test_read_points(tmp_path):
+    packed = [0, 1, 5, 4095, 17, 2048, 3]
+    path = tmp_path / "field.grib"
+    path.write_bytes(simple_packing_message(packed, 12, 250.0, -2, 1))
+
+    indices = np.array([3, 0, 6, 3, 1])
+    values = read_points(path, indices)
+
+    expected = (np.array(packed, dtype=float)[indices] * 0.25 + 250.0) * 0.1
+    np.testing.assert_array_equal(values, expected)
+    assert read_grid_key(path).startswith("2:")
+
+
+def test_read_points_unsupported(tmp_path):
+    path = tmp_path / "field.grib"
+
+    path.write_bytes(simple_packing_message([1, 2, 3], 8, 0.0, 0, 0, bitmap=0))
+    assert read_points(path, np.array([0])) is None
+
+    path.write_bytes(b"not a grib file")
+    assert read_points(path, np.array([0])) is None
+    assert read_grid_key(path) is None
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from core.loaders.grid import GridIndex, get_grid_geometry, get_grid_index
+
+
+def regular_grid(step):
+    lats, lons = np.meshgrid(
+        np.arange(90, -90 - step, -step), np.arange(0, 360, step), indexing="ij"
+    )
+    return lats.ravel(), lons.ravel()
+
+
+def test_grid_index_query():
+    lats, lons = regular_grid(1.0)
+    index = GridIndex(lats, lons)
+
+    indices = index.query(np.array([51.45, -33.9, 89.9]), np.array([5.38, -70.6, 10]))
+
+    assert lats[indices].tolist() == [51, -34, 90]
+    assert lons[indices].tolist()[:2] == [5, 289]
+
+
+def test_grid_index_dateline():
+    lats, lons = regular_grid(1.0)
+    index = GridIndex(lats, lons)
+
+    (i,) = index.query(np.array([0.0]), np.array([-0.2]))
+    assert (lats[i], lons[i]) == (0, 0)
+
+    (i,) = index.query(np.array([0.0]), np.array([359.7]))
+    assert (lats[i], lons[i]) == (0, 0)
+
+
+def test_grid_index_empty_query():
+    index = GridIndex(*regular_grid(10.0))
+    assert index.query(np.array([]), np.array([])).size == 0
+
+
+def test_get_grid_index_is_cached():
+    calls = []
+
+    def coordinates():
+        calls.append(1)
+        return regular_grid(10.0)
+
+    assert get_grid_index("test", coordinates) is get_grid_index("test", coordinates)
+    assert len(calls) == 1
+
+
+def test_grid_geometry_is_immutable():
+    geometry = get_grid_geometry("test-geometry", lambda: regular_grid(10.0))
+
+    assert geometry is get_grid_geometry("test-geometry", None)
+    assert geometry.size == 19 * 36
+
+    with pytest.raises(ValueError):
+        geometry.latitudes[0] = 0
+
+    with pytest.raises(AttributeError):
+        geometry.key = "other"
@@ -0,0 +1,57 @@
+from datetime import datetime
+from textwrap import dedent
+
+import numpy as np
+import pytest
+
+from core.loaders.observations import ObservationStore, ingest
+
+
+def write_geo_file(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        dedent(
+            """\
+            #GEO
+            #FORMAT NCOLS
+            #COLUMNS
+            stnid\tlatitude\tlongitude\tlevel\tdate\ttime\televation\tvalue_0
+            #METADATA
+            units=mm
+            #DATA
+            """
+        )
+        + "".join(
+            f"{i}\t{lat}\t{lon}\t0\t20150602\t0\t0\t{value}\n"
+            for i, (lat, lon, value) in enumerate(rows)
+        )
+    )
+
+
+def test_observation_store(tmp_path):
+    archive, store_path = tmp_path / "obs", tmp_path / "store"
+
+    write_geo_file(
+        archive / "Acc12h" / "20150602" / "tp_12_20150602_00.geo",
+        [(-21.99, -173.65, 3.0), (-4.58, 35.48, 0.5)],
+    )
+    write_geo_file(
+        archive / "Acc12h" / "20150602" / "tp_12_20150602_06.geo", [(10.0, 20.0, 1.0)]
+    )
+
+    assert ingest(archive, store_path, code="tp", accumulation=12) == 2
+
+    store = ObservationStore(store_path, code="tp", accumulation=12)
+    observations = store.read(datetime(2015, 6, 2, 0))
+
+    np.testing.assert_array_equal(observations["latitude"], [-21.99, -4.58])
+    np.testing.assert_array_equal(observations["longitude"], [-173.65, 35.48])
+    np.testing.assert_array_equal(observations["value"], [3.0, 0.5])
+
+    assert store.read(datetime(2015, 6, 2, 6))["value"].tolist() == [1.0]
+
+    with pytest.raises(IOError):
+        store.read(datetime(2015, 6, 2, 12))
+
+    with pytest.raises(IOError):
+        store.read(datetime(2015, 7, 2, 0))
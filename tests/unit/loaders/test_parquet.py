@@ -1,11 +1,18 @@
+import json
 from tempfile import NamedTemporaryFile
 
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
 from pandas.testing import assert_frame_equal
 
 from core.loaders.ascii import ASCIIDecoder
 from core.loaders.parquet import (
     ParquetPointDataTableReader,
     ParquetPointDataTableWriter,
+    append_parquet_files,
+    replace_parquet_metadata,
 )
 from tests.conf import TEST_DATA_DIR
 
@@ -26,7 +33,11 @@ def test_good_parquet_file():
         metadata = r.metadata
         df_pq = r.dataframe
 
-    assert metadata == {"header": "foo", "footer": "bar"}
+    assert metadata == {
+        "writer": json.dumps(w.settings),
+        "header": "foo",
+        "footer": "bar",
+    }
     assert df.memory_usage(deep=True).sum() > df_pq.memory_usage(deep=True).sum()
 
     assert_frame_equal(df_pq, df, check_dtype=False, check_categorical=False)
@@ -55,3 +66,240 @@ def test_good_parquet_file_clone(tmp_path):
             check_dtype=False,
             check_categorical=False,
         )
+
+
+def chunk(*values):
+    return [
+        ("BaseDate", ["2015-06-01"] * len(values)),
+        ("BaseTime", [0] * len(values)),
+        ("StepF", [15] * len(values)),
+        ("DateOBS", ["2015-06-01"] * len(values)),
+        ("TimeOBS", [15] * len(values)),
+        ("OBS", list(values)),
+    ]
+
+
+def test_parquet_writer_resume(tmp_path):
+    path = tmp_path / "pdt.parquet"
+
+    w = ParquetPointDataTableWriter(path, checkpoints=True)
+    w.add_header("foo")
+    w.add_columns_chunk(chunk(0.5, 1.5))
+    state = w.checkpoint()
+    w.add_columns_chunk(chunk(2.5))
+
+    w = ParquetPointDataTableWriter(path)
+    w.resume(state, header="foo")
+    w.add_columns_chunk(chunk(3.5))
+    w.add_footer("bar")
+    w.close()
+
+    r = ParquetPointDataTableReader(path)
+    assert r.metadata == {
+        "writer": json.dumps(w.settings),
+        "header": "foo",
+        "footer": "bar",
+    }
+    assert r.dataframe["OBS"].tolist() == [0.5, 1.5, 3.5]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_parquet_writer_footer(tmp_path):
+    path = tmp_path / "pdt.parquet"
+
+    w = ParquetPointDataTableWriter(path)
+    w.add_header("foo")
+    w.add_columns_chunk(
+        [
+            ("BaseDate", ["2015-06-01"]),
+            ("BaseTime", [0]),
+            ("StepF", [15]),
+            ("DateOBS", ["2015-06-01"]),
+            ("TimeOBS", [15]),
+            ("OBS", [0.5]),
+        ]
+    )
+    w.add_footer("bar")
+    w.close()
+
+    r = ParquetPointDataTableReader(path)
+    assert r.metadata == {
+        "writer": json.dumps(w.settings),
+        "header": "foo",
+        "footer": "bar",
+    }
+    assert r.dataframe["OBS"].tolist() == [0.5]
+
+
+def test_parquet_writer_row_groups(tmp_path):
+    path = tmp_path / "pdt.parquet"
+
+    w = ParquetPointDataTableWriter(path, row_group_size=4, compression="gzip")
+    w.add_header("foo")
+    for i in range(5):
+        w.add_columns_chunk(chunk(i, i + 0.5))
+    w.add_footer("bar")
+    w.close()
+
+    pq_file = pq.ParquetFile(path)
+    assert [
+        pq_file.metadata.row_group(i).num_rows for i in range(pq_file.num_row_groups)
+    ] == [4, 4, 2]
+    assert pq_file.metadata.row_group(0).column(0).compression == "GZIP"
+
+    r = ParquetPointDataTableReader(path)
+    assert json.loads(r.metadata["writer"])["compression"] == "gzip"
+    assert r.metadata["footer"] == "bar"
+    assert r.dataframe["OBS"].tolist() == [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5]
+
+
+def test_replace_parquet_metadata(tmp_path):
+    path = tmp_path / "pdt.parquet"
+    table = pa.table({"OBS": [0.5, 1.5, 2.5]}).replace_schema_metadata({"a": "1"})
+
+    pq.write_table(table, path, row_group_size=2)
+    size = pq.read_metadata(path).row_group(1).column(0).file_offset
+    data = path.read_bytes()[:size]
+
+    replace_parquet_metadata(str(path), {"a": "2", "footer": "bar"})
+
+    # Only the footer of the file is rewritten.
+    assert path.read_bytes()[:size] == data
+
+    pq_file = pq.ParquetFile(path)
+    assert pq_file.num_row_groups == 2
+    assert pq_file.schema_arrow.metadata == {b"a": b"2", b"footer": b"bar"}
+    assert pq_file.read().column("OBS").to_pylist() == [0.5, 1.5, 2.5]
+
+
+def test_append_parquet_files(tmp_path):
+    path = tmp_path / "pdt.parquet"
+    part = tmp_path / "part.parquet"
+    table = pa.table(
+        {
+            "BaseDate": pa.array(["2015-06-01"] * 3).dictionary_encode(),
+            "OBS": [0.5, 1.5, 2.5],
+        }
+    )
+
+    pq.write_table(table.replace_schema_metadata({"a": "1"}), path, row_group_size=2)
+    size = pq.read_metadata(path).row_group(1).column(1).file_offset
+    data = path.read_bytes()[:size]
+
+    # The types of the new rows are cast to the ones of the table.
+    pq.write_table(
+        pa.table(
+            {
+                "BaseDate": pa.array(["2015-06-02"]).dictionary_encode(),
+                "OBS": pa.array([3.5], pa.float32()),
+            }
+        ),
+        part,
+    )
+    append_parquet_files([str(part)], str(path), {"a": "2"})
+
+    # The row groups of the table are not rewritten.
+    assert path.read_bytes()[:size] == data
+    assert sorted(tmp_path.iterdir()) == [part, path]
+
+    pq_file = pq.ParquetFile(path)
+    assert pq_file.num_row_groups == 3
+    assert pq_file.schema_arrow.metadata == {b"a": b"2"}
+
+    result = pq_file.read()
+    assert result.column("OBS").to_pylist() == [0.5, 1.5, 2.5, 3.5]
+    assert result.column("BaseDate").to_pylist() == ["2015-06-01"] * 3 + ["2015-06-02"]
+
+
+def test_parquet_writer_append(tmp_path):
+    path = tmp_path / "pdt.parquet"
+
+    w = ParquetPointDataTableWriter(path)
+    w.add_header("foo")
+    w.add_columns_chunk(chunk(0.5, 1.5))
+    w.close()
+
+    w = ParquetPointDataTableWriter(path)
+    w.resume({"parts": [], "extend": True}, header="foo2")
+    w.add_columns_chunk(chunk(2.5))
+    state = w.checkpoint()
+    w.add_columns_chunk(chunk(3.5))
+
+    w = ParquetPointDataTableWriter(path)
+    w.resume(state, header="foo2")
+    w.add_columns_chunk(chunk(4.5))
+    w.add_footer("bar")
+    w.close()
+
+    r = ParquetPointDataTableReader(path)
+    assert r.metadata == {
+        "writer": json.dumps(w.settings),
+        "header": "foo2",
+        "footer": "bar",
+    }
+    assert r.dataframe["OBS"].tolist() == [0.5, 1.5, 2.5, 4.5]
+    assert pq.ParquetFile(path).num_row_groups == 3
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_parquet_writer_table_schema(tmp_path):
+    path = tmp_path / "pdt.parquet"
+    schema = pa.schema(
+        [
+            ("BaseDate", pa.dictionary(pa.int32(), pa.string())),
+            ("StepF", pa.uint16()),
+            ("TimeOBS", pa.uint8()),
+            ("OBS", pa.float32()),
+        ]
+    )
+
+    w = ParquetPointDataTableWriter(path, table_schema=schema)
+    w.add_columns_chunk(
+        [
+            ("BaseDate", "2015-06-01"),
+            ("StepF", 15),
+            ("TimeOBS", "03"),
+            ("OBS", np.array([0.5, np.nan])),
+        ]
+    )
+    # Values that do not fit the downcast types of the first chunk.
+    w.add_columns_chunk(
+        [
+            ("BaseDate", ["2015-06-02", "2015-06-03"]),
+            ("StepF", 300),
+            ("TimeOBS", "12"),
+            ("OBS", [1.5, 2.5]),
+        ]
+    )
+    w.close()
+
+    assert pq.read_schema(path).remove_metadata() == schema
+
+    df = ParquetPointDataTableReader(path).dataframe
+    assert df["BaseDate"].astype(str).tolist() == [
+        "2015-06-01",
+        "2015-06-01",
+        "2015-06-02",
+        "2015-06-03",
+    ]
+    assert df["StepF"].tolist() == [15, 15, 300, 300]
+    assert df["TimeOBS"].tolist() == [3, 3, 12, 12]
+    assert df["OBS"].tolist()[2:] == [1.5, 2.5]
+    assert np.isnan(df["OBS"][1])
+
+    with pytest.raises(ValueError):
+        w.add_columns_chunk([("OBS", [0.5])])
+
+
+def test_parquet_writer_no_rows(tmp_path):
+    path = tmp_path / "pdt.parquet"
+    schema = pa.schema([("StepF", pa.uint16()), ("OBS", pa.float32())])
+
+    w = ParquetPointDataTableWriter(path, table_schema=schema)
+    w.add_header("foo")
+    w.add_footer("bar")
+    w.close()
+
+    # No file is written for a table without rows, like a shard without
+    # observations.
+    assert not path.exists()
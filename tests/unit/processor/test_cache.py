@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from core.processor.cache import FieldsetCache, LRUCache
+from tests.conf import TEST_DATA_DIR
+
+
+def test_lru_cache_hits_and_misses():
+    cache = LRUCache(max_size=10)
+
+    assert cache.get("a", version=1, loader=lambda: "A", size=4) == "A"
+    assert cache.get("a", version=1, loader=lambda: "B", size=4) == "A"
+
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=10)
+
+    cache.get("a", version=1, loader=lambda: "A", size=4)
+    cache.get("b", version=1, loader=lambda: "B", size=4)
+    cache.get("a", version=1, loader=lambda: "A", size=4)
+    cache.get("c", version=1, loader=lambda: "C", size=4)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.size == 8
+    assert cache.stats["evictions"] == 1
+
+
+def test_lru_cache_stale_version():
+    cache = LRUCache(max_size=10)
+
+    cache.get("a", version=1, loader=lambda: "A", size=4)
+    assert cache.get("a", version=2, loader=lambda: "A2", size=4) == "A2"
+
+    assert cache.stats["hits"] == 0
+    assert cache.stats["misses"] == 2
+    assert cache.size == 4
+
+
+def test_lru_cache_entry_over_budget():
+    cache = LRUCache(max_size=10)
+
+    assert cache.get("a", version=1, loader=lambda: "A", size=11) == "A"
+    assert len(cache) == 0
+
+
+def test_lru_cache_size_of_loaded_value():
+    cache = LRUCache(max_size=10)
+
+    cache.get("a", version=1, loader=lambda: "AAAA", size=len)
+    assert cache.size == 4
+
+
+def test_fieldset_cache_backend():
+    with pytest.raises(ValueError):
+        FieldsetCache(max_bytes=1, backend="eccodes")
+
+
+def test_fieldset_cache(tmp_path):
+    path = TEST_DATA_DIR / "cape_20150601_00_03.grib"
+    link = tmp_path / "cape.grib"
+    os.symlink(path, link)
+
+    cache = FieldsetCache(max_bytes=100 * 1024 ** 2)
+
+    fieldset = cache.get(path)
+    assert cache.get(link) is fieldset
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+    with pytest.raises(IOError):
+        cache.get(tmp_path / "missing.grib")
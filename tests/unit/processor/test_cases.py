@@ -0,0 +1,55 @@
+from core.models import Config
+from core.processor.cases import iter_cases
+
+
+def make_config(**parameters):
+    return Config.from_dict(
+        {
+            "parameters": {
+                "date_start": "2015-06-01",
+                "date_end": "2015-06-02",
+                "spinup_limit": "0",
+                "out_path": "pdt.ascii",
+                "out_format": "ASCII",
+                "model_type": "grib",
+                "model_interval": "10",
+                "step_interval": "5",
+                "start_time": "0",
+                **parameters,
+            },
+            "predictand": {
+                "path": "fc/2t",
+                "accumulation": "0",
+                "code": "2t",
+                "error": "FE",
+                "min_value": "0",
+                "type_": "INSTANTANEOUS",
+                "units": "K",
+            },
+            "predictors": {"path": "fc", "codes": ["2t"], "sampling_interval": "5"},
+            "observations": {"path": "obs", "units": "K"},
+            "computations": [],
+        }
+    )
+
+
+def test_iter_cases_forecast_order():
+    tasks = list(iter_cases(make_config()))
+
+    assert [task.case for task in tasks] == list(range(1, 13))
+    assert [(task.curr_time, task.step_s) for task in tasks[:6]] == [
+        (0, 0),
+        (0, 5),
+        (10, 0),
+        (10, 5),
+        (20, 0),
+        (20, 5),
+    ]
+    assert not any(task.skip for task in tasks)
+
+
+def test_iter_cases_validity_order():
+    tasks = list(iter_cases(make_config(case_order="validity")))
+
+    # 2015-06-01 20 UTC (t+5) is valid after 2015-06-02 00 UTC (t+0).
+    assert [task.case for task in tasks] == [1, 2, 3, 4, 5, 7, 6, 8, 9, 10, 11, 12]
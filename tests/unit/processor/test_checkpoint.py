@@ -0,0 +1,24 @@
+from core.processor.checkpoint import Checkpoint, get_config_fingerprint
+from tests.unit.processor.test_cases import make_config
+
+
+def test_checkpoint_save_load(tmp_path):
+    path = str(tmp_path / "pdt.ascii.checkpoint")
+    checkpoint = Checkpoint(
+        fingerprint="abc",
+        completed=10,
+        obs_total=100,
+        obs_used=50,
+        serializer={"offset": 1000},
+    )
+    checkpoint.save(path)
+
+    assert Checkpoint.load(path) == checkpoint
+    assert Checkpoint.load(str(tmp_path / "missing")) is None
+
+
+def test_config_fingerprint():
+    fingerprint = get_config_fingerprint(make_config())
+
+    assert get_config_fingerprint(make_config(workers="4", resume=True)) == fingerprint
+    assert get_config_fingerprint(make_config(date_end="2015-06-03")) != fingerprint
@@ -0,0 +1,47 @@
+from core.models import Computation
+from core.processor.columns import get_new_computations
+from core.processor.dag import ComputationGraph
+from tests.unit.processor.test_cases import make_config
+
+
+def make_computation(index, shortname, field, codes, is_post_processed=True):
+    return Computation(
+        index=index,
+        shortname=shortname,
+        fullname=shortname,
+        field=field,
+        units="-",
+        isPostProcessed=is_post_processed,
+        mulScale=1,
+        addScale=0,
+        inputs=[{"code": code} for code in codes],
+    )
+
+
+def test_required_computations():
+    config = make_config()
+    config.predictors.codes = ["2t", "u700", "v700", "cape"]
+    config.computations = [
+        make_computation(0, "2T", "INSTANTANEOUS_FIELD_100", ["2t"]),
+        make_computation(1, "U700", "AVERAGE_FIELD", ["u700"], False),
+        make_computation(2, "V700", "AVERAGE_FIELD", ["v700"], False),
+        make_computation(3, "WSPD", "VECTOR_MODULE", ["U700", "V700"]),
+        make_computation(4, "CAPE", "MAXIMUM_FIELD", ["cape"]),
+        make_computation(5, "LST", "LOCAL_SOLAR_TIME", []),
+    ]
+
+    columns = ["BaseDate", "BaseTime", "Step", "LatOBS", "LonOBS", "OBS", "2T", "CAPE"]
+    computations = get_new_computations(config, columns)
+    assert [c.shortname for c in computations] == ["WSPD", "LST"]
+
+    graph = ComputationGraph.from_config(config).subgraph(computations)
+    assert [node.computation.shortname for node in graph.nodes] == [
+        "U700",
+        "V700",
+        "WSPD",
+    ]
+
+    # The local solar time is always in the LST column.
+    config.computations[5].shortname = "SOLAR_TIME"
+    computations = get_new_computations(config, columns + ["LST"])
+    assert [c.shortname for c in computations] == ["WSPD"]
@@ -0,0 +1,79 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.loaders.cube import ForecastCube
+from core.processor.cache import FieldsetCache, PointObservations
+
+
+def write_cube(path):
+    lats, lons = np.meshgrid(
+        np.arange(90, -91, -10.0), np.arange(0, 360, 10.0), indexing="ij"
+    )
+    lats, lons = lats.ravel(), lons.ravel()
+    points = np.array([0, 40, 41, 300])
+
+    np.save(path / "latitudes.npy", lats)
+    np.save(path / "longitudes.npy", lons)
+    np.save(path / "points.npy", points)
+
+    # Two base times, one step.
+    values = np.arange(2 * 1 * len(points), dtype=float).reshape(2, 1, len(points))
+    np.save(path / "tp.npy", values)
+    np.save(path / "tp.present.npy", np.array([[True], [False]]))
+
+    with open(path / "cube.json", "w") as f:
+        json.dump(
+            {
+                "grid_key": "test-cube",
+                "files": {
+                    "tp/2015060100/tp_20150601_00_12.grib": ["tp", 0, 0],
+                    "tp/2015060112/tp_20150601_12_12.grib": ["tp", 1, 0],
+                },
+            },
+            f,
+        )
+
+    return lats, lons
+
+
+def test_forecast_cube_read(tmp_path):
+    lats, lons = write_cube(tmp_path)
+    cube = ForecastCube(tmp_path, archive="/archive")
+
+    stations = PointObservations(
+        latitudes=lats[[41, 40, 300]] + 0.1,
+        longitudes=lons[[41, 40, 300]],
+        values=np.zeros(3),
+    )
+
+    values = cube.read("/archive/tp/2015060100/tp_20150601_00_12.grib", stations)
+    assert values.tolist() == [2.0, 1.0, 3.0]
+
+    # The file was missing when building the cube.
+    with pytest.raises(IOError):
+        cube.read("/archive/tp/2015060112/tp_20150601_12_12.grib", stations)
+
+    # Files and stations that are not in the cube.
+    assert cube.read("/archive/tp/2015060200/tp_20150602_00_12.grib", stations) is None
+
+    outside = PointObservations(
+        latitudes=lats[[1]], longitudes=lons[[1]], values=np.zeros(1)
+    )
+    assert cube.read("/archive/tp/2015060100/tp_20150601_00_12.grib", outside) is None
+
+
+def test_fieldset_cache_reads_cube(tmp_path):
+    lats, lons = write_cube(tmp_path)
+    cache = FieldsetCache(
+        max_bytes=1024, cube=ForecastCube(tmp_path, archive="/archive")
+    )
+
+    stations = PointObservations(
+        latitudes=lats[[40]], longitudes=lons[[40]], values=np.zeros(1)
+    )
+
+    path = "/archive/tp/2015060100/tp_20150601_00_12.grib"
+    assert cache.get_points(path, stations).tolist() == [1.0]
+    assert cache.stats["misses"] == 0
@@ -0,0 +1,87 @@
+import pytest
+
+from core.processor.dag import ComputationGraph
+from tests.unit.processor.test_cases import make_config
+from tests.unit.processor.test_columns import make_computation
+
+
+def make_graph_config():
+    config = make_config()
+    config.predictors.codes = ["2t", "u700", "v700"]
+    config.computations = [
+        make_computation(0, "WSPD2", "VECTOR_MODULE", ["U", "V"]),
+        make_computation(1, "2T", "INSTANTANEOUS_FIELD_100", ["2t"]),
+        make_computation(2, "U", "AVERAGE_FIELD", ["u700"], False),
+        make_computation(3, "V", "AVERAGE_FIELD", ["v700"], False),
+        make_computation(4, "WSPD", "VECTOR_MODULE", ["U", "V"]),
+        make_computation(5, "RATIO", "RATIO_FIELD", ["WSPD", "2T"]),
+        make_computation(6, "LST", "LOCAL_SOLAR_TIME", []),
+    ]
+    config.computations[1].is_reference = True
+
+    return config
+
+
+def shortnames(graph):
+    return [[c.shortname for c in node.computations] for node in graph.nodes]
+
+
+def test_computation_graph_order():
+    graph = ComputationGraph.from_config(make_graph_config())
+
+    # The base nodes first, with the reference leading, then the derived
+    # ones after their inputs. WSPD2 and WSPD are the same expression.
+    assert shortnames(graph) == [["2T"], ["U"], ["V"], ["WSPD2", "WSPD"], ["RATIO"]]
+
+    subgraph = graph.subgraph([c for c in graph.nodes[3].computations])
+    assert shortnames(subgraph) == [["U"], ["V"], ["WSPD2", "WSPD"]]
+
+
+def test_computation_graph_invalid_inputs():
+    config = make_graph_config()
+    config.computations[2].inputs = [{"code": "WSPD"}]
+
+    with pytest.raises(ValueError, match="Cyclic"):
+        ComputationGraph.from_config(config)
+
+    config.computations[2].inputs = [{"code": "missing"}]
+
+    with pytest.raises(ValueError, match="Unknown input missing"):
+        ComputationGraph.from_config(config)
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_computation_graph_run(threads):
+    graph = ComputationGraph.from_config(make_graph_config())
+    inputs = {"2t": 2.0, "u700": 3.0, "v700": 4.0}
+    results, released = {}, []
+    released_before_ratio = None
+
+    class Value(float):
+        def __del__(self):
+            released.append(float(self))
+
+    def evaluate(node, values):
+        nonlocal released_before_ratio
+        computation = node.computation
+
+        if node.is_base:
+            value = inputs[computation.inputs[0]["code"]]
+        elif computation.field == "VECTOR_MODULE":
+            value = (values[0] ** 2 + values[1] ** 2) ** 0.5
+        else:
+            value = values[0] / values[1]
+
+        results[computation.shortname] = value
+        if computation.shortname == "RATIO":
+            released_before_ratio = sorted(released)
+
+        return Value(value)
+
+    graph.run(evaluate, threads=threads)
+
+    assert results == {"2T": 2.0, "U": 3.0, "V": 4.0, "WSPD2": 5.0, "RATIO": 2.5}
+
+    # The values are released once used by their last consumer.
+    assert released_before_ratio == [3.0, 4.0]
+    assert sorted(released) == [2.0, 2.5, 3.0, 4.0, 5.0]
@@ -0,0 +1,62 @@
+from datetime import date
+
+from core.processor.cases import iter_cases
+from core.processor.checkpoint import Checkpoint
+from core.processor.extend import (
+    read_calibration_period,
+    read_footer_counters,
+    skip_existing_cases,
+    update_calibration_period,
+)
+from tests.unit.processor.test_cases import make_config
+
+HEADER = """# GENERAL PARAMETERS
+#   Start Calibration Period                = 2015-06-01
+#   End Calibration Period                  = 2015-06-03
+#   Spin-up Limit                           = 3"""
+
+
+def test_calibration_period():
+    assert read_calibration_period(HEADER) == (date(2015, 6, 1), date(2015, 6, 3))
+    assert read_calibration_period("# foo") is None
+
+    header = update_calibration_period(HEADER, make_config(date_end="2015-06-05"))
+    assert len(header) == len(HEADER)
+    assert read_calibration_period(header) == (date(2015, 6, 1), date(2015, 6, 5))
+
+
+def test_footer_counters():
+    footer = (
+        "# No of observations considered in the calibration period: 760\n"
+        "# No of observations that correspond to TP >= 1.0 mm/12h: 439"
+    )
+
+    assert read_footer_counters(footer) == (760, 439)
+    assert read_footer_counters(footer.split("\n")[0]) == (760, None)
+    assert read_footer_counters("") == (None, None)
+
+
+def test_skip_existing_cases():
+    config = make_config(date_end="2015-06-05")
+    checkpoint = Checkpoint(fingerprint="", skip_period=["2015-06-01", "2015-06-03"])
+
+    tasks = list(iter_cases(config))
+    extended = list(
+        skip_existing_cases(
+            config, iter_cases(config), checkpoint, keys={("2015-06-04", 0, 5)}
+        )
+    )
+    assert len(extended) == len(tasks)
+
+    computed = [
+        (task.curr_date, task.curr_time, task.step_s)
+        for task in extended
+        if not task.skip
+    ]
+    assert computed == [
+        (task.curr_date, task.curr_time, task.step_s)
+        for task in tasks
+        if not task.skip
+        and task.curr_date > date(2015, 6, 3)
+        and (task.curr_date, task.curr_time, task.step_s) != (date(2015, 6, 4), 0, 5)
+    ]
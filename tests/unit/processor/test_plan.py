@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from core.processor.plan import plan
+from tests.unit.processor.test_cases import make_config
+from tests.unit.processor.test_columns import make_computation
+
+
+def test_plan(tmp_path):
+    config = make_config(date_end="2015-06-01")
+    config.observations.path = tmp_path / "obs"
+    config.predictors.path = tmp_path / "fc"
+    config.computations = [
+        make_computation(0, "2T", "INSTANTANEOUS_FIELD_100", ["2t"]),
+        make_computation(1, "LST", "LOCAL_SOLAR_TIME", []),
+    ]
+
+    # Only the observations of the 00 UTC run are available.
+    for hour in (0, 5):
+        path = config.observations.path / "20150601" / f"2t_20150601_{hour:02d}.geo"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("obs")
+
+    grib = config.predictors.path / "2t" / "2015060100" / "2t_20150601_00_00.grib"
+    grib.parent.mkdir(parents=True)
+    grib.write_bytes(b"GRIB")
+
+    result = plan(config)
+
+    assert result.cases == 6
+
+    # The cases without observation file are skipped by run().
+    assert result.skipped_cases == 4
+    assert result.to_dict()["skippedCases"] == 4
+    assert len(result.missing_observations) == 4
+    assert [Path(path).name for path in result.missing_forecasts] == [
+        "2t_20150601_00_05.grib"
+    ]
+    assert result.total_bytes == 2 * len("obs") + len("GRIB")
+    assert result.cache_reuse == {"observations": 0.0, "forecasts": 0.0}
+
+
+def test_plan_missing_observations(tmp_path, caplog):
+    config = make_config(date_end="2015-06-01")
+    config.observations.path = tmp_path / "obs"
+    config.predictors.path = tmp_path / "fc"
+    config.computations = [make_computation(0, "2T", "INSTANTANEOUS_FIELD_100", ["2t"])]
+
+    with caplog.at_level("INFO"):
+        result = plan(config)
+
+    assert result.skipped_cases == result.cases == 6
+    assert not result.forecast_reads
+    assert "(6 skipped, 0 to compute)" in caplog.text
@@ -0,0 +1,27 @@
+from core.processor.cases import iter_cases
+from core.processor.prefetch import Prefetcher, read_ahead
+from tests.unit.processor.test_cases import make_config
+
+
+def test_read_ahead(tmp_path):
+    path = tmp_path / "obs.geo"
+    path.write_bytes(b"x" * 3000)
+
+    assert read_ahead([path, tmp_path / "missing.geo"]) == 3000
+
+
+def test_prefetcher(tmp_path):
+    config = make_config()
+    config.observations.path = tmp_path
+
+    path = tmp_path / "20150601" / "2t_20150601_00.geo"
+    path.parent.mkdir()
+    path.write_bytes(b"x" * 10)
+
+    tasks = list(iter_cases(config))
+    tasks[1].skip = "  Forecast already used: case 1"
+
+    prefetcher = Prefetcher(config=config, depth=3, workers=2)
+    assert list(prefetcher.iter_tasks(tasks)) == tasks
+    assert prefetcher.stats["files"] == len(tasks) - 1
+    assert prefetcher.stats["bytes"] == 10
@@ -0,0 +1,39 @@
+from datetime import date
+
+import pyarrow as pa
+
+from core.processor.cases import iter_cases
+from core.processor.shards import _common_schema, get_shard_period, iter_shard_cases
+from tests.unit.processor.test_cases import make_config
+
+
+def test_shard_period():
+    config = make_config(date_end="2015-06-05", shards="2")
+
+    assert get_shard_period(config, 0) == (date(2015, 6, 1), date(2015, 6, 3))
+    assert get_shard_period(config, 1) == (date(2015, 6, 4), date(2015, 6, 5))
+
+
+def test_shard_cases():
+    tasks = list(iter_cases(make_config(date_end="2015-06-05")))
+
+    shard_tasks = [
+        task
+        for shard in range(3)
+        for task in iter_shard_cases(
+            make_config(date_end="2015-06-05", shards="3", shard=str(shard)),
+            iter_cases(make_config(date_end="2015-06-05")),
+        )
+    ]
+    assert shard_tasks == tasks
+
+
+def test_common_schema():
+    schema = _common_schema(
+        [
+            pa.schema([("BaseTime", pa.uint8()), ("OBS", pa.float32())]),
+            pa.schema([("BaseTime", pa.uint16()), ("OBS", pa.float32())]),
+        ]
+    )
+
+    assert schema.types == [pa.uint16(), pa.float32()]
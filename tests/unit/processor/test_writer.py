@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+
+from core.processor.writer import BackgroundWriter, get_point_data_table_schema
+from tests.unit.processor.test_cases import make_config
+from tests.unit.processor.test_columns import make_computation
+
+
+class RecordingSerializer(object):
+    def __init__(self, fail_on=None):
+        self.chunks = []
+        self.footer = None
+        self.closed = False
+        self.aborted = False
+        self.fail_on = fail_on
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def add_columns_chunk(self, columns):
+        self.unblocked.wait()
+        if columns == self.fail_on:
+            raise ValueError(f"cannot write {columns}")
+        self.chunks.append(columns)
+
+    def add_footer(self, footer):
+        self.footer = footer
+
+    def checkpoint(self):
+        return {"chunks": len(self.chunks)}
+
+    def close(self):
+        self.closed = True
+
+    def abort(self):
+        self.aborted = True
+
+
+def test_background_writer():
+    serializer = RecordingSerializer()
+    writer = BackgroundWriter(serializer, size=2)
+
+    for i in range(10):
+        writer.add_columns_chunk(i)
+
+    # The queued chunks are written before the checkpoint and the footer.
+    assert writer.checkpoint() == {"chunks": 10}
+
+    writer.add_columns_chunk(10)
+    writer.add_footer("footer")
+    writer.close()
+
+    assert serializer.chunks == list(range(11))
+    assert serializer.footer == "footer"
+    assert serializer.closed
+
+
+def test_background_writer_back_pressure():
+    serializer = RecordingSerializer()
+    serializer.unblocked.clear()
+    writer = BackgroundWriter(serializer, size=2)
+
+    # One chunk is being written, and two are queued.
+    for i in range(3):
+        writer.add_columns_chunk(i)
+
+    producer = threading.Thread(target=writer.add_columns_chunk, args=(3,))
+    producer.start()
+    producer.join(timeout=0.2)
+    assert producer.is_alive()
+
+    serializer.unblocked.set()
+    producer.join()
+    writer.close()
+
+    assert serializer.chunks == [0, 1, 2, 3]
+
+
+def test_background_writer_error():
+    serializer = RecordingSerializer(fail_on=1)
+    writer = BackgroundWriter(serializer, size=2)
+
+    writer.add_columns_chunk(0)
+    writer.add_columns_chunk(1)
+    writer.add_columns_chunk(2)
+
+    with pytest.raises(ValueError, match="cannot write 1"):
+        writer.flush()
+
+    with pytest.raises(ValueError, match="cannot write 1"):
+        writer.close()
+
+    # The chunks queued after the error are discarded.
+    assert serializer.chunks == [0]
+    assert not serializer.closed
+
+
+def test_background_writer_abort():
+    serializer = RecordingSerializer()
+    serializer.unblocked.clear()
+    writer = BackgroundWriter(serializer, size=2)
+
+    for i in range(3):
+        writer.add_columns_chunk(i)
+
+    serializer.unblocked.set()
+    writer.abort()
+
+    # The queued chunks are written, but the table is not closed.
+    assert serializer.chunks == [0, 1, 2]
+    assert serializer.aborted
+    assert not serializer.closed
+
+
+def test_point_data_table_schema():
+    config = make_config()
+    config.predictors.codes = ["2t", "u700", "v700"]
+    config.computations = [
+        make_computation(0, "WSPD", "VECTOR_MODULE", ["U700", "V700"]),
+        make_computation(1, "U700", "AVERAGE_FIELD", ["u700"], False),
+        make_computation(2, "V700", "AVERAGE_FIELD", ["v700"], False),
+        make_computation(3, "2T", "INSTANTANEOUS_FIELD_100", ["2t"]),
+        make_computation(4, "LST", "LOCAL_SOLAR_TIME", []),
+    ]
+    config.computations[3].is_reference = True
+
+    schema = get_point_data_table_schema(config)
+
+    assert schema.names == [
+        "BaseDate",
+        "BaseTime",
+        "Step",
+        "DateOBS",
+        "TimeOBS",
+        "LatOBS",
+        "LonOBS",
+        "OBS",
+        "Predictand",
+        "FE",
+        "LST",
+        "2T",
+        "WSPD",
+    ]
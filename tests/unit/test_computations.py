@@ -1,6 +1,16 @@
+import numpy as np
+
 from core.computations.utils import (
     compute_accumulated_field,
+    compute_average_field,
+    compute_maximum,
+    compute_minimum,
+    compute_vector,
     compute_weighted_average_field,
+    stream_average_field,
+    stream_maximum,
+    stream_minimum,
+    stream_weighted_average_field,
 )
 
 
@@ -13,3 +23,31 @@ def test_compute_weighted_average_field():
     assert compute_weighted_average_field(2, 4, 6) == 4
     assert compute_weighted_average_field(2, 4, 4, 6) == 4
     assert compute_weighted_average_field(2, 4, 8, 4, 6) == 5
+
+
+def test_compute_point_values():
+    u = np.array([3.0, -1.0])
+    v = np.array([4.0, 0.0])
+
+    assert np.allclose(compute_vector(u, v), [5.0, 1.0])
+    assert np.allclose(compute_maximum(u, v), [4.0, 0.0])
+    assert np.allclose(compute_minimum(u, v), [3.0, -1.0])
+
+
+def test_stream_reductions():
+    steps = [np.array([1.0, 8.0]), np.array([4.0, 2.0]), np.array([3.0, 5.0])]
+    loaders = [lambda step=step: step for step in steps]
+
+    assert np.array_equal(stream_maximum(loaders), compute_maximum(*steps))
+    assert np.array_equal(stream_minimum(loaders), compute_minimum(*steps))
+    assert np.array_equal(stream_average_field(loaders), compute_average_field(*steps))
+    assert np.array_equal(
+        stream_weighted_average_field(loaders), compute_weighted_average_field(*steps)
+    )
+    assert np.array_equal(
+        stream_weighted_average_field(loaders[:2]),
+        compute_weighted_average_field(*steps[:2]),
+    )
+
+    # The steps are not modified.
+    assert steps[0].tolist() == [1.0, 8.0]